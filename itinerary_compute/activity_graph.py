@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Sequence, Tuple
+from pole_penalties import PolePenaltyEngine, PenaltyOverlay
+
+
+class ActivityGraph:
+    """
+    Compact activity graph: vertex i is activity i.
+
+    Holds the names, a section id array, an N x 2 (latitude, longitude)
+    array and a dense N x N travel-time matrix in seconds. Edges are all
+    ordered pairs of distinct activities; the diagonal is not an edge.
+    Replaces the `vertex_df` / long `passage_matrix_df` pair of
+    `utils.generate_activity_graph`, which can still be produced with
+    `to_frames`.
+    """
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        sections: Sequence[Any],
+        coordinates: np.ndarray,
+        weights: np.ndarray,
+        dtype: Any = np.float32
+    ):
+        """
+        Args:
+            names: Activity names
+            sections: sectionId of each activity
+            coordinates: N x 2 array of (latitude, longitude)
+            weights: N x N travel times in seconds
+            dtype: Storage dtype of the weights (default float32)
+        """
+        self.names = list(names)
+        self.sections = np.asarray(sections, dtype=object)
+        self.coordinates = np.asarray(coordinates, dtype=np.float64).reshape(len(self.names), 2)
+        self.weights = np.ascontiguousarray(weights, dtype=dtype)
+        if self.weights.shape != (len(self.names), len(self.names)):
+            raise ValueError(
+                f"Weight matrix shape {self.weights.shape} does not match {len(self.names)} vertices"
+            )
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    @classmethod
+    def from_frames(cls, df: pd.DataFrame, dist_df_walk: pd.DataFrame, dtype: Any = np.float32) -> "ActivityGraph":
+        """
+        Build the graph from the activities DataFrame and the distance frame (minutes),
+        like `generate_activity_graph`.
+        """
+        names = df['name'].tolist()
+        weights = dist_df_walk.loc[names, names].to_numpy(dtype=np.float64) * 60  # En secondes
+        return cls(
+            names,
+            df['sectionId'].tolist(),
+            df[['latitude', 'longitude']].to_numpy(dtype=np.float64),
+            weights,
+            dtype=dtype
+        )
+
+    @classmethod
+    def from_long_frames(
+        cls,
+        vertex_df: pd.DataFrame,
+        passage_matrix_df: pd.DataFrame,
+        dtype: Any = np.float32
+    ) -> "ActivityGraph":
+        """Build the graph back from the `generate_activity_graph` frames (missing edges are 0)."""
+        names = vertex_df['name'].tolist()
+        index = {name: i for i, name in enumerate(names)}
+        weights = np.zeros((len(names), len(names)), dtype=np.float64)
+        rows = passage_matrix_df['from'].map(index).to_numpy()
+        columns = passage_matrix_df['to'].map(index).to_numpy()
+        weights[rows.astype(np.intp), columns.astype(np.intp)] = passage_matrix_df['travel_time'].to_numpy()
+        coordinates = np.array(vertex_df['coordinates'].tolist(), dtype=np.float64)
+        return cls(names, vertex_df['section'].tolist(), coordinates, weights, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def edge_mask(self) -> np.ndarray:
+        """Mask of the edges (pairs of activities with different names)."""
+        names = np.asarray(self.names, dtype=object)
+        return names[:, None] != names[None, :]
+
+    def travel_time(self, from_name: str, to_name: str) -> float:
+        """Travel time in seconds between two activities."""
+        return float(self.weights[self.index[from_name], self.index[to_name]])
+
+    def to_frames(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Convert to the (vertex_df, passage_matrix_df) frames of `generate_activity_graph`.
+        """
+        vertex_df = pd.DataFrame({
+            'name': self.names,
+            'section': list(self.sections),
+            'coordinates': list(map(tuple, self.coordinates.tolist()))
+        })
+
+        rows, columns = np.nonzero(self.edge_mask())
+        names = np.asarray(self.names, dtype=object)
+        passage_matrix_df = pd.DataFrame({
+            'from': names[rows],
+            'to': names[columns],
+            'travel_time': self.weights[rows, columns]
+        })
+        return vertex_df, passage_matrix_df
+
+    def penalty_engine(self) -> PolePenaltyEngine:
+        """Pole penalty engine for dense matrices in vertex order."""
+        return PolePenaltyEngine(self.sections)
+
+    def penalty_overlay(self) -> PenaltyOverlay:
+        """Lazy pole penalties on top of the (shared) weight matrix."""
+        return PenaltyOverlay(self.weights, self.sections, self.names)
@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Callable, Optional
+from content_based_interest import ActivityCatalog, INTEREST_KEYS, recommend_activities
+from distance_matrix import DistanceMatrix
+from distance_Haversine import walking_time_matrix, write_distance_csv
+from itinerary_builder import build_itinerary, replan_itinerary, load_distance_matrix
+from data_bundle import build_bundle, load_bundle
+from utils import generate_activity_graph, adjust_edge_weights_for_poles
+
+
+START_POINT = "La Statue de Louis XIV"
+
+# Emprise approximative du domaine (château, jardins, Trianons)
+LATITUDE_RANGE = (48.800, 48.818)
+LONGITUDE_RANGE = (2.095, 2.130)
+
+
+def synthetic_catalog(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `n` activities shaped like activity_v2.json: the start point (section 0)
+    followed by activities with random coordinates on the estate, sections
+    1-7, time windows, durations and interest levels 1-5.
+    """
+    rng = random.Random(seed)
+    activities = [{
+        "activityId": "0",
+        "name": START_POINT,
+        "latitude": 48.8048,
+        "longitude": 2.1224,
+        "duration": 0,
+        "openingTime": 0,
+        "closingTime": 24,
+        "sectionId": "0",
+        **{key: 1 for key in INTEREST_KEYS}
+    }]
+    for i in range(1, n):
+        opening = rng.choice([8, 9, 9.5, 10, 12, 12.5, 14])
+        activities.append({
+            "activityId": str(i),
+            "name": f"Activité synthétique {i}",
+            "latitude": rng.uniform(*LATITUDE_RANGE),
+            "longitude": rng.uniform(*LONGITUDE_RANGE),
+            "duration": rng.choice([0.25, 0.5, 0.5, 1, 1, 1.5, 2]),
+            "openingTime": opening,
+            "closingTime": min(opening + rng.choice([3, 5, 8, 10]), 22),
+            "sectionId": str(rng.randint(1, 7)),
+            **{key: rng.randint(1, 5) for key in INTEREST_KEYS}
+        })
+    return activities
+
+
+def synthetic_swipes(activities: List[Dict[str, Any]], count: int = 15, seed: int = 0) -> List[Dict[str, Any]]:
+    """Random likes/dislikes (about 60% likes) on distinct activities."""
+    rng = random.Random(seed)
+    swiped = rng.sample(activities[1:], min(count, len(activities) - 1))
+    return [{"activityId": act['activityId'], "like": rng.random() < 0.6} for act in swiped]
+
+
+def synthetic_distances(activities: List[Dict[str, Any]]) -> DistanceMatrix:
+    """Straight-line walking times between the activities, float32."""
+    values = walking_time_matrix(
+        [act['latitude'] for act in activities],
+        [act['longitude'] for act in activities],
+        chunk_size=1024,
+        dtype=np.float32
+    )
+    return DistanceMatrix(
+        [act['name'] for act in activities], values,
+        activity_ids=[act['activityId'] for act in activities]
+    )
+
+
+def measure(function: Callable[[], Any], repeats: int, warmup: int = 1) -> Dict[str, Any]:
+    """
+    Latency percentiles over `repeats` calls, then one traced call
+    (tracemalloc) for the peak memory of the call and the memory it leaves
+    allocated: bytes and blocks still held once the call has returned
+    (caches, memoized tables...), from snapshots taken around it.
+    """
+    for _ in range(warmup):
+        function()
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    # The snapshots themselves are traced: leave out what tracemalloc allocates
+    untraced = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(untraced)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(untraced)
+    finally:
+        tracemalloc.stop()
+    retained = after.compare_to(before, 'filename')
+
+    timings = np.array(timings)
+    return {
+        "repeats": repeats,
+        "mean_ms": float(timings.mean()),
+        "min_ms": float(timings.min()),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p90_ms": float(np.percentile(timings, 90)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "max_ms": float(timings.max()),
+        "peak_memory_bytes": int(peak - baseline),
+        "retained_memory_bytes": int(sum(stat.size_diff for stat in retained)),
+        "retained_blocks": int(sum(stat.count_diff for stat in retained))
+    }
+
+
+def benchmark_catalog(
+    name: str,
+    activities: List[Dict[str, Any]],
+    distances: DistanceMatrix,
+    likes_dislikes: List[Dict[str, Any]],
+    repeats: int,
+    max_pairwise: int,
+    workdir: str
+) -> List[Dict[str, Any]]:
+    """Run every benchmark on one catalog."""
+    n = len(activities)
+    catalog = ActivityCatalog(activities)
+    results = []
+
+    def record(benchmark: str, function: Callable[[], Any], runs: int = repeats) -> None:
+        print(f"  {benchmark}...", flush=True)
+        results.append({"benchmark": benchmark, "catalog": name, "activities": n, **measure(function, runs)})
+
+    record("recommend_activities", lambda: recommend_activities(likes_dislikes, activities, catalog=catalog))
+    record("build_itinerary/greedy", lambda: build_itinerary(
+        likes_dislikes, activities, distances, "09:00", "18:00",
+        start_point=START_POINT, max_activities=100, catalog=catalog
+    ))
+
+    record("build_itinerary/local_search", lambda: build_itinerary(
+        likes_dislikes, activities, distances, "09:00", "18:00",
+        start_point=START_POINT, max_activities=100, catalog=catalog,
+        solver="local_search", time_budget_ms=50
+    ))
+
+    # Re-plan after two activities against a full rebuild from the same time and place
+    itinerary = build_itinerary(
+        likes_dislikes, activities, distances, "09:00", "18:00",
+        start_point=START_POINT, max_activities=10, catalog=catalog
+    )
+    completed = min(2, itinerary['total_activities'])
+    current_time = itinerary['itinerary'][completed]['departure_time']
+    rec_scores = {
+        str(act['activityId']): act['recommendation_score']
+        for act in recommend_activities(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+    }
+    record("replan/rebuild", lambda: build_itinerary(
+        likes_dislikes, activities, distances, current_time, "18:00",
+        start_point=START_POINT, max_activities=10, catalog=catalog
+    ))
+    record("replan/repair", lambda: replan_itinerary(
+        itinerary, completed, current_time, activities, distances, "18:00",
+        rec_scores=rec_scores, start_point=START_POINT, max_activities=10, catalog=catalog
+    ))
+
+    # The long-format passage frame and the CSV grow as N², only run them on small catalogs
+    if n > max_pairwise:
+        for benchmark in ("generate_activity_graph", "adjust_edge_weights_for_poles", "load_matrix/csv_dict",
+                          "load_matrix/csv_dense", "load_matrix/bundle"):
+            results.append({"benchmark": benchmark, "catalog": name, "activities": n, "skipped": True})
+        return results
+
+    df = pd.json_normalize(activities)
+    dist_df_walk = pd.DataFrame(distances.values.astype(np.float64), index=distances.names, columns=distances.names)
+    record("generate_activity_graph", lambda: generate_activity_graph(df, dist_df_walk), max(1, repeats // 5))
+    _, passage_matrix_df = generate_activity_graph(df, dist_df_walk)
+    record("adjust_edge_weights_for_poles", lambda: adjust_edge_weights_for_poles(passage_matrix_df, '2', df, 0))
+
+    csv_path = os.path.join(workdir, f"{name}.csv")
+    bundle_path = os.path.join(workdir, f"{name}.bundle")
+    write_distance_csv(csv_path, distances.names, distances.values)
+    build_bundle(activities, distances, bundle_path)
+    record("load_matrix/csv_dict", lambda: load_distance_matrix(csv_path), max(1, repeats // 5))
+    record("load_matrix/csv_dense", lambda: DistanceMatrix.from_csv(csv_path, activities), max(1, repeats // 5))
+    record("load_matrix/bundle", lambda: load_bundle(bundle_path).distances)
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> List[str]:
+    """Benchmarks whose p50 is more than `threshold` times slower than the baseline."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {
+            (r["benchmark"], r["catalog"]): r for r in json.load(f)["results"] if not r.get("skipped")
+        }
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["catalog"]))
+        if previous is None or result.get("skipped"):
+            continue
+        ratio = result["p50_ms"] / previous["p50_ms"] if previous["p50_ms"] else 1.0
+        result["baseline_p50_ms"] = previous["p50_ms"]
+        result["p50_ratio"] = ratio
+        if ratio > threshold:
+            regressions.append(f"{result['catalog']} {result['benchmark']}: p50 x{ratio:.2f}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline itinerary_compute")
+    parser.add_argument("--sizes", type=int, nargs="*", default=[500, 2000, 10000],
+                        help="Tailles des catalogues synthétiques")
+    parser.add_argument("--no-real", action="store_true", help="Ne pas inclure le catalogue réel")
+    parser.add_argument("--repeats", type=int, default=20, help="Nombre de mesures par benchmark")
+    parser.add_argument("--max-pairwise", type=int, default=2000,
+                        help="Taille maximale pour les benchmarks en N² (recherche locale, passage_matrix_df, CSV)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json", help="Fichier JSON des résultats")
+    parser.add_argument("--baseline", help="Résultats JSON précédents à comparer")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Ratio de p50 considéré comme régression")
+    args = parser.parse_args(argv)
+
+    catalogs = []
+    if not args.no_real:
+        with open('activity_v2.json', 'r', encoding='utf-8') as f:
+            activities = json.load(f)
+        with open('user_visit.json', 'r', encoding='utf-8') as f:
+            likes_dislikes = json.load(f)
+        distances = DistanceMatrix.from_csv('activity_distances_temp.csv', activities)
+        catalogs.append(("real", activities, distances, likes_dislikes))
+    for size in args.sizes:
+        activities = synthetic_catalog(size, args.seed)
+        catalogs.append((
+            f"synthetic-{size}", activities, synthetic_distances(activities),
+            synthetic_swipes(activities, seed=args.seed)
+        ))
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, activities, distances, likes_dislikes in catalogs:
+            print(f"{name} ({len(activities)} activités)", flush=True)
+            results.extend(benchmark_catalog(
+                name, activities, distances, likes_dislikes,
+                args.repeats, args.max_pairwise, workdir
+            ))
+
+    regressions = compare(results, args.baseline, args.threshold) if args.baseline else []
+
+    report = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        },
+        "results": results,
+        "regressions": regressions
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n{'catalogue':<18} {'benchmark':<32} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'pic Mo':>8} "
+          f"{'retenu Mo':>10}")
+    for result in results:
+        if result.get("skipped"):
+            print(f"{result['catalog']:<18} {result['benchmark']:<32} {'(ignoré)':>10}")
+            continue
+        print(
+            f"{result['catalog']:<18} {result['benchmark']:<32} {result['p50_ms']:>10.2f} "
+            f"{result['p90_ms']:>10.2f} {result['p99_ms']:>10.2f} {result['peak_memory_bytes'] / 1e6:>8.1f} "
+            f"{result['retained_memory_bytes'] / 1e6:>10.2f}"
+        )
+    for regression in regressions:
+        print(f"RÉGRESSION {regression}")
+    print(f"\nRésultats enregistrés sous {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
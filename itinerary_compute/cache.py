@@ -0,0 +1,337 @@
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Hashable
+from content_based_interest import ActivityCatalog, recommend_activities
+from instrumentation import Instrumentation
+
+
+class LRUCache:
+    """
+    In-process LRU cache with a size limit and a time-to-live.
+
+    Entries older than `ttl_seconds` are treated as misses and dropped;
+    when full, the least recently used entry is evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl_seconds: Optional[float] = 3600,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_size: Maximum number of entries
+            ttl_seconds: Entry lifetime in seconds (None for no expiry)
+            clock: Time source, in seconds
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if self.ttl_seconds is None or self.clock() - stored_at <= self.ttl_seconds:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self.lock:
+            self.entries[key] = (self.clock(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def swipe_key(likes_dislikes: List[Dict[str, Any]]) -> str:
+    """
+    Canonical hash of a swipe set.
+
+    Swipe order does not change recommendations, so swipes are sorted;
+    repeated swipes are kept since they count several times in the user vector.
+    """
+    swipes = sorted((str(swipe["activityId"]), bool(swipe["like"])) for swipe in likes_dislikes)
+    canonical = json.dumps(swipes, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class RecommendationCache:
+    """
+    Memoized `recommend_activities` results keyed by swipe set.
+
+    The key is the canonical swipe hash plus α/β, the other recommendation
+    options and the catalog version, so entries built from an older
+    `activity_v2.json` are never returned. Each call gets its own copy of
+    the list and of its activity dicts (flat: one level of copy suffices),
+    so callers may modify their result.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 3600):
+        """
+        Args:
+            max_size: Maximum number of cached swipe sets
+            ttl_seconds: Entry lifetime in seconds (None for no expiry)
+        """
+        self.cache = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def recommend(
+        self,
+        likes_dislikes: List[Dict[str, Any]],
+        activities_df: List[Dict[str, Any]],
+        alpha: float = 1.0,
+        beta: float = 0.5,
+        exclude_seen: bool = False,
+        top_n: int = None,
+        catalog: Optional[ActivityCatalog] = None,
+        instrumentation: Optional[Instrumentation] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Cached `recommend_activities`, same arguments and result.
+
+        Without a catalog, one is built and versioned from the content of
+        `activities_df` on every call, so changes to the list are never
+        served stale; pass the loaded catalog to skip that hashing.
+        """
+        if catalog is None:
+            catalog = ActivityCatalog(activities_df)
+        key = (swipe_key(likes_dislikes), alpha, beta, exclude_seen, top_n, catalog.version)
+
+        scored_activities = self.cache.get(key)
+        if instrumentation is not None:
+            instrumentation.count("recommendation_cache_hits", scored_activities is not None)
+        if scored_activities is None:
+            scored_activities = recommend_activities(
+                likes_dislikes, activities_df, alpha=alpha, beta=beta,
+                exclude_seen=exclude_seen, top_n=top_n, catalog=catalog,
+                instrumentation=instrumentation
+            )
+            self.cache.put(key, [dict(act) for act in scored_activities])
+            return scored_activities
+        return [dict(act) for act in scored_activities]
+
+    @property
+    def hits(self) -> int:
+        return self.cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self.cache.misses
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        return self.cache.stats()
+
+
+class MemoryBackend:
+    """
+    In-process itinerary result store (LRU with TTL).
+
+    Results are kept as JSON, like SqliteBackend: each hit decodes a new
+    copy, so callers may modify what they get.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: Optional[float] = 600):
+        self.cache = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.cache.get(key)
+        return None if value is None else json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        self.cache.put(key, json.dumps(value, ensure_ascii=False))
+
+
+class SqliteBackend:
+    """
+    On-disk itinerary result store in a sqlite file, shared across processes.
+
+    Each process opens its own connection (reopened after a fork). Results
+    are stored as JSON; every `prune_interval` inserts of a process, the
+    oldest entries beyond `max_entries` are pruned, so the table may hold
+    up to `prune_interval` extra rows per process in between.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = 600,
+        max_entries: int = 100000,
+        prune_interval: int = 256
+    ):
+        """
+        Args:
+            path: Path of the sqlite file
+            ttl_seconds: Entry lifetime in seconds (None for no expiry)
+            max_entries: Maximum number of stored results
+            prune_interval: Number of inserts between two size checks
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self.puts = 0
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+
+    def connect(self) -> sqlite3.Connection:
+        """Connection of the current process, created on first use."""
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS itinerary_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS itinerary_cache_created_at ON itinerary_cache (created_at)"
+            )
+            self.connection.commit()
+            self.pid = os.getpid()
+        return self.connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            connection = self.connect()
+            row = connection.execute(
+                "SELECT value, created_at FROM itinerary_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+                connection.execute("DELETE FROM itinerary_cache WHERE key = ?", (key,))
+                connection.commit()
+                return None
+            return json.loads(value)
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        with self.lock:
+            connection = self.connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO itinerary_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time())
+            )
+            self.puts += 1
+            if self.puts % self.prune_interval == 0:
+                self.prune(connection)
+            connection.commit()
+
+    def prune(self, connection: sqlite3.Connection) -> None:
+        """Delete the oldest entries beyond `max_entries`, if the table is over it."""
+        (count,) = connection.execute("SELECT COUNT(*) FROM itinerary_cache").fetchone()
+        if count > self.max_entries:
+            connection.execute(
+                "DELETE FROM itinerary_cache WHERE key IN ("
+                "SELECT key FROM itinerary_cache ORDER BY created_at LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+
+def itinerary_request_key(
+    likes_dislikes: List[Dict[str, Any]],
+    catalog_version: str,
+    distances_version: str,
+    start_minutes: float,
+    end_minutes: float,
+    **options: Any
+) -> str:
+    """
+    Canonical key of a `build_itinerary` request.
+
+    Swipes are sorted (see `swipe_key`), times are given in minutes since
+    midnight and the remaining options (start point, max_activities, weights,
+    solver...) are serialized with sorted keys.
+    """
+    canonical = json.dumps(
+        {
+            "swipes": swipe_key(likes_dislikes),
+            "catalog": catalog_version,
+            "distances": distances_version,
+            "start": start_minutes,
+            "end": end_minutes,
+            "options": options
+        },
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ItineraryCache:
+    """
+    Whole-itinerary result cache with a pluggable backend.
+
+    Backends implement `get(key)` and `put(key, value)`: MemoryBackend for a
+    single process, SqliteBackend for a file shared by worker processes.
+    Both return a new copy of the result on every hit.
+    """
+
+    def __init__(self, backend: Optional[Any] = None):
+        """
+        Args:
+            backend: Storage backend (in-process MemoryBackend if None)
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        result = self.backend.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        self.backend.put(key, result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,304 @@
+import bisect
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+from content_based_interest import ActivityCatalog
+from distance_matrix import DistanceMatrix
+from instrumentation import Instrumentation, REJECTION_REASONS, phase
+
+
+MAX_TRAVEL = 35  # max reasonable travel time (minutes), see calculate_composite_score
+MAX_WAIT = 60  # wait time normalisation (minutes)
+
+
+class TimeWindowIndex:
+    """
+    Activities sorted by latest feasible start, for a fixed return time.
+
+    The latest start of an activity is the last moment it can begin, even
+    with no walk, and still end before closing and leave time to walk back
+    to the start point. As the greedy clock only moves forward, activities
+    whose latest start has passed are dropped for good with a binary search
+    on the sorted latest starts instead of being re-checked at every step.
+    """
+
+    def __init__(
+        self,
+        opening: np.ndarray,
+        closing: np.ndarray,
+        duration: np.ndarray,
+        return_times: np.ndarray,
+        end_time: float
+    ):
+        """
+        Args:
+            opening, closing, duration: Time windows and durations (minutes)
+            return_times: Travel time from each activity back to the start point
+            end_time: Return time (minutes since midnight)
+        """
+        self.end_time = end_time
+        self.latest_start = np.minimum(closing - duration, end_time - return_times - duration)
+        self.order = np.argsort(self.latest_start, kind="stable")
+        self.sorted_latest = self.latest_start[self.order].tolist()
+        self.cursor = 0
+        self.current_time = -np.inf
+        # Windows too short for the visit can never fit
+        self.live = opening <= self.latest_start
+
+    def expire(self, current_time: float) -> np.ndarray:
+        """Drop the activities that can no longer start; returns the live mask."""
+        self.current_time = current_time
+        # Small tolerance so rounding never drops an activity that still fits
+        cursor = bisect.bisect_left(self.sorted_latest, current_time - 1e-9, lo=self.cursor)
+        if cursor > self.cursor:
+            self.live[self.order[self.cursor:cursor]] = False
+            self.cursor = cursor
+        return self.live
+
+
+class CandidateEngine:
+    """
+    Batched feasibility and composite scoring for the greedy itinerary loop.
+
+    Opening/closing times, durations, interest vectors and recommendation
+    scores are stored as arrays aligned with `activities`, so each greedy step
+    evaluates every candidate with a handful of NumPy operations instead of
+    one `is_activity_feasible` / `calculate_composite_score` call per activity.
+    The formulas are the same as the scalar functions in itinerary_builder.
+    """
+
+    def __init__(
+        self,
+        activities: List[Dict[str, Any]],
+        distances: DistanceMatrix,
+        rec_scores: Dict[str, float],
+        return_point: str = "La Statue de Louis XIV",
+        catalog: Optional[ActivityCatalog] = None
+    ):
+        """
+        Args:
+            activities: Candidate activities; ties are broken by this order
+            distances: Dense distance matrix (minutes)
+            rec_scores: Recommendation score per activityId
+            return_point: Start/return location of the itinerary
+            catalog: Catalog holding the precomputed interest vectors
+        """
+        self.activities = activities
+        self.distances = distances
+        self.ids = np.array([str(act['activityId']) for act in activities])
+        self.matrix_index = distances.indices_of(activities)
+        self.known = self.matrix_index >= 0
+
+        # Opening, closing and duration in one pass over the activities (minutes)
+        windows = np.array(
+            [(act['openingTime'], act['closingTime'], act['duration']) for act in activities], dtype=float
+        ).reshape(len(activities), 3) * 60
+        self.opening, self.closing, self.duration = windows.T.copy()
+        self.rec_scores = np.array([rec_scores.get(i, 0) for i in self.ids.tolist()], dtype=float)
+
+        if catalog is None:
+            catalog = ActivityCatalog(activities)
+        rows = np.array([catalog.index.get(i, -1) for i in self.ids.tolist()], dtype=np.intp)
+        if (rows < 0).any():
+            # Activities outside the catalog: use a catalog of the candidates themselves
+            catalog = ActivityCatalog(activities)
+            rows = np.arange(len(activities))
+        self.interests = catalog.interests[rows]
+        self.interest_norms = catalog.norms[rows]
+
+        self.return_index = distances.index_of(return_point)
+        self.return_times = self.travel_times_to(self.return_index)
+
+        # Candidates (not the start point), and those still selectable (not visited)
+        self.selectable = np.array(
+            [act['name'] != return_point for act in activities], dtype=bool
+        )
+        self.available = self.selectable.copy()
+        self.time_windows: Optional[TimeWindowIndex] = None
+
+    def travel_times_from(self, location_index: int) -> np.ndarray:
+        """Travel time from a matrix index to every activity (0 if unknown)."""
+        if location_index < 0:
+            return np.zeros(len(self.activities))
+        row = self.distances.values[location_index]
+        return np.where(self.known, row[self.matrix_index], 0).astype(float)
+
+    def travel_times_to(self, location_index: int) -> np.ndarray:
+        """Travel time from every activity to a matrix index (0 if unknown)."""
+        if location_index < 0:
+            return np.zeros(len(self.activities))
+        column = self.distances.values[:, location_index]
+        return np.where(self.known, column[self.matrix_index], 0).astype(float)
+
+    def feasibility_mask(
+        self,
+        current_time: float,
+        end_time: float,
+        travel: np.ndarray,
+        positions: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Vectorized `is_activity_feasible` for all activities (or only `positions`)."""
+        opening, closing, duration, return_times = self.opening, self.closing, self.duration, self.return_times
+        if positions is not None:
+            opening, closing = opening[positions], closing[positions]
+            duration, return_times = duration[positions], return_times[positions]
+        arrival = current_time + travel
+        actual_start = np.maximum(arrival, opening)
+        finish = actual_start + duration
+        return (
+            (actual_start < closing)
+            & (finish <= closing)
+            & (finish + return_times <= end_time)
+        )
+
+    def rejection_counts(
+        self,
+        current_time: float,
+        end_time: float,
+        travel: np.ndarray,
+        positions: np.ndarray
+    ) -> Dict[str, int]:
+        """Infeasible candidates among `positions`, by the first check they fail."""
+        arrival = current_time + travel
+        actual_start = np.maximum(arrival, self.opening[positions])
+        finish = actual_start + self.duration[positions]
+        closing = self.closing[positions]
+        closed = actual_start >= closing
+        cannot_finish = ~closed & (finish > closing)
+        cannot_return = ~closed & ~cannot_finish & (finish + self.return_times[positions] > end_time)
+        return {
+            "closed": int(closed.sum()),
+            "cannot_finish": int(cannot_finish.sum()),
+            "cannot_return": int(cannot_return.sum())
+        }
+
+    def composite_scores(
+        self,
+        current_time: float,
+        travel: np.ndarray,
+        cumulative_vector: np.ndarray,
+        alpha: float = 1.0,
+        beta: float = 0.4,
+        gamma: float = 0.5,
+        delta: float = 0.2,
+        positions: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Vectorized `calculate_composite_score` for all activities (or only `positions`)."""
+        interests, interest_norms = self.interests, self.interest_norms
+        opening, rec_scores = self.opening, self.rec_scores
+        if positions is not None:
+            interests, interest_norms = interests[positions], interest_norms[positions]
+            opening, rec_scores = opening[positions], rec_scores[positions]
+
+        travel_penalty = np.minimum(travel / MAX_TRAVEL, 1.0)
+
+        similarity_penalty = np.zeros(len(interests))
+        cumulative_norm = np.linalg.norm(cumulative_vector)
+        if cumulative_norm > 0:
+            nonzero = interest_norms > 0
+            dots = interests @ cumulative_vector
+            similarity_penalty[nonzero] = np.maximum(
+                0, dots[nonzero] / (interest_norms[nonzero] * cumulative_norm)
+            )
+
+        wait_time = np.maximum(0, opening - (current_time + travel))
+        timing_bonus = 1.0 - np.minimum(wait_time / MAX_WAIT, 1.0)
+
+        return (
+            alpha * rec_scores
+            - beta * travel_penalty
+            - gamma * similarity_penalty
+            + delta * timing_bonus
+        )
+
+    def feasible_candidates(
+        self,
+        current_time: float,
+        end_time: float,
+        location_index: int,
+        cumulative_vector: np.ndarray,
+        alpha: float = 1.0,
+        beta: float = 0.4,
+        gamma: float = 0.5,
+        delta: float = 0.2,
+        instrumentation: Optional[Instrumentation] = None
+    ) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Feasible candidates for the next greedy step and their composite scores.
+
+        With `instrumentation`, counts the candidates evaluated and the
+        rejections by reason (see REJECTION_REASONS), including the ones
+        pruned by the time window index ("expired").
+
+        Returns:
+            (positions in `activities`, composite scores, travel times) or None
+        """
+        with phase(instrumentation, "candidate_filtering"):
+            # Only candidates whose time window has not passed yet
+            if (
+                self.time_windows is None
+                or self.time_windows.end_time != end_time
+                or current_time < self.time_windows.current_time
+            ):
+                self.time_windows = TimeWindowIndex(
+                    self.opening, self.closing, self.duration, self.return_times, end_time
+                )
+            live = self.time_windows.expire(current_time)
+            positions = np.flatnonzero(self.available & live)
+            mask = None
+            if len(positions):
+                travel = self.travel_times_from(location_index)[positions]
+                mask = self.feasibility_mask(current_time, end_time, travel, positions)
+            if instrumentation is not None:
+                instrumentation.count("candidates_evaluated", len(positions))
+                rejected = {"expired": np.count_nonzero(self.available & ~live)}
+                if mask is not None:
+                    rejected.update(self.rejection_counts(current_time, end_time, travel, positions))
+                for reason in REJECTION_REASONS:
+                    instrumentation.count(f"rejected_{reason}", rejected.get(reason, 0))
+            if mask is None or not mask.any():
+                return None
+
+        with phase(instrumentation, "composite_scoring"):
+            candidates = np.flatnonzero(mask)
+            scores = self.composite_scores(
+                current_time, travel, cumulative_vector, alpha, beta, gamma, delta, positions
+            )[candidates]
+        return positions[candidates], scores, travel[candidates]
+
+    def select_best(
+        self,
+        current_time: float,
+        end_time: float,
+        location_index: int,
+        cumulative_vector: np.ndarray,
+        alpha: float = 1.0,
+        beta: float = 0.4,
+        gamma: float = 0.5,
+        delta: float = 0.2,
+        instrumentation: Optional[Instrumentation] = None
+    ) -> Optional[Tuple[int, float, float]]:
+        """
+        Pick the best feasible candidate for the next greedy step.
+
+        Returns:
+            (position in `activities`, composite score, travel time) or None
+        """
+        feasible = self.feasible_candidates(
+            current_time, end_time, location_index, cumulative_vector,
+            alpha, beta, gamma, delta, instrumentation
+        )
+        if feasible is None:
+            return None
+        positions, scores, travel = feasible
+        best = int(np.argmax(scores))
+        return int(positions[best]), float(scores[best]), float(travel[best])
+
+    def exclude(self, activity_ids: Iterable[Any]) -> None:
+        """Permanently remove activities (e.g. already visited ones) from candidates."""
+        excluded = np.isin(self.ids, [str(i) for i in activity_ids])
+        self.selectable &= ~excluded
+        self.available &= ~excluded
+
+    def mark_visited(self, position: int) -> None:
+        """Remove an activity (and any duplicate of its activityId) from candidates."""
+        self.available &= self.ids != self.ids[position]
@@ -1,6 +1,21 @@
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
+import hashlib
 import json
+from instrumentation import Instrumentation, phase
+
+
+INTEREST_KEYS = [
+    "interests.architecture",
+    "interests.landscape",
+    "interests.politic",
+    "interests.history",
+    "interests.courtlife",
+    "interests.art",
+    "interests.engineering",
+    "interests.spirituality",
+    "interests.nature"
+]
 
 
 def extract_interest_vector(activity: Dict[str, Any]) -> np.ndarray:
@@ -13,26 +28,104 @@ def extract_interest_vector(activity: Dict[str, Any]) -> np.ndarray:
     Returns:
         Numpy array of interest values
     """
-    interest_keys = [
-        "interests.architecture",
-        "interests.landscape",
-        "interests.politic",
-        "interests.history",
-        "interests.courtlife",
-        "interests.art",
-        "interests.engineering",
-        "interests.spirituality",
-        "interests.nature"
-    ]
-    
-    vector = np.array([activity.get(key, 0) for key in interest_keys], dtype=float)
+    vector = np.array([activity.get(key, 0) for key in INTEREST_KEYS], dtype=float)
     return vector
 
 
+class ActivityCatalog:
+    """
+    Activities with their interest vectors precomputed once at load time.
+    
+    Holds the (N x 9) interest matrix, its row norms and an L2-normalized copy
+    (zero rows stay zero), plus an activityId -> row index lookup.
+    
+    `version` identifies the catalog content (hash of the activities, or of
+    the JSON file it was loaded from) and is used to invalidate caches.
+    """
+    
+    def __init__(
+        self,
+        activities: List[Dict[str, Any]],
+        version: Optional[str] = None,
+        interests: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            activities: Complete list of activities
+            version: Content version (computed from the activities if None)
+            interests: Precomputed (N x 9) interest matrix, e.g. from a data bundle
+        """
+        self._version = version
+        self.activities = activities
+        self.ids = [str(act["activityId"]) for act in activities]
+        self.index = {activity_id: i for i, activity_id in enumerate(self.ids)}
+        
+        if interests is None:
+            interests = np.array(
+                [[act.get(key, 0) for key in INTEREST_KEYS] for act in activities],
+                dtype=float
+            ).reshape(len(activities), len(INTEREST_KEYS))
+        self.interests = np.asarray(interests, dtype=float)
+        self.norms = np.linalg.norm(self.interests, axis=1)
+        
+        self.normalized = np.zeros_like(self.interests)
+        nonzero = self.norms > 0
+        self.normalized[nonzero] = self.interests[nonzero] / self.norms[nonzero, None]
+    
+    @classmethod
+    def from_json(cls, json_path: str) -> "ActivityCatalog":
+        """Load a catalog from an activity JSON file, versioned by its content."""
+        with open(json_path, 'rb') as f:
+            content = f.read()
+        catalog = cls(json.loads(content.decode('utf-8')))
+        catalog._version = hashlib.sha256(content).hexdigest()
+        return catalog
+    
+    @property
+    def version(self) -> str:
+        """Hash of the catalog content."""
+        if self._version is None:
+            canonical = json.dumps(self.activities, sort_keys=True, ensure_ascii=False)
+            self._version = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return self._version
+    
+    def __len__(self) -> int:
+        return len(self.activities)
+    
+    def __contains__(self, activity_id: Any) -> bool:
+        return str(activity_id) in self.index
+    
+    def get(self, activity_id: Any) -> Optional[Dict[str, Any]]:
+        """Return the activity with this activityId, or None."""
+        i = self.index.get(str(activity_id))
+        return None if i is None else self.activities[i]
+    
+    def index_of(self, activity: Dict[str, Any]) -> int:
+        """Return the row of an activity (-1 if it is not in the catalog)."""
+        return self.index.get(str(activity["activityId"]), -1)
+    
+    def vector(self, activity: Dict[str, Any]) -> np.ndarray:
+        """Interest vector of an activity, read from the matrix when possible."""
+        i = self.index_of(activity)
+        if i < 0:
+            return extract_interest_vector(activity)
+        return self.interests[i]
+    
+    def normalized_vector(self, activity: Dict[str, Any]) -> np.ndarray:
+        """L2-normalized interest vector of an activity (zero vector stays zero)."""
+        i = self.index_of(activity)
+        if i >= 0:
+            return self.normalized[i]
+        vector = extract_interest_vector(activity)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
 def build_user_vector(
     likes_dislikes: List[Dict[str, Any]], 
     activities_df: List[Dict[str, Any]],
-    normalize: bool = True
+    normalize: bool = True,
+    catalog: Optional[ActivityCatalog] = None
 ) -> np.ndarray:
     """
     Build a user preference vector from their likes and dislikes.
@@ -43,33 +136,28 @@ def build_user_vector(
         likes_dislikes: List of {activityId, like} objects
         activities_df: Complete list of activities with interest vectors
         normalize: Whether to L2-normalize the resulting vector
+        catalog: Precomputed catalog of `activities_df` (built if None)
         
     Returns:
         User preference vector
     """
-    # Create a lookup dictionary for quick access
-    activity_lookup = {str(act["activityId"]): act for act in activities_df}
-    
-    # Initialize user vector
-    user_vector = np.zeros(9)  # 9 interest dimensions
+    if catalog is None:
+        catalog = ActivityCatalog(activities_df)
     
-    # Process each swipe
+    # Rows and signs of the swiped activities present in the catalog
+    rows = []
+    signs = []
     for swipe in likes_dislikes:
-        activity_id = str(swipe["activityId"])
-        is_like = swipe["like"]
-        
-        # Get the activity
-        if activity_id not in activity_lookup:
+        i = catalog.index.get(str(swipe["activityId"]))
+        if i is None:
             continue
-            
-        activity = activity_lookup[activity_id]
-        activity_vector = extract_interest_vector(activity)
-        
-        # Add or subtract based on like/dislike
-        if is_like:
-            user_vector += activity_vector
-        else:
-            user_vector -= activity_vector
+        rows.append(i)
+        signs.append(1.0 if swipe["like"] else -1.0)
+    
+    # U = Σ(positive activities) - Σ(negative activities)
+    user_vector = np.zeros(len(INTEREST_KEYS))
+    if rows:
+        user_vector = np.asarray(signs) @ catalog.interests[rows]
     
     # Normalize if requested
     if normalize:
@@ -105,7 +193,8 @@ def calculate_activity_score(
     user_vector: np.ndarray,
     negative_activities: List[Dict[str, Any]],
     alpha: float = 1.0,
-    beta: float = 0.5
+    beta: float = 0.5,
+    catalog: Optional[ActivityCatalog] = None
 ) -> float:
     """
     Calculate the recommendation score for a single activity.
@@ -119,34 +208,198 @@ def calculate_activity_score(
         negative_activities: List of disliked activities
         alpha: Weight for positive similarity (default 1.0)
         beta: Penalty for similarity to rejected activities (default 0.5)
+        catalog: Precomputed catalog used to reuse vectors and norms
         
     Returns:
         Recommendation score
     """
-    activity_vector = extract_interest_vector(activity)
+    if catalog is None:
+        activity_vector = extract_interest_vector(activity)
+        
+        # Base score: similarity to user preferences
+        base_score = cosine_similarity(user_vector, activity_vector)
+        
+        # Penalty: similarity to disliked activities
+        penalty = 0.0
+        if negative_activities:
+            max_negative_similarity = max(
+                cosine_similarity(activity_vector, extract_interest_vector(neg_act))
+                for neg_act in negative_activities
+            )
+            penalty = beta * max_negative_similarity
+        
+        return alpha * base_score - penalty
     
-    # Base score: similarity to user preferences
-    base_score = cosine_similarity(user_vector, activity_vector)
+    # Same formula on precomputed normalized vectors
+    activity_unit = catalog.normalized_vector(activity)
+    user_norm = np.linalg.norm(user_vector)
+    base_score = float(activity_unit @ user_vector) / user_norm if user_norm > 0 else 0.0
     
-    # Penalty: similarity to disliked activities
     penalty = 0.0
     if negative_activities:
-        max_negative_similarity = max(
-            cosine_similarity(activity_vector, extract_interest_vector(neg_act))
-            for neg_act in negative_activities
-        )
-        penalty = beta * max_negative_similarity
+        negative_units = np.array([catalog.normalized_vector(neg) for neg in negative_activities])
+        penalty = beta * float(np.max(negative_units @ activity_unit))
     
     return alpha * base_score - penalty
 
 
+def interest_dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Products a · bᵀ over the interest dimensions: (m x D), (n x D) -> (m x n).
+    
+    One matrix multiply: BLAS may round an entry differently depending on
+    how many rows are computed together, so batch and single-user scores
+    agree to ~1e-15, not bit for bit.
+    """
+    return np.asarray(a, dtype=float) @ np.asarray(b, dtype=float).T
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize each row (zero rows stay zero), row by row deterministic."""
+    squares = np.zeros(vectors.shape[0])
+    for d in range(vectors.shape[1]):
+        squares += vectors[:, d] ** 2
+    norms = np.sqrt(squares)
+    
+    normalized = np.zeros_like(vectors, dtype=float)
+    nonzero = norms > 0
+    normalized[nonzero] = vectors[nonzero] / norms[nonzero, None]
+    return normalized
+
+
+def score_user_matrix(
+    user_matrix: np.ndarray,
+    negative_rows: List[List[int]],
+    catalog: ActivityCatalog,
+    alpha: float = 1.0,
+    beta: float = 0.5
+) -> np.ndarray:
+    """
+    Recommendation scores of several users for every activity of the catalog.
+    
+    Score formula:
+    score(c) = α * cos(U, c) - β * max(cos(c, negative_activity))
+    
+    Both terms are computed on normalized vectors: cos(U, C) is one
+    (users x N) matrix product and the max-over-dislikes similarity is an
+    (N x dislikes) product reduced over the dislikes of each user.
+    
+    Args:
+        user_matrix: One user preference vector per row (users x 9)
+        negative_rows: Catalog rows of the disliked activities, per user
+        catalog: Precomputed activity catalog
+        alpha: Weight for positive similarity (default 1.0)
+        beta: Penalty for similarity to rejected activities (default 0.5)
+        
+    Returns:
+        (users x N) array of scores aligned with the catalog rows
+    """
+    # Base score: similarity to user preferences
+    scores = alpha * interest_dot(normalize_rows(user_matrix), catalog.normalized)
+    
+    # Penalty: similarity to disliked activities, computed once per disliked row
+    disliked = sorted({i for rows in negative_rows for i in rows})
+    if disliked:
+        similarities = interest_dot(catalog.normalized, catalog.normalized[disliked])
+        column = {i: k for k, i in enumerate(disliked)}
+        for u, rows in enumerate(negative_rows):
+            if rows:
+                columns = [column[i] for i in rows]
+                scores[u] -= beta * similarities[:, columns].max(axis=1)
+    
+    return scores
+
+
+def score_activities(
+    user_vector: np.ndarray,
+    negative_rows: List[int],
+    catalog: ActivityCatalog,
+    alpha: float = 1.0,
+    beta: float = 0.5
+) -> np.ndarray:
+    """
+    Matrix form of `calculate_activity_score` for every activity of the catalog.
+    
+    Args:
+        user_vector: User preference vector
+        negative_rows: Catalog rows of the disliked activities
+        catalog: Precomputed activity catalog
+        alpha: Weight for positive similarity (default 1.0)
+        beta: Penalty for similarity to rejected activities (default 0.5)
+        
+    Returns:
+        Array of scores aligned with the catalog rows
+    """
+    return score_user_matrix(
+        np.asarray(user_vector, dtype=float)[None, :], [list(negative_rows)],
+        catalog, alpha=alpha, beta=beta
+    )[0]
+
+
+def top_n_indices(scores: np.ndarray, top_n: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the `top_n` highest scores, highest first.
+    
+    Uses `argpartition` so only the selected scores are sorted. Ties keep
+    their original order, like `list.sort(reverse=True)`.
+    """
+    if top_n is None or top_n >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    if top_n <= 0:
+        return np.array([], dtype=np.intp)
+    
+    partition = np.argpartition(-scores, top_n - 1)[:top_n]
+    threshold = scores[partition].min()
+    
+    # Resolve ties on the threshold by original order
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:top_n - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+def catalog_rows(catalog: ActivityCatalog, activities: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+    """Catalog rows of `activities`, or None if some are not in the catalog."""
+    if catalog.activities is activities:
+        return np.arange(len(activities))
+    rows = np.array([catalog.index_of(act) for act in activities], dtype=np.intp)
+    if (rows < 0).any():
+        return None
+    return rows
+
+
+def listed_swipes(
+    likes_dislikes: List[Dict[str, Any]],
+    catalog: ActivityCatalog,
+    rows: np.ndarray
+) -> List[Dict[str, Any]]:
+    """
+    Swipes on the activities at catalog `rows`.
+    
+    Scores only count swipes on the activities being ranked, so a catalog
+    larger than the activity list must not add the other swipes.
+    """
+    listed = np.zeros(len(catalog), dtype=bool)
+    listed[rows] = True
+    if listed.all():
+        return likes_dislikes
+    kept = []
+    for swipe in likes_dislikes:
+        i = catalog.index.get(str(swipe["activityId"]))
+        if i is not None and listed[i]:
+            kept.append(swipe)
+    return kept
+
+
 def recommend_activities(
     likes_dislikes: List[Dict[str, Any]],
     activities_df: List[Dict[str, Any]],
     alpha: float = 1.0,
     beta: float = 0.5,
     exclude_seen: bool = False,
-    top_n: int = None
+    top_n: int = None,
+    catalog: Optional[ActivityCatalog] = None,
+    instrumentation: Optional[Instrumentation] = None
 ) -> List[Dict[str, Any]]:
     """
     Content-based recommendation engine.
@@ -158,61 +411,115 @@ def recommend_activities(
         beta: Penalty weight for similarity to rejected activities (default 0.5)
         exclude_seen: Whether to exclude already swiped activities
         top_n: Return only top N recommendations (None for all)
+        catalog: Precomputed catalog of `activities_df` (built if None)
+        instrumentation: Records the time of each phase (user vector, scoring, ranking)
         
     Returns:
         Sorted list of activities with recommendation scores
     """
-    # Build user preference vector
-    user_vector = build_user_vector(likes_dislikes, activities_df, normalize=True)
-    
-    # Get negative activities for penalty calculation
-    activity_lookup = {str(act["activityId"]): act for act in activities_df}
-    negative_activities = [
-        activity_lookup[str(swipe["activityId"])]
-        for swipe in likes_dislikes
-        if not swipe["like"] and str(swipe["activityId"]) in activity_lookup
-    ]
+    with phase(instrumentation, "recommendation_user_vector"):
+        rows = None if catalog is None else catalog_rows(catalog, activities_df)
+        if rows is None:
+            catalog = ActivityCatalog(activities_df)
+            rows = np.arange(len(activities_df))
+        swipes = likes_dislikes
+        if catalog.activities is not activities_df:
+            swipes = listed_swipes(likes_dislikes, catalog, rows)
+        
+        # Build user preference vector (normalized while scoring)
+        user_vector = build_user_vector(swipes, activities_df, normalize=False, catalog=catalog)
+        
+        # Rows of the disliked activities for the penalty term
+        negative_rows = [
+            catalog.index[str(swipe["activityId"])]
+            for swipe in swipes
+            if not swipe["like"] and swipe["activityId"] in catalog
+        ]
     
-    # Get seen activity IDs
-    seen_ids = {str(swipe["activityId"]) for swipe in likes_dislikes} if exclude_seen else set()
+    # Score all activities in one pass
+    with phase(instrumentation, "recommendation_scoring"):
+        scores = score_activities(user_vector, negative_rows, catalog, alpha=alpha, beta=beta)[rows]
     
-    # Score all activities
-    scored_activities = []
-    for activity in activities_df:
-        activity_id = str(activity["activityId"])
+    with phase(instrumentation, "recommendation_ranking"):
+        # Skip already seen activities if exclude_seen is True
+        positions = np.arange(len(activities_df))
+        if exclude_seen:
+            seen_ids = {str(swipe["activityId"]) for swipe in likes_dislikes}
+            positions = np.array(
+                [i for i, act in enumerate(activities_df) if str(act["activityId"]) not in seen_ids],
+                dtype=np.intp
+            )
         
-        # Skip if already seen and exclude_seen is True
-        if exclude_seen and activity_id in seen_ids:
-            continue
+        # Sort by score (highest first), top N only if specified
+        order = top_n_indices(scores[positions], top_n)
         
-        # Calculate score
-        score = calculate_activity_score(
-            activity, 
-            user_vector, 
-            negative_activities,
-            alpha=alpha,
-            beta=beta
-        )
+        return [
+            {
+                **activities_df[positions[i]],
+                "recommendation_score": float(scores[positions[i]])
+            }
+            for i in order
+        ]
+
+
+def recommend_activities_batch(
+    likes_dislikes_batch: List[List[Dict[str, Any]]],
+    activities_df: List[Dict[str, Any]],
+    alpha: float = 1.0,
+    beta: float = 0.5,
+    catalog: Optional[ActivityCatalog] = None
+) -> np.ndarray:
+    """
+    Recommendation scores for many users at once.
+    
+    The swipes of all users are encoded as a (users x N) matrix of +1/-1
+    counts, so all user vectors come from one product with the interest
+    matrix. Scores use the same formula and code path as
+    `recommend_activities` and match it to rounding (see `interest_dot`).
+    
+    Args:
+        likes_dislikes_batch: One list of {activityId, like} objects per user
+        activities_df: Complete list of activities
+        alpha: Weight for positive similarity (default 1.0)
+        beta: Penalty weight for similarity to rejected activities (default 0.5)
+        catalog: Precomputed catalog of `activities_df` (built if None)
         
-        # Add to results
-        scored_activities.append({
-            **activity,
-            "recommendation_score": score
-        })
+    Returns:
+        (users x activities) array of scores, columns in `activities_df` order
+    """
+    rows = None if catalog is None else catalog_rows(catalog, activities_df)
+    if rows is None:
+        catalog = ActivityCatalog(activities_df)
+        rows = np.arange(len(activities_df))
     
-    # Sort by score (highest first)
-    scored_activities.sort(key=lambda x: x["recommendation_score"], reverse=True)
+    # Swipe matrix and disliked rows per user
+    swipes = np.zeros((len(likes_dislikes_batch), len(catalog)))
+    negative_rows = []
+    for u, likes_dislikes in enumerate(likes_dislikes_batch):
+        if catalog.activities is not activities_df:
+            likes_dislikes = listed_swipes(likes_dislikes, catalog, rows)
+        user_negatives = []
+        for swipe in likes_dislikes:
+            i = catalog.index.get(str(swipe["activityId"]))
+            if i is None:
+                continue
+            if swipe["like"]:
+                swipes[u, i] += 1.0
+            else:
+                swipes[u, i] -= 1.0
+                user_negatives.append(i)
+        negative_rows.append(user_negatives)
     
-    # Return top N if specified
-    if top_n is not None:
-        return scored_activities[:top_n]
+    # U = Σ(positive activities) - Σ(negative activities), for every user
+    user_matrix = swipes @ catalog.interests
     
-    return scored_activities
+    return score_user_matrix(user_matrix, negative_rows, catalog, alpha=alpha, beta=beta)[:, rows]
 
 
 def get_user_interest_profile(
     likes_dislikes: List[Dict[str, Any]],
-    activities_df: List[Dict[str, Any]]
+    activities_df: List[Dict[str, Any]],
+    catalog: Optional[ActivityCatalog] = None
 ) -> Dict[str, float]:
     """
     Get a human-readable interest profile for the user.
@@ -220,11 +527,12 @@ def get_user_interest_profile(
     Args:
         likes_dislikes: List of {activityId, like} objects
         activities_df: Complete list of activities
+        catalog: Precomputed catalog of `activities_df` (built if None)
         
     Returns:
         Dictionary mapping interest names to preference scores
     """
-    user_vector = build_user_vector(likes_dislikes, activities_df, normalize=False)
+    user_vector = build_user_vector(likes_dislikes, activities_df, normalize=False, catalog=catalog)
     
     interest_names = [
         "architecture",
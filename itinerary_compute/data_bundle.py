@@ -0,0 +1,204 @@
+import json
+import mmap
+import struct
+import hashlib
+import numpy as np
+from typing import List, Dict, Any, Optional
+from content_based_interest import ActivityCatalog, INTEREST_KEYS
+from distance_matrix import DistanceMatrix
+
+
+MAGIC = b"VERSBNDL"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+# Layout: MAGIC | uint32 format version | uint64 header length | JSON header |
+# padding | arrays, each aligned on ALIGNMENT bytes. The header lists the
+# dtype, shape and offset of every array.
+PREAMBLE = struct.Struct("<8sIQ")
+
+
+def build_bundle(
+    activities: List[Dict[str, Any]],
+    distances: DistanceMatrix,
+    output_path: str,
+    version: Optional[str] = None
+) -> str:
+    """
+    Compile activities, interest vectors, time windows and the distance matrix
+    into a single binary bundle.
+
+    The distance matrix is re-ordered to follow the activity order, so row i
+    of every array is activity i.
+
+    Args:
+        activities: Complete list of activities
+        distances: Distance matrix (minutes)
+        output_path: Path of the bundle to write
+        version: Bundle version (hash of the content if None)
+
+    Returns:
+        The bundle version
+    """
+    catalog = ActivityCatalog(activities)
+
+    # Distance matrix aligned with the activity order (0 when unknown, like the CSV lookup)
+    index = distances.indices_of(activities)
+    known = index >= 0
+    travel = np.zeros((len(activities), len(activities)), dtype=np.float32)
+    travel[np.ix_(known, known)] = distances.values[np.ix_(index[known], index[known])]
+
+    arrays = {
+        "interests": catalog.interests.astype(np.float64),
+        "opening": np.array([act['openingTime'] * 60 for act in activities], dtype=np.float64),
+        "closing": np.array([act['closingTime'] * 60 for act in activities], dtype=np.float64),
+        "duration": np.array([act['duration'] * 60 for act in activities], dtype=np.float64),
+        "distances": travel,
+        "activities_json": np.frombuffer(
+            json.dumps(activities, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+            dtype=np.uint8
+        )
+    }
+
+    if version is None:
+        digest = hashlib.sha256()
+        for name in sorted(arrays):
+            digest.update(name.encode('utf-8'))
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        version = digest.hexdigest()
+
+    # Offsets are relative to the start of the data section
+    entries = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        entries[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset
+        }
+        offset += array.nbytes
+
+    header = json.dumps({
+        "version": version,
+        "interest_keys": INTEREST_KEYS,
+        "arrays": entries
+    }).encode('utf-8')
+    data_start = -(-(PREAMBLE.size + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    with open(output_path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + entries[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+
+    return version
+
+
+class DataBundle:
+    """
+    Memory-mapped view of a bundle written by `build_bundle`.
+
+    Arrays are read-only views on the mapped file (no parsing, no copy), so
+    worker processes loading the same bundle share its pages. The activity
+    dicts are only decoded when `activities` is first accessed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path of the bundle
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, format_version, header_length = PREAMBLE.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an activity data bundle")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported bundle format version {format_version}")
+
+        header = json.loads(bytes(self.buffer[PREAMBLE.size:PREAMBLE.size + header_length]))
+        if header["interest_keys"] != INTEREST_KEYS:
+            raise ValueError("Bundle interest dimensions do not match INTEREST_KEYS")
+        self.version = header["version"]
+
+        data_start = -(-(PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+        self.arrays = {}
+        for name, entry in header["arrays"].items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"]))
+            self.arrays[name] = np.frombuffer(
+                self.buffer, dtype=dtype, count=count, offset=data_start + entry["offset"]
+            ).reshape(entry["shape"])
+
+        self._activities = None
+        self._catalog = None
+        self._distances = None
+
+    @property
+    def interests(self) -> np.ndarray:
+        return self.arrays["interests"]
+
+    @property
+    def opening(self) -> np.ndarray:
+        """Opening times in minutes since midnight."""
+        return self.arrays["opening"]
+
+    @property
+    def closing(self) -> np.ndarray:
+        """Closing times in minutes since midnight."""
+        return self.arrays["closing"]
+
+    @property
+    def duration(self) -> np.ndarray:
+        """Visit durations in minutes."""
+        return self.arrays["duration"]
+
+    @property
+    def activities(self) -> List[Dict[str, Any]]:
+        """Activity dicts, decoded on first access."""
+        if self._activities is None:
+            self._activities = json.loads(self.arrays["activities_json"].tobytes().decode('utf-8'))
+        return self._activities
+
+    @property
+    def catalog(self) -> ActivityCatalog:
+        """ActivityCatalog over the mapped interest matrix."""
+        if self._catalog is None:
+            self._catalog = ActivityCatalog(self.activities, version=self.version, interests=self.interests)
+        return self._catalog
+
+    @property
+    def distances(self) -> DistanceMatrix:
+        """DistanceMatrix over the mapped travel times, in activity order."""
+        if self._distances is None:
+            activities = self.activities
+            self._distances = DistanceMatrix(
+                [act['name'] for act in activities],
+                self.arrays["distances"],
+                activity_ids=[act['activityId'] for act in activities]
+            )
+        return self._distances
+
+
+def load_bundle(path: str) -> DataBundle:
+    """Map a bundle written by `build_bundle`."""
+    return DataBundle(path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    activities_path = sys.argv[1] if len(sys.argv) > 1 else 'activity_v2.json'
+    distances_path = sys.argv[2] if len(sys.argv) > 2 else 'activity_distances_temp.csv'
+    output_path = sys.argv[3] if len(sys.argv) > 3 else 'activity_data.bundle'
+
+    with open(activities_path, 'r', encoding='utf-8') as f:
+        activities = json.load(f)
+    distances = DistanceMatrix.from_csv(distances_path, activities)
+
+    version = build_bundle(activities, distances, output_path)
+    print(f"Bundle {version[:12]} written to {output_path}")
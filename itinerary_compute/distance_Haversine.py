@@ -1,18 +1,16 @@
-import pandas as pd
 import numpy as np
 import json
-import math
+import csv
+from typing import List, Dict, Any, Optional, Sequence
 
-# Charger les données des activités (assurez-vous que vous avez le bon format)
-with open(r'activity_v2.json', 'r', encoding='utf-8') as file:
-    data = json.load(file)
+EARTH_RADIUS_KM = 6371  # Rayon de la Terre en kilomètres
+DEFAULT_WALK_SPEED_KMH = 5  # 5 km/h => 1 km en 12 minutes
 
-# Créer un DataFrame à partir des données des activités
-df = pd.json_normalize(data)
 
 # Fonction pour calculer la distance entre deux coordonnées via la formule de Haversine
+# (fonctionne aussi sur des tableaux numpy, par broadcasting)
 def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Rayon de la Terre en kilomètres
+    R = EARTH_RADIUS_KM
     phi1, phi2 = np.radians(lat1), np.radians(lat2)
     delta_phi = np.radians(lat2 - lat1)
     delta_lambda = np.radians(lon2 - lon1)
@@ -22,26 +20,91 @@ def haversine(lat1, lon1, lat2, lon2):
     distance = R * c  # distance en kilomètres
     return distance
 
-# Calculer la matrice de distances (en kilomètres) entre toutes les paires d'activités
-dist_matrix = np.zeros((len(df), len(df)))  # Matrice de distances en kilomètres
 
-for i, row_i in df.iterrows():
-    for j, row_j in df.iterrows():
-        if i != j:
-            lat1, lon1 = row_i['latitude'], row_i['longitude']
-            lat2, lon2 = row_j['latitude'], row_j['longitude']
-            
-            # Calculer la distance entre les deux points
-            dist_matrix[i, j] = haversine(lat1, lon1, lat2, lon2)
+def haversine_matrix(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    chunk_size: Optional[int] = None,
+    dtype: Any = np.float64
+) -> np.ndarray:
+    """
+    Matrice des distances (km) entre toutes les paires de points, par broadcasting.
 
-# Convertir la matrice de distances en minutes à pied (en supposant 5 km/h comme vitesse de marche)
-# 5 km/h => 1 km en 12 minutes
-dist_matrix_walk = dist_matrix * 12  # Conversion en minutes à pied
+    :param latitudes: Latitudes des N points
+    :param longitudes: Longitudes des N points
+    :param chunk_size: Nombre de lignes calculées à la fois (None = tout d'un coup),
+        pour borner la mémoire des tableaux intermédiaires quand N est grand
+    :param dtype: Type de la matrice retournée
+    :return: Matrice N x N des distances en kilomètres
+    """
+    lat = np.asarray(latitudes, dtype=np.float64)
+    lon = np.asarray(longitudes, dtype=np.float64)
+    n = len(lat)
+    step = n if not chunk_size else chunk_size
 
-# Créer un DataFrame pour afficher les distances à pied entre toutes les activités
-dist_df_walk = pd.DataFrame(dist_matrix_walk, columns=df['name'], index=df['name'])
+    dist_matrix = np.empty((n, n), dtype=dtype)
+    for start in range(0, n, max(step, 1)):
+        stop = min(start + step, n)
+        dist_matrix[start:stop] = haversine(
+            lat[start:stop, None], lon[start:stop, None], lat[None, :], lon[None, :]
+        )
+    np.fill_diagonal(dist_matrix, 0)
+    return dist_matrix
 
-# Sauvegarder la matrice de distances dans un fichier CSV
-dist_df_walk.to_csv(r'activity_distances_temp.csv', encoding='utf-8')
 
-print("Matrice de distances enregistrée sous versailles/activity_distances_temp.csv")
+def walking_time_matrix(
+    latitudes: Sequence[float],
+    longitudes: Sequence[float],
+    speed_kmh: float = DEFAULT_WALK_SPEED_KMH,
+    chunk_size: Optional[int] = None,
+    dtype: Any = np.float64
+) -> np.ndarray:
+    """
+    Matrice des temps de marche (minutes) entre toutes les paires de points.
+
+    :param speed_kmh: Vitesse de marche en km/h (5 km/h par défaut)
+    :return: Matrice N x N des temps de marche en minutes
+    """
+    dist_matrix = haversine_matrix(latitudes, longitudes, chunk_size=chunk_size, dtype=dtype)
+    dist_matrix *= 60 / speed_kmh  # Conversion en minutes à pied
+    return dist_matrix
+
+
+def write_distance_csv(path: str, names: List[str], matrix: np.ndarray) -> None:
+    """
+    Écrit la matrice au format CSV lu par `itinerary_builder.load_distance_matrix`
+    (en-tête `name,<noms...>`, une ligne par activité).
+    """
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['name'] + list(names))
+        for name, row in zip(names, matrix):
+            writer.writerow([name] + [repr(float(v)) for v in row])
+
+
+def build_walking_matrix(
+    activities: List[Dict[str, Any]],
+    speed_kmh: float = DEFAULT_WALK_SPEED_KMH,
+    chunk_size: Optional[int] = None
+) -> np.ndarray:
+    """Temps de marche (minutes) entre toutes les activités, dans l'ordre de la liste."""
+    return walking_time_matrix(
+        [act['latitude'] for act in activities],
+        [act['longitude'] for act in activities],
+        speed_kmh=speed_kmh,
+        chunk_size=chunk_size
+    )
+
+
+if __name__ == "__main__":
+    # Charger les données des activités (assurez-vous que vous avez le bon format)
+    with open(r'activity_v2.json', 'r', encoding='utf-8') as file:
+        data = json.load(file)
+
+    # Calculer la matrice des temps de marche entre toutes les paires d'activités
+    dist_matrix_walk = build_walking_matrix(data, speed_kmh=DEFAULT_WALK_SPEED_KMH)
+
+    # Sauvegarder la matrice de distances dans un fichier CSV
+    write_distance_csv(r'activity_distances_temp.csv', [act['name'] for act in data], dist_matrix_walk)
+
+    print("Matrice de distances enregistrée sous versailles/activity_distances_temp.csv")
@@ -0,0 +1,224 @@
+import os
+import json
+import time
+import logging
+import random
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Callable, Tuple, Protocol
+from distance_Haversine import haversine, DEFAULT_WALK_SPEED_KMH
+from distance_matrix import DistanceMatrix
+
+logger = logging.getLogger(__name__)
+
+
+Coordinates = Tuple[float, float]
+
+
+class TravelTimeProvider(Protocol):
+    """Source of walking times between two points (e.g. a routing API)."""
+
+    def travel_time(self, origin: Coordinates, destination: Coordinates) -> Optional[float]:
+        """Walking time in minutes, None if there is no route. May raise on transient errors."""
+        ...
+
+
+class HaversineProvider:
+    """Local stub provider: straight-line walking time, no network."""
+
+    def __init__(self, speed_kmh: float = DEFAULT_WALK_SPEED_KMH):
+        self.speed_kmh = speed_kmh
+
+    def travel_time(self, origin: Coordinates, destination: Coordinates) -> Optional[float]:
+        distance = haversine(origin[0], origin[1], destination[0], destination[1])
+        return float(distance * 60 / self.speed_kmh)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at most `rate_per_second` apart."""
+
+    def __init__(
+        self,
+        rate_per_second: Optional[float],
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            rate_per_second: Maximum call rate (None for no limit)
+            clock: Time source, in seconds
+            sleep: Sleep function
+        """
+        self.interval = 1.0 / rate_per_second if rate_per_second else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self) -> None:
+        """Block until the next call slot."""
+        if not self.interval:
+            return
+        with self.lock:
+            now = self.clock()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+class CheckpointLog:
+    """
+    Append-only JSON-lines log of fetched travel times.
+
+    One line per pair, `{"from": name, "to": name, "minutes": float|null}`,
+    flushed as soon as it is fetched, so an interrupted ingestion resumes
+    from the last written pair. A truncated last line is dropped on load so
+    that the next record starts on a line of its own.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def load(self) -> Dict[Tuple[str, str], Optional[float]]:
+        """Pairs already fetched, (from name, to name) -> minutes."""
+        done = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, 'rb+') as f:
+            content = f.read()
+            complete = content.rfind(b'\n') + 1
+            if complete < len(content):
+                f.truncate(complete)
+        for line in content[:complete].decode('utf-8').splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done[(record["from"], record["to"])] = record["minutes"]
+        return done
+
+    def append(self, from_name: str, to_name: str, minutes: Optional[float]) -> None:
+        record = json.dumps({"from": from_name, "to": to_name, "minutes": minutes}, ensure_ascii=False)
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(record + '\n')
+                f.flush()
+
+
+def fetch_with_retry(
+    provider: TravelTimeProvider,
+    origin: Coordinates,
+    destination: Coordinates,
+    rate_limiter: RateLimiter,
+    retries: int = 3,
+    backoff_seconds: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep
+) -> Optional[float]:
+    """
+    Call the provider, retrying transient errors with exponential backoff and jitter.
+
+    Raises the last error once `retries` attempts have failed.
+    """
+    for attempt in range(retries):
+        rate_limiter.wait()
+        try:
+            return provider.travel_time(origin, destination)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            sleep(backoff_seconds * (2 ** attempt) * (1 + random.random()))
+    return None
+
+
+def ingest_distance_matrix(
+    activities: List[Dict[str, Any]],
+    provider: TravelTimeProvider,
+    checkpoint_path: str,
+    max_workers: int = 8,
+    rate_per_second: Optional[float] = 10,
+    retries: int = 3,
+    backoff_seconds: float = 1.0,
+    symmetric: bool = True,
+    progress: Optional[Callable[[int, int], None]] = None,
+    sleep: Callable[[float], None] = time.sleep
+) -> DistanceMatrix:
+    """
+    Fetch the travel times between all activities from a provider.
+
+    Pairs already in the checkpoint log are not fetched again. With
+    `symmetric`, only one direction of each pair is requested and used for
+    both. Pairs without a route, or still failing after the retries, are
+    left at 0. Failures are reported as warnings on the module logger and
+    not written to the checkpoint, so they are retried on resume.
+
+    Args:
+        activities: Activities (name, latitude, longitude)
+        provider: Travel time provider
+        checkpoint_path: Path of the JSON-lines checkpoint log
+        max_workers: Number of concurrent requests
+        rate_per_second: Maximum request rate over all workers (None for no limit)
+        retries: Attempts per pair
+        backoff_seconds: Initial retry delay, doubled at each attempt
+        symmetric: Assume A -> B and B -> A take the same time
+        progress: Optional callback(done, total)
+        sleep: Sleep function (rate limiting and backoff)
+
+    Returns:
+        DistanceMatrix in activity order (minutes)
+    """
+    names = [act['name'] for act in activities]
+    coordinates = [(act['latitude'], act['longitude']) for act in activities]
+    checkpoint = CheckpointLog(checkpoint_path)
+    done = checkpoint.load()
+
+    def known(i: int, j: int) -> bool:
+        return (names[i], names[j]) in done or (symmetric and (names[j], names[i]) in done)
+
+    n = len(activities)
+    pairs = [
+        (i, j) for i in range(n) for j in range(n)
+        if i != j and (not symmetric or i < j) and not known(i, j)
+    ]
+
+    rate_limiter = RateLimiter(rate_per_second, sleep=sleep)
+
+    def fetch(pair: Tuple[int, int]) -> Optional[float]:
+        # Logged by the worker, so finished pairs survive an interruption
+        i, j = pair
+        minutes = fetch_with_retry(
+            provider, coordinates[i], coordinates[j], rate_limiter,
+            retries=retries, backoff_seconds=backoff_seconds, sleep=sleep
+        )
+        checkpoint.append(names[i], names[j], minutes)
+        return minutes
+
+    completed = 0
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {executor.submit(fetch, pair): pair for pair in pairs}
+        for future in as_completed(futures):
+            i, j = futures[future]
+            completed += 1
+            try:
+                done[(names[i], names[j])] = future.result()
+            except Exception as e:
+                logger.warning("Erreur pour %s -> %s: %s", names[i], names[j], e)
+            if progress is not None:
+                progress(completed, len(pairs))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    values = np.zeros((n, n), dtype=np.float32)
+    index = {name: i for i, name in enumerate(names)}
+    for (from_name, to_name), minutes in done.items():
+        i, j = index.get(from_name), index.get(to_name)
+        if i is None or j is None or minutes is None:
+            continue
+        values[i, j] = minutes
+        if symmetric and (to_name, from_name) not in done:
+            values[j, i] = minutes
+
+    return DistanceMatrix(names, values, activity_ids=[act['activityId'] for act in activities])
@@ -0,0 +1,189 @@
+import numpy as np
+import csv
+import hashlib
+from typing import List, Dict, Any, Optional, Union, Iterable
+
+
+class DistanceMatrix:
+    """
+    Dense travel-time matrix (minutes) with a name / activityId -> index table.
+
+    The values are stored once as a contiguous float32 array so that the
+    itinerary builder can look up travel times with integer indices instead
+    of two string-keyed dict lookups.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        values: np.ndarray,
+        activity_ids: Optional[Iterable[Any]] = None,
+        dtype: Any = np.float32
+    ):
+        """
+        Args:
+            names: Activity names, in row/column order
+            values: Square matrix of travel times in minutes
+            activity_ids: Optional activityIds aligned with `names`
+            dtype: Storage dtype of the matrix (default float32)
+        """
+        self._version = None
+        self.names = list(names)
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+        if self.values.shape != (len(self.names), len(self.names)):
+            raise ValueError(
+                f"Distance matrix shape {self.values.shape} does not match "
+                f"{len(self.names)} names"
+            )
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.id_index: Dict[str, int] = {}
+        if activity_ids is not None:
+            self.id_index = {
+                str(activity_id): i
+                for i, activity_id in enumerate(activity_ids)
+                if activity_id is not None
+            }
+
+    @classmethod
+    def from_csv(
+        cls,
+        csv_path: str,
+        activities: Optional[List[Dict[str, Any]]] = None
+    ) -> "DistanceMatrix":
+        """
+        Load the matrix from the `name,<activity names...>` CSV layout.
+
+        Args:
+            csv_path: Path to the distance CSV
+            activities: Optional activity list used to map activityIds
+
+        Returns:
+            DistanceMatrix
+        """
+        # pandas is only needed here: bundle and service start-up do not load it
+        import pandas as pd
+
+        # Header with the csv module (quoted names), body with the C parser of
+        # pandas straight into an array: no Python object per cell
+        with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+            columns = next(csv.reader(f))[1:]
+            frame = pd.read_csv(f, header=None, index_col=0, dtype={0: str}, na_filter=False)
+        # A repeated row name keeps its last row, like the dict loader
+        frame = frame[~frame.index.duplicated(keep='last')]
+
+        # Rows are re-ordered to follow the column order so the matrix is square
+        values = np.zeros((len(columns), len(columns)), dtype=np.float32)
+        rows = frame.index.get_indexer(columns)
+        known = rows >= 0
+        values[known] = frame.to_numpy(np.float32)[rows[known]]
+
+        matrix = cls(columns, values)
+        if activities is not None:
+            matrix.bind_activities(activities)
+        return matrix
+
+    @classmethod
+    def from_dict(
+        cls,
+        distances: Dict[str, Dict[str, float]],
+        activities: Optional[List[Dict[str, Any]]] = None
+    ) -> "DistanceMatrix":
+        """
+        Build the matrix from the nested dict returned by `load_distance_matrix`.
+
+        Missing pairs are stored as 0, matching `distances.get(a, {}).get(b, 0)`.
+        """
+        names = list(distances.keys())
+        known = set(names)
+        for row in distances.values():
+            for name in row:
+                if name not in known:
+                    names.append(name)
+                    known.add(name)
+
+        index = {name: i for i, name in enumerate(names)}
+        values = np.zeros((len(names), len(names)), dtype=np.float32)
+        for from_name, row in distances.items():
+            i = index[from_name]
+            for to_name, travel_time in row.items():
+                values[i, index[to_name]] = travel_time
+
+        matrix = cls(names, values)
+        if activities is not None:
+            matrix.bind_activities(activities)
+        return matrix
+
+    @property
+    def version(self) -> str:
+        """Hash of the activity names and travel times."""
+        if self._version is None:
+            digest = hashlib.sha256()
+            digest.update('\n'.join(self.names).encode('utf-8'))
+            digest.update(self.values.tobytes())
+            self._version = digest.hexdigest()
+        return self._version
+
+    def bind_activities(self, activities: List[Dict[str, Any]]) -> "DistanceMatrix":
+        """Map activityIds to matrix indices by matching activity names."""
+        for activity in activities:
+            i = self.index.get(activity['name'])
+            if i is not None:
+                self.id_index[str(activity['activityId'])] = i
+        return self
+
+    def index_of(self, key: Any) -> int:
+        """Return the index of an activity name or activityId (-1 if unknown)."""
+        i = self.index.get(key)
+        if i is None:
+            i = self.id_index.get(str(key), -1)
+        return i
+
+    def indices_of(self, activities: List[Dict[str, Any]]) -> np.ndarray:
+        """Return the matrix indices of a list of activities (-1 if unknown)."""
+        index = self.index
+        return np.array(
+            [index[act['name']] if act['name'] in index else self.index_of(act['name']) for act in activities],
+            dtype=np.intp
+        )
+
+    def travel_time(self, from_key: Any, to_key: Any) -> float:
+        """Travel time in minutes between two activities (0 if unknown)."""
+        i = self.index_of(from_key)
+        j = self.index_of(to_key)
+        if i < 0 or j < 0:
+            return 0.0
+        return float(self.values[i, j])
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Convert back to the nested dict layout of `load_distance_matrix`."""
+        return {
+            from_name: {to_name: float(v) for to_name, v in zip(self.names, row)}
+            for from_name, row in zip(self.names, self.values)
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, key: Any) -> bool:
+        return self.index_of(key) >= 0
+
+
+def get_travel_time(
+    distances: Union[DistanceMatrix, Dict[str, Dict[str, float]]],
+    from_key: str,
+    to_key: str
+) -> float:
+    """Travel time lookup working on both a DistanceMatrix and the nested dict."""
+    if isinstance(distances, DistanceMatrix):
+        return distances.travel_time(from_key, to_key)
+    return distances.get(from_key, {}).get(to_key, 0)
+
+
+def as_distance_matrix(
+    distances: Union[DistanceMatrix, Dict[str, Dict[str, float]]],
+    activities: Optional[List[Dict[str, Any]]] = None
+) -> DistanceMatrix:
+    """Return `distances` as a DistanceMatrix, converting the nested dict if needed."""
+    if isinstance(distances, DistanceMatrix):
+        return distances
+    return DistanceMatrix.from_dict(distances, activities)
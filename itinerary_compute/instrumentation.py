@@ -0,0 +1,65 @@
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Any, Optional, Callable, Iterator
+
+# Reasons a candidate is rejected, counted as "rejected_<reason>": pruned by the
+# time window index, then the first feasibility check it fails (see is_activity_feasible)
+REJECTION_REASONS = ("expired", "closed", "cannot_finish", "cannot_return")
+
+# Shared no-op context, so disabled instrumentation costs one attribute lookup per phase
+NO_PHASE = nullcontext()
+
+
+class Instrumentation:
+    """
+    Opt-in per-phase wall times and counters for one request.
+
+    Pass an instance to `build_itinerary` (or `recommend_activities`) to get
+    the time spent in each phase and the greedy counters in
+    `stats["instrumentation"]`; an optional hook is called with
+    (phase, milliseconds) as each phase ends, e.g. to feed a metrics system.
+    Without an instance nothing is measured or counted.
+    """
+
+    def __init__(
+        self,
+        hook: Optional[Callable[[str, float], None]] = None,
+        clock: Callable[[], float] = time.perf_counter
+    ):
+        """
+        Args:
+            hook: Called with (phase name, elapsed milliseconds) after each phase
+            clock: Time source, in seconds
+        """
+        self.hook = hook
+        self.clock = clock
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Time a block; repeated phases accumulate."""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            elapsed = (self.clock() - start) * 1000
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self.hook is not None:
+                self.hook(name, elapsed)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Add `amount` to a counter."""
+        self.counters[name] = self.counters.get(name, 0) + int(amount)
+
+    def report(self) -> Dict[str, Any]:
+        """Phase times (milliseconds) and counters."""
+        return {
+            "phases_ms": dict(self.phases),
+            "counters": dict(self.counters)
+        }
+
+
+def phase(instrumentation: Optional[Instrumentation], name: str):
+    """`instrumentation.phase(name)`, or a no-op context when instrumentation is off."""
+    return NO_PHASE if instrumentation is None else instrumentation.phase(name)
@@ -1,7 +1,15 @@
 import numpy as np
 import csv
-from typing import List, Dict, Any, Optional
-from content_based_interest import extract_interest_vector, cosine_similarity, recommend_activities
+from typing import List, Dict, Any, Optional, Union, Tuple, Callable
+from content_based_interest import ActivityCatalog, extract_interest_vector, cosine_similarity, recommend_activities
+from distance_matrix import DistanceMatrix, as_distance_matrix, get_travel_time
+from candidate_engine import CandidateEngine
+from route_optimizer import RouteOptimizer
+from cache import RecommendationCache, ItineraryCache, itinerary_request_key
+from mobility import MobilityProfile, mobility_view
+from instrumentation import Instrumentation, phase
+
+Distances = Union[DistanceMatrix, Dict[str, Dict[str, float]]]
 
 
 def load_distance_matrix(csv_path: str) -> Dict[str, Dict[str, float]]:
@@ -15,6 +23,14 @@ def load_distance_matrix(csv_path: str) -> Dict[str, Dict[str, float]]:
     return distances
 
 
+def load_distance_matrix_dense(
+    csv_path: str,
+    activities: Optional[List[Dict[str, Any]]] = None
+) -> DistanceMatrix:
+    """Load distance matrix from CSV file as a dense, index-based DistanceMatrix."""
+    return DistanceMatrix.from_csv(csv_path, activities)
+
+
 def time_to_minutes(time_str: str) -> float:
     """Convert HH:MM to minutes since midnight."""
     hours, minutes = map(int, time_str.split(':'))
@@ -33,11 +49,11 @@ def is_activity_feasible(
     current_time: float,
     end_time: float,
     current_location: str,
-    distances: Dict[str, Dict[str, float]],
+    distances: Distances,
     return_point: str = "La Statue de Louis XIV"
 ) -> bool:
     """Check if activity is feasible given time constraints."""
-    travel_time = distances.get(current_location, {}).get(activity['name'], 0)
+    travel_time = get_travel_time(distances, current_location, activity['name'])
     arrival_time = current_time + travel_time
     
     opening_time = activity['openingTime'] * 60
@@ -55,7 +71,7 @@ def is_activity_feasible(
         return False
     
     # Check if we can return in time
-    return_time = distances.get(activity['name'], {}).get(return_point, 0)
+    return_time = get_travel_time(distances, activity['name'], return_point)
     if finish_time + return_time > end_time:
         return False
     
@@ -67,27 +83,33 @@ def calculate_composite_score(
     current_time: float,
     current_location: str,
     cumulative_vector: np.ndarray,
-    distances: Dict[str, Dict[str, float]],
+    distances: Distances,
     rec_scores: Dict[str, float],
     alpha: float = 1.0,
     beta: float = 0.4,
     gamma: float = 0.5,
-    delta: float = 0.2
+    delta: float = 0.2,
+    catalog: Optional[ActivityCatalog] = None
 ) -> float:
     """Calculate composite score for activity selection."""
     # Base recommendation score
     rec_score = rec_scores.get(str(activity['activityId']), 0)
     
     # Normalize travel time penalty
-    travel_time = distances.get(current_location, {}).get(activity['name'], 0)
+    travel_time = get_travel_time(distances, current_location, activity['name'])
     max_travel = 35  # max reasonable travel time
     travel_penalty = min(travel_time / max_travel, 1.0)
     
     # Similarity penalty to visited activities
-    activity_vector = extract_interest_vector(activity)
     similarity_penalty = 0.0
-    if np.linalg.norm(cumulative_vector) > 0:
-        similarity_penalty = max(0, cosine_similarity(activity_vector, cumulative_vector))
+    cumulative_norm = np.linalg.norm(cumulative_vector)
+    if cumulative_norm > 0:
+        if catalog is not None:
+            activity_unit = catalog.normalized_vector(activity)
+            similarity_penalty = max(0, float(activity_unit @ cumulative_vector) / cumulative_norm)
+        else:
+            activity_vector = extract_interest_vector(activity)
+            similarity_penalty = max(0, cosine_similarity(activity_vector, cumulative_vector))
     
     # Timing bonus
     arrival_time = current_time + travel_time
@@ -108,7 +130,7 @@ def calculate_composite_score(
 def build_itinerary(
     likes_dislikes: List[Dict[str, Any]],
     activities: List[Dict[str, Any]],
-    distances: Dict[str, Dict[str, float]],
+    distances: Distances,
     start_time: str,
     end_time: str,
     start_point: str = "La Statue de Louis XIV",
@@ -116,103 +138,274 @@ def build_itinerary(
     alpha: float = 1.0,
     beta: float = 0.4,
     gamma: float = 0.5,
-    delta: float = 0.2
+    delta: float = 0.2,
+    catalog: Optional[ActivityCatalog] = None,
+    solver: str = "greedy",
+    time_budget_ms: float = 50,
+    recommendation_cache: Optional[RecommendationCache] = None,
+    result_cache: Optional[ItineraryCache] = None,
+    mobility: Union[str, MobilityProfile, None] = None,
+    accessibility_detour: Optional[np.ndarray] = None,
+    instrumentation: Optional[Instrumentation] = None
 ) -> Dict[str, Any]:
     """
     Build optimized itinerary using greedy algorithm with composite scoring.
     
+    With solver="local_search" the greedy route is then improved as an
+    orienteering problem with time windows (see route_optimizer), keeping the
+    best route found within `time_budget_ms`.
+    
     Args:
         likes_dislikes: User swipe data
         activities: List of all activities
-        distances: Distance matrix (minutes)
+        distances: Distance matrix (minutes), DistanceMatrix or nested dict
         start_time: Departure time (HH:MM)
         end_time: Return time (HH:MM)
         start_point: Starting location
         max_activities: Maximum number of activities
         alpha, beta, gamma, delta: Score weights
+        catalog: Precomputed ActivityCatalog of `activities` (built if None)
+        solver: "greedy" or "local_search"
+        time_budget_ms: Local search time budget in milliseconds
+        recommendation_cache: Memoizes recommendation scores by swipe set
+        result_cache: Caches whole results by canonical request key
+        mobility: Mobility profile or its name (see mobility.PROFILES)
+        accessibility_detour: Step-free detour matrix, for the wheelchair profile
+        instrumentation: Records the time of each phase (setup, recommendation,
+            greedy with its candidate filtering and composite scoring, local
+            search, assembly), the greedy iterations, the candidates evaluated
+            and the rejections by reason, returned in `stats["instrumentation"]`
     
     Returns:
         Complete itinerary with timing and statistics
     """
+    with phase(instrumentation, "setup"):
+        if catalog is None:
+            catalog = ActivityCatalog(activities)
+        
+        # Index-based distance lookups, scaled for the visitor's mobility (no copy)
+        matrix = mobility_view(as_distance_matrix(distances, activities), mobility, accessibility_detour)
+    
+    # Identical requests return the cached itinerary
+    if result_cache is not None:
+        request_key = itinerary_request_key(
+            likes_dislikes, catalog.version, matrix.version,
+            time_to_minutes(start_time), time_to_minutes(end_time),
+            start_point=start_point, max_activities=max_activities,
+            alpha=alpha, beta=beta, gamma=gamma, delta=delta,
+            solver=solver, time_budget_ms=time_budget_ms if solver != "greedy" else None
+        )
+        cached = result_cache.get(request_key)
+        if instrumentation is not None:
+            instrumentation.count("itinerary_cache_hits", cached is not None)
+        if cached is not None:
+            return with_instrumentation(cached, instrumentation)
+    
     # Get recommendation scores
-    scored_activities = recommend_activities(likes_dislikes, activities, exclude_seen=True)
-    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
+    with phase(instrumentation, "recommendation"):
+        recommend = recommendation_cache.recommend if recommendation_cache is not None else recommend_activities
+        scored_activities = recommend(
+            likes_dislikes, activities, exclude_seen=True, catalog=catalog, instrumentation=instrumentation
+        )
+        rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
     
     # Initialize state
-    current_time = time_to_minutes(start_time)
+    start_time_min = time_to_minutes(start_time)
     end_time_min = time_to_minutes(end_time)
-    current_location = start_point
-    visited = set()
-    cumulative_vector = np.zeros(9)
     itinerary = []
     
     # Add starting point
     itinerary.append({
         "order": 0,
         "activity_name": start_point,
-        "arrival_time": minutes_to_time(current_time),
-        "departure_time": minutes_to_time(current_time),
+        "arrival_time": minutes_to_time(start_time_min),
+        "departure_time": minutes_to_time(start_time_min),
         "duration": 0,
         "waiting_time": 0,
         "travel_time_from_previous": 0
     })
     
+    # Batched candidate scoring: one NumPy pass per greedy step
+    with phase(instrumentation, "candidate_setup"):
+        engine = CandidateEngine(scored_activities, matrix, rec_scores, start_point, catalog)
+    
     # Greedy selection loop
-    while len(visited) < max_activities:
-        # Filter candidates
-        candidates = [
-            act for act in scored_activities
-            if str(act['activityId']) not in visited
-            and act['name'] != start_point
-            and is_activity_feasible(act, current_time, end_time_min, current_location, distances, start_point)
-        ]
-        
-        if not candidates:
-            break
+    with phase(instrumentation, "greedy"):
+        route, route_scores = greedy_route(
+            engine, start_time_min, end_time_min, matrix.index_of(start_point), max_activities,
+            alpha, beta, gamma, delta, instrumentation=instrumentation
+        )
+    
+    # Improve the greedy route with local search within the time budget
+    solver_stats = None
+    if solver == "local_search":
+        with phase(instrumentation, "local_search"):
+            optimizer = RouteOptimizer(
+                engine, start_time_min, end_time_min, max_activities,
+                alpha, beta, gamma, delta
+            )
+            result = optimizer.optimize(route, time_budget_ms)
+        route, route_scores = result.route, result.scores
+        solver_stats = result.stats()
+    elif solver != "greedy":
+        raise ValueError(f"Unknown solver: {solver}")
+    
+    # Build itinerary steps along the route
+    with phase(instrumentation, "assembly"):
+        current_time, current_location = append_route_steps(
+            itinerary, [engine.activities[p] for p in route], route_scores,
+            start_time_min, start_point, matrix, rec_scores
+        )
         
-        # Score all candidates
-        scored_candidates = []
-        for candidate in candidates:
-            score = calculate_composite_score(
-                candidate, current_time, current_location, cumulative_vector,
-                distances, rec_scores, alpha, beta, gamma, delta
+        result = complete_itinerary(
+            itinerary, start_time, current_time, current_location, start_point,
+            matrix, len(route), {"solver": solver_stats} if solver_stats is not None else None
+        )
+    if result_cache is not None:
+        result_cache.put(request_key, result)
+    return with_instrumentation(result, instrumentation)
+
+
+def greedy_route(
+    engine: CandidateEngine,
+    start_time: float,
+    end_time: float,
+    start_index: int,
+    max_activities: int,
+    alpha: float = 1.0,
+    beta: float = 0.4,
+    gamma: float = 0.5,
+    delta: float = 0.2,
+    choose: Optional[Callable[[int, np.ndarray, np.ndarray], int]] = None,
+    instrumentation: Optional[Instrumentation] = None
+) -> Tuple[List[int], List[float]]:
+    """
+    Greedy route construction: add the best feasible candidate until none fits.
+    
+    Args:
+        engine: Candidate engine (its visited activities are updated)
+        start_time, end_time: Departure and return times (minutes since midnight)
+        start_index: Matrix index of the start point
+        max_activities: Maximum number of activities
+        alpha, beta, gamma, delta: Score weights
+        choose: Picks the next stop instead of the best score, called with
+            (step, candidate positions, composite scores); returns an index
+            into these arrays (see multi_start)
+        instrumentation: Counts the greedy iterations and candidate checks
+    
+    Returns:
+        (positions in `engine.activities`, composite score of each stop)
+    """
+    current_time = start_time
+    current_index = start_index
+    cumulative_vector = np.zeros(9)
+    route = []
+    route_scores = []
+    
+    while len(route) < max_activities:
+        if instrumentation is not None:
+            instrumentation.count("greedy_iterations")
+        if choose is None:
+            best = engine.select_best(
+                current_time, end_time, current_index, cumulative_vector,
+                alpha, beta, gamma, delta, instrumentation
+            )
+        else:
+            feasible = engine.feasible_candidates(
+                current_time, end_time, current_index, cumulative_vector,
+                alpha, beta, gamma, delta, instrumentation
             )
-            scored_candidates.append((candidate, score))
+            best = None
+            if feasible is not None:
+                positions, scores, travel = feasible
+                k = choose(len(route), positions, scores)
+                best = int(positions[k]), float(scores[k]), float(travel[k])
         
-        # Select best
-        best_activity, best_score = max(scored_candidates, key=lambda x: x[1])
+        if best is None:
+            break
+        
+        position, best_score, travel_time = best
+        route.append(position)
+        route_scores.append(best_score)
         
         # Update state
-        travel_time = distances.get(current_location, {}).get(best_activity['name'], 0)
+        engine.mark_visited(position)
+        cumulative_vector += engine.interests[position]
+        current_index = engine.distances.index_of(engine.activities[position]['name'])
+        arrival_time = current_time + travel_time
+        current_time = max(arrival_time, engine.opening[position]) + engine.duration[position]
+    
+    return route, route_scores
+
+
+def with_instrumentation(result: Dict[str, Any], instrumentation: Optional[Instrumentation]) -> Dict[str, Any]:
+    """
+    The result with the instrumentation report in its stats.
+    
+    A shallow copy is returned, so cached results never carry the report
+    of the request that built them.
+    """
+    if instrumentation is None:
+        return result
+    return {**result, "stats": {**result["stats"], "instrumentation": instrumentation.report()}}
+
+
+def append_route_steps(
+    itinerary: List[Dict[str, Any]],
+    route: List[Dict[str, Any]],
+    route_scores: List[float],
+    current_time: float,
+    current_location: str,
+    distances: DistanceMatrix,
+    rec_scores: Dict[str, float]
+) -> Tuple[float, str]:
+    """
+    Append the timed steps of `route` to `itinerary`.
+    
+    Returns:
+        Time (minutes) and location after the last activity
+    """
+    for activity, score in zip(route, route_scores):
+        travel_time = distances.travel_time(current_location, activity['name'])
         arrival_time = current_time + travel_time
-        opening_time = best_activity['openingTime'] * 60
+        opening_time = activity['openingTime'] * 60
         actual_start = max(arrival_time, opening_time)
         waiting_time = max(0, opening_time - arrival_time)
-        duration = best_activity['duration'] * 60
+        duration = activity['duration'] * 60
         departure_time = actual_start + duration
         
-        # Add to itinerary
         itinerary.append({
             "order": len(itinerary),
-            "activity_id": best_activity['activityId'],
-            "activity_name": best_activity['name'],
+            "activity_id": activity['activityId'],
+            "activity_name": activity['name'],
             "arrival_time": minutes_to_time(arrival_time),
             "departure_time": minutes_to_time(departure_time),
             "duration": duration,
             "waiting_time": waiting_time,
             "travel_time_from_previous": travel_time,
-            "composite_score": best_score,
-            "recommendation_score": rec_scores.get(str(best_activity['activityId']), 0)
+            "composite_score": score,
+            "recommendation_score": rec_scores.get(str(activity['activityId']), 0)
         })
         
-        # Update state
-        visited.add(str(best_activity['activityId']))
-        cumulative_vector += extract_interest_vector(best_activity)
-        current_location = best_activity['name']
+        current_location = activity['name']
         current_time = departure_time
     
+    return current_time, current_location
+
+
+def complete_itinerary(
+    itinerary: List[Dict[str, Any]],
+    start_time: str,
+    current_time: float,
+    current_location: str,
+    start_point: str,
+    distances: DistanceMatrix,
+    total_activities: int,
+    extra_stats: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Add the return to the start point and compute the itinerary statistics."""
     # Add return
-    return_travel = distances.get(current_location, {}).get(start_point, 0)
+    return_travel = distances.travel_time(current_location, start_point)
     final_arrival = current_time + return_travel
     
     itinerary.append({
@@ -230,28 +423,174 @@ def build_itinerary(
     total_visit = sum(step['duration'] for step in itinerary)
     total_waiting = sum(step['waiting_time'] for step in itinerary)
     
+    stats = {
+        "total_travel_time": total_travel,
+        "total_visit_time": total_visit,
+        "total_waiting_time": total_waiting
+    }
+    if extra_stats:
+        stats.update(extra_stats)
+    
     return {
         "departure_time": start_time,
         "arrival_time": minutes_to_time(final_arrival),
         "total_duration": final_arrival - time_to_minutes(start_time),
-        "total_activities": len(visited),
+        "total_activities": total_activities,
         "itinerary": itinerary,
-        "stats": {
-            "total_travel_time": total_travel,
-            "total_visit_time": total_visit,
-            "total_waiting_time": total_waiting
-        }
+        "stats": stats
+    }
+
+
+def replan_itinerary(
+    itinerary: Dict[str, Any],
+    completed: int,
+    current_time: str,
+    activities: List[Dict[str, Any]],
+    distances: Distances,
+    end_time: str,
+    likes_dislikes: Optional[List[Dict[str, Any]]] = None,
+    rec_scores: Optional[Dict[str, float]] = None,
+    current_location: Optional[str] = None,
+    start_point: str = "La Statue de Louis XIV",
+    max_activities: int = 10,
+    alpha: float = 1.0,
+    beta: float = 0.4,
+    gamma: float = 0.5,
+    delta: float = 0.2,
+    catalog: Optional[ActivityCatalog] = None,
+    cumulative_vector: Optional[np.ndarray] = None,
+    time_budget_ms: float = 20,
+    recommendation_cache: Optional[RecommendationCache] = None,
+    mobility: Union[str, MobilityProfile, None] = None,
+    accessibility_detour: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Repair the remainder of an itinerary for a visitor already at activity k.
+    
+    The first `completed` activities are kept as they are. Planned stops that
+    no longer fit from the current position and time are dropped, then
+    unvisited activities are inserted where they fit best. Recommendation
+    scores and the cumulative interest vector are reused rather than
+    recomputed when given.
+    
+    Args:
+        itinerary: Result of `build_itinerary` (or of a previous re-plan)
+        completed: Number of activities already done (k)
+        current_time: Current time (HH:MM)
+        activities: List of all activities
+        distances: Distance matrix (minutes), DistanceMatrix or nested dict
+        end_time: Return time (HH:MM)
+        likes_dislikes: User swipe data, used only if `rec_scores` is None
+        rec_scores: Cached recommendation score per activityId
+        current_location: Current location (default: the k-th activity)
+        start_point: Starting and return location
+        max_activities: Maximum number of activities of the whole itinerary
+        alpha, beta, gamma, delta: Score weights
+        catalog: Precomputed ActivityCatalog of `activities` (built if None)
+        cumulative_vector: Sum of the interest vectors of the completed activities
+        time_budget_ms: Time budget for inserting new stops, in milliseconds
+        recommendation_cache: Memoizes recommendation scores by swipe set
+        mobility: Mobility profile or its name (see mobility.PROFILES)
+        accessibility_detour: Step-free detour matrix, for the wheelchair profile
+    
+    Returns:
+        Complete itinerary with timing and statistics
+    
+    Raises:
+        ValueError: If `itinerary` is not shaped like a `build_itinerary`
+            result, or `completed` is not between 0 and its number of activities
+    """
+    steps = itinerary.get('itinerary') if isinstance(itinerary, dict) else None
+    if (
+        not isinstance(steps, list) or len(steps) < 2
+        or 'departure_time' not in itinerary
+        or itinerary.get('total_activities', len(steps) - 2) != len(steps) - 2
+        or not all(isinstance(step, dict) and 'activity_name' in step for step in steps)
+        or not all('activity_id' in step for step in steps[1:-1])
+    ):
+        raise ValueError("itinerary must be a build_itinerary result")
+    total_activities = len(steps) - 2
+    if not isinstance(completed, int) or not 0 <= completed <= total_activities:
+        raise ValueError(f"completed must be between 0 and {total_activities}, got {completed!r}")
+    
+    if catalog is None:
+        catalog = ActivityCatalog(activities)
+    
+    # Reuse cached recommendation scores when available
+    if rec_scores is None:
+        if likes_dislikes is None:
+            raise ValueError("replan_itinerary needs rec_scores or likes_dislikes")
+        recommend = recommendation_cache.recommend if recommendation_cache is not None else recommend_activities
+        scored_activities = recommend(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+        rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
+    ranked = sorted((activity_id for activity_id in rec_scores if activity_id in catalog.index),
+                    key=rec_scores.get, reverse=True)
+    candidates = [catalog.activities[catalog.index[activity_id]] for activity_id in ranked]
+    
+    matrix = mobility_view(as_distance_matrix(distances, activities), mobility, accessibility_detour)
+    
+    # Split the itinerary: start point and completed stops, then the planned suffix
+    done = [dict(step) for step in steps[:completed + 1]]
+    planned = steps[completed + 1:-1]
+    if current_location is None:
+        current_location = done[-1]['activity_name']
+    done_ids = [str(step['activity_id']) for step in done[1:]]
+    
+    if cumulative_vector is None:
+        cumulative_vector = np.zeros(9)
+        for activity_id in done_ids:
+            if activity_id in catalog:
+                cumulative_vector = cumulative_vector + catalog.vector(catalog.get(activity_id))
+    
+    engine = CandidateEngine(candidates, matrix, rec_scores, start_point, catalog)
+    engine.exclude(done_ids)
+    optimizer = RouteOptimizer(
+        engine, time_to_minutes(current_time), time_to_minutes(end_time),
+        max(0, max_activities - len(done_ids)), alpha, beta, gamma, delta,
+        start_index=matrix.index_of(current_location),
+        initial_vector=cumulative_vector
+    )
+    
+    # Drop planned stops that no longer fit, then insert new ones
+    planned_ids = [str(step['activity_id']) for step in planned]
+    matches = np.flatnonzero(np.isin(engine.ids, planned_ids))
+    position_of = dict(zip(engine.ids[matches].tolist(), matches.tolist()))
+    remaining = [position_of[activity_id] for activity_id in planned_ids if activity_id in position_of]
+    route = optimizer.repair(remaining)
+    result = optimizer.fill(route, time_budget_ms)
+    
+    current_time_min, current_location = append_route_steps(
+        done, [engine.activities[p] for p in result.route], result.scores,
+        time_to_minutes(current_time), current_location, matrix, rec_scores
+    )
+    
+    replan_stats = {
+        "completed": len(done_ids),
+        "kept": len(route),
+        "dropped": len(remaining) - len(route),
+        "inserted": len(result.route) - len(route)
     }
+    return complete_itinerary(
+        done, itinerary['departure_time'], current_time_min, current_location, start_point,
+        matrix, len(done_ids) + len(result.route), {"replan": replan_stats}
+    )
 
 
 if __name__ == "__main__":
+    import os
     import json
     
-    # Load data
-    distances = load_distance_matrix('../activity_distances_temp.csv')
-    
-    with open('../src/assets/data/activity_v2.json', 'r', encoding='utf-8') as f:
-        activities = json.load(f)
+    # Load data: precompiled bundle when available (see data_bundle.py)
+    catalog = None
+    if os.path.exists('activity_data.bundle'):
+        from data_bundle import load_bundle
+        bundle = load_bundle('activity_data.bundle')
+        activities, distances, catalog = bundle.activities, bundle.distances, bundle.catalog
+    else:
+        with open('../src/assets/data/activity_v2.json', 'r', encoding='utf-8') as f:
+            activities = json.load(f)
+        
+        distances = load_distance_matrix_dense('../activity_distances_temp.csv', activities)
 
     with open('../jb_visit.json', 'r', encoding='utf-8') as f:
         likes_dislikes = json.load(f)
@@ -269,7 +608,8 @@ if __name__ == "__main__":
         alpha=1.0,
         beta=0.1,
         gamma=0.5,
-        delta=0.2
+        delta=0.2,
+        catalog=catalog
     )
     
     # Display results
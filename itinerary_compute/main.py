@@ -1,39 +1,373 @@
-from itinerary_builder import build_itinerary
-from typing import Dict, Any
+import os
+import re
+import sys
+import json
+import asyncio
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, TypedDict
+from itinerary_builder import build_itinerary, time_to_minutes
+from content_based_interest import ActivityCatalog
+from distance_matrix import DistanceMatrix
+from cache import RecommendationCache
+from mobility import PROFILES
+
+
+DEFAULT_BUNDLE = 'activity_data.bundle'
+DEFAULT_ACTIVITIES = 'activity_v2.json'
+DEFAULT_DISTANCES = 'activity_distances_temp.csv'
+MAX_BODY_BYTES = 1 << 20
 
 
 # Input schema
-class InputSchema(Dict[str, Any]):
+class InputSchema(TypedDict, total=False):
     likes_dislikes: List[Dict[str, Any]]
     start_time: str
     end_time: str
-    start_point: str = "La Statue de Louis XIV"
-    max_activities: int = 50
-    alpha: float = 1.0
-    beta: float = 0.4
-    gamma: float = 0.5
-    delta: float = 0.2
-
-class OutputSchema(Dict[str, Any]):
+    start_point: str
+    max_activities: int
+    alpha: float
+    beta: float
+    gamma: float
+    delta: float
+    solver: str
+    time_budget_ms: float
+    mobility: Optional[str]
+
+
+class OutputSchema(TypedDict):
+    departure_time: str
+    arrival_time: str
+    total_duration: float
+    total_activities: int
     itinerary: List[Dict[str, Any]]
     stats: Dict[str, Any]
 
 
-def main(input: InputSchema) -> OutputSchema:
+INPUT_DEFAULTS: Dict[str, Any] = {
+    "start_point": "La Statue de Louis XIV",
+    "max_activities": 50,
+    "alpha": 1.0,
+    "beta": 0.4,
+    "gamma": 0.5,
+    "delta": 0.2,
+    "solver": "greedy",
+    "time_budget_ms": 50,
+    "mobility": None
+}
+REQUIRED_FIELDS = ("likes_dislikes", "start_time", "end_time")
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})")
+
+
+class InvalidInput(ValueError):
+    """Request that does not match InputSchema."""
+
+
+def validate_input(payload: Any, start_points: Optional[set] = None) -> InputSchema:
+    """
+    Check a request against InputSchema and fill in the defaults.
+
+    Args:
+        payload: Decoded JSON request
+        start_points: Known locations, to check `start_point` (not checked if None)
+
+    Returns:
+        The request with every InputSchema field
+
+    Raises:
+        InvalidInput: On a missing, unknown or badly typed field
+    """
+    if not isinstance(payload, dict):
+        raise InvalidInput("request must be a JSON object")
+    unknown = set(payload) - set(InputSchema.__annotations__)
+    if unknown:
+        raise InvalidInput(f"unknown fields: {', '.join(sorted(unknown))}")
+    missing = [field for field in REQUIRED_FIELDS if field not in payload]
+    if missing:
+        raise InvalidInput(f"missing fields: {', '.join(missing)}")
+    request = {**INPUT_DEFAULTS, **payload}
 
-    
+    swipes = request["likes_dislikes"]
+    if not isinstance(swipes, list) or not all(
+        isinstance(swipe, dict) and "activityId" in swipe and isinstance(swipe.get("like"), bool)
+        for swipe in swipes
+    ):
+        raise InvalidInput("likes_dislikes must be a list of {activityId, like} objects")
 
+    for field in ("start_time", "end_time"):
+        match = TIME_PATTERN.fullmatch(request[field]) if isinstance(request[field], str) else None
+        # 00:00 to 23:59, plus 24:00 for the end of the day
+        if match is None or int(match[2]) > 59 or int(match[1]) * 60 + int(match[2]) > 24 * 60:
+            raise InvalidInput(f"{field} must be a HH:MM time")
+    if time_to_minutes(request["end_time"]) <= time_to_minutes(request["start_time"]):
+        raise InvalidInput("end_time must be after start_time")
 
+    if not isinstance(request["start_point"], str):
+        raise InvalidInput("start_point must be a string")
+    if start_points is not None and request["start_point"] not in start_points:
+        raise InvalidInput(f"unknown start_point: {request['start_point']}")
+    max_activities = request["max_activities"]
+    if isinstance(max_activities, bool) or not isinstance(max_activities, int) or max_activities < 0:
+        raise InvalidInput("max_activities must be a non-negative integer")
+    for field in ("alpha", "beta", "gamma", "delta", "time_budget_ms"):
+        value = request[field]
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise InvalidInput(f"{field} must be a number")
+    if request["time_budget_ms"] < 0:
+        raise InvalidInput("time_budget_ms must be non-negative")
+    if request["solver"] not in ("greedy", "local_search"):
+        raise InvalidInput("solver must be 'greedy' or 'local_search'")
+    if request["mobility"] is not None and request["mobility"] not in PROFILES:
+        raise InvalidInput(f"mobility must be one of: {', '.join(PROFILES)}")
+    if PROFILES.get(request["mobility"], PROFILES["default"]).accessible_only:
+        raise InvalidInput(f"mobility profile '{request['mobility']}' needs the walking graph, not served yet")
+    return request
 
-    result = build_itinerary(
-        likes_dislikes=likes_dislikes,
+
+def load_data(
+    bundle_path: str = DEFAULT_BUNDLE,
+    activities_path: str = DEFAULT_ACTIVITIES,
+    distances_path: str = DEFAULT_DISTANCES
+) -> Tuple[List[Dict[str, Any]], DistanceMatrix, ActivityCatalog]:
+    """Activities, distance matrix and catalog: from the bundle when it exists (mmap, shared pages)."""
+    if bundle_path and os.path.exists(bundle_path):
+        from data_bundle import load_bundle
+        bundle = load_bundle(bundle_path)
+        return bundle.activities, bundle.distances, bundle.catalog
+    # Versioned by the hash of the JSON file: no re-serialization of the activities
+    catalog = ActivityCatalog.from_json(activities_path)
+    return catalog.activities, DistanceMatrix.from_csv(distances_path, catalog.activities), catalog
+
+
+# Data of a worker process, loaded once by `init_worker`
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(bundle_path: str, activities_path: str, distances_path: str) -> None:
+    """Process pool initializer: load the data once per worker."""
+    activities, distances, catalog = load_data(bundle_path, activities_path, distances_path)
+    _worker.update(
         activities=activities,
         distances=distances,
-        max_activities=100,
-        start_time="09:00",
-        end_time="18:00",
-        alpha=1.0,
-        beta=0.1,
-        gamma=0.5,
-        delta=0.2
-    )
\ No newline at end of file
+        catalog=catalog,
+        recommendation_cache=RecommendationCache()
+    )
+
+
+def worker_ready() -> int:
+    """No-op task, used to start the workers before serving."""
+    return os.getpid()
+
+
+def main(input: InputSchema) -> OutputSchema:
+    """Build the itinerary of a validated request, in a worker process."""
+    return build_itinerary(
+        likes_dislikes=input["likes_dislikes"],
+        activities=_worker["activities"],
+        distances=_worker["distances"],
+        start_time=input["start_time"],
+        end_time=input["end_time"],
+        start_point=input["start_point"],
+        max_activities=input["max_activities"],
+        alpha=input["alpha"],
+        beta=input["beta"],
+        gamma=input["gamma"],
+        delta=input["delta"],
+        catalog=_worker["catalog"],
+        solver=input["solver"],
+        time_budget_ms=input["time_budget_ms"],
+        recommendation_cache=_worker["recommendation_cache"],
+        mobility=input["mobility"]
+    )
+
+
+class ItineraryService:
+    """
+    Long-lived itinerary service.
+
+    The data is loaded once at startup (by this process, for validation, and
+    by every worker), and the CPU-bound `build_itinerary` calls run on a
+    process pool so the event loop keeps accepting requests.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        bundle_path: str = DEFAULT_BUNDLE,
+        activities_path: str = DEFAULT_ACTIVITIES,
+        distances_path: str = DEFAULT_DISTANCES
+    ):
+        """
+        Args:
+            workers: Number of worker processes (number of CPUs if None)
+            bundle_path: Precompiled data bundle, used when it exists
+            activities_path, distances_path: JSON catalog and CSV matrix otherwise
+        """
+        _, distances, _ = load_data(bundle_path, activities_path, distances_path)
+        self.start_points = set(distances.names)
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(bundle_path, activities_path, distances_path)
+        )
+
+    async def start(self) -> None:
+        """Start every worker (and load its data) before serving."""
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, worker_ready) for _ in range(self.workers)))
+
+    async def handle(self, payload: Any) -> OutputSchema:
+        """Validate a request and build its itinerary on the pool."""
+        request = validate_input(payload, self.start_points)
+        return await asyncio.get_running_loop().run_in_executor(self.pool, main, request)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve_stdio(service: ItineraryService) -> None:
+    """
+    JSON-lines protocol on stdin/stdout.
+
+    Each line is an InputSchema object, with an optional "id" echoed in the
+    response; responses are written as soon as they are ready, possibly out
+    of order: {"id", "result"} or {"id", "error"}.
+    """
+    loop = asyncio.get_running_loop()
+    write_lock = asyncio.Lock()
+
+    async def respond(line: bytes) -> None:
+        request_id = None
+        try:
+            payload = json.loads(line)
+            if isinstance(payload, dict):
+                request_id = payload.pop("id", None)
+            response = {"id": request_id, "result": await service.handle(payload)}
+        except (json.JSONDecodeError, InvalidInput) as error:
+            response = {"id": request_id, "error": str(error)}
+        except Exception as error:
+            response = {"id": request_id, "error": f"internal error: {error}"}
+        async with write_lock:
+            sys.stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+
+    tasks = set()
+    while True:
+        # Blocking reads in a thread: stdin may be a pipe, a file or a terminal
+        line = await loop.run_in_executor(None, sys.stdin.buffer.readline)
+        if not line:
+            break
+        if not line.strip():
+            continue
+        task = asyncio.create_task(respond(line))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+async def handle_http(service: ItineraryService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Minimal HTTP/1.1 with keep-alive: POST /itinerary (InputSchema body), GET /health.
+    """
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode('latin-1').split()
+            except ValueError:
+                break
+            headers = {}
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode('latin-1').partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = headers.get("content-length", "0") or "0"
+            length = int(length) if length.isascii() and length.isdigit() else -1
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+
+            # Without a valid length the body cannot be framed: answer and close
+            if length < 0:
+                status, body, keep_alive = 400, {"error": "invalid Content-Length"}, False
+            elif length > MAX_BODY_BYTES:
+                status, body, keep_alive = 413, {"error": "request too large"}, False
+            else:
+                data = await reader.readexactly(length) if length else b""
+                status, body = await http_response(service, method, path, data)
+
+            content = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            writer.write(
+                f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + content
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def http_response(service: ItineraryService, method: str, path: str, data: bytes) -> Tuple[int, Any]:
+    """Status code and JSON body of one HTTP request."""
+    path = path.split("?", 1)[0]
+    if path == "/health":
+        return 200, {"status": "ok", "workers": service.workers}
+    if path != "/itinerary":
+        return 404, {"error": "not found"}
+    if method != "POST":
+        return 405, {"error": "use POST"}
+    try:
+        return 200, await service.handle(json.loads(data))
+    except (json.JSONDecodeError, UnicodeDecodeError, InvalidInput) as error:
+        return 400, {"error": str(error)}
+    except Exception as error:
+        return 500, {"error": f"internal error: {error}"}
+
+
+async def run(args: argparse.Namespace) -> None:
+    service = ItineraryService(args.workers, args.bundle, args.activities, args.distances)
+    try:
+        await service.start()
+        if args.mode == "stdio":
+            await serve_stdio(service)
+            return
+        server = await asyncio.start_server(
+            lambda reader, writer: handle_http(service, reader, writer), args.host, args.port
+        )
+        print(f"Service d'itinéraires sur http://{args.host}:{args.port} ({service.workers} processus)",
+              file=sys.stderr, flush=True)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Service de calcul d'itinéraires")
+    parser.add_argument("--mode", choices=("http", "stdio"), default="http",
+                        help="Serveur HTTP, ou lignes JSON sur stdin/stdout")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="Nombre de processus de calcul (par défaut : nombre de CPU)")
+    parser.add_argument("--bundle", default=DEFAULT_BUNDLE, help="Bundle de données précompilé (utilisé s'il existe)")
+    parser.add_argument("--activities", default=DEFAULT_ACTIVITIES, help="Catalogue JSON des activités")
+    parser.add_argument("--distances", default=DEFAULT_DISTANCES, help="Matrice des distances CSV")
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
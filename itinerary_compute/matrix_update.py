@@ -0,0 +1,222 @@
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable, NamedTuple
+from distance_Haversine import haversine, DEFAULT_WALK_SPEED_KMH, write_distance_csv
+from distance_matrix import DistanceMatrix
+from distance_ingestion import TravelTimeProvider, RateLimiter, fetch_with_retry
+
+
+# (origins, destinations) -> matrice len(origins) x len(destinations) en minutes
+PairTimes = Callable[[List[Dict[str, Any]], List[Dict[str, Any]]], np.ndarray]
+
+
+class CatalogDiff(NamedTuple):
+    """Activity ids added, moved (coordinates changed), removed and unchanged."""
+    added: List[str]
+    moved: List[str]
+    removed: List[str]
+    unchanged: List[str]
+
+
+def diff_catalog(
+    previous_activities: List[Dict[str, Any]],
+    activities: List[Dict[str, Any]]
+) -> CatalogDiff:
+    """Compare two activity lists by activityId and coordinates."""
+    previous = {str(act['activityId']): act for act in previous_activities}
+    current = {str(act['activityId']): act for act in activities}
+
+    added, moved, unchanged = [], [], []
+    for activity_id, act in current.items():
+        old = previous.get(activity_id)
+        if old is None:
+            added.append(activity_id)
+        elif (old['latitude'], old['longitude']) != (act['latitude'], act['longitude']):
+            moved.append(activity_id)
+        else:
+            unchanged.append(activity_id)
+    removed = [activity_id for activity_id in previous if activity_id not in current]
+    return CatalogDiff(added, moved, removed, unchanged)
+
+
+def haversine_pair_times(speed_kmh: float = DEFAULT_WALK_SPEED_KMH) -> PairTimes:
+    """Straight-line walking times, as in `distance_Haversine`."""
+    def pair_times(origins, destinations):
+        lat1 = np.array([act['latitude'] for act in origins], dtype=np.float64)
+        lon1 = np.array([act['longitude'] for act in origins], dtype=np.float64)
+        lat2 = np.array([act['latitude'] for act in destinations], dtype=np.float64)
+        lon2 = np.array([act['longitude'] for act in destinations], dtype=np.float64)
+        return haversine(lat1[:, None], lon1[:, None], lat2[None, :], lon2[None, :]) * 60 / speed_kmh
+    return pair_times
+
+
+def provider_pair_times(
+    provider: TravelTimeProvider,
+    max_workers: int = 8,
+    rate_per_second: Optional[float] = 10,
+    retries: int = 3
+) -> PairTimes:
+    """Travel times fetched from a provider (0 when there is no route)."""
+    rate_limiter = RateLimiter(rate_per_second)
+
+    def pair_times(origins, destinations):
+        pairs = [
+            ((o['latitude'], o['longitude']), (d['latitude'], d['longitude']))
+            for o in origins for d in destinations
+        ]
+
+        def fetch(pair):
+            if pair[0] == pair[1]:
+                return 0.0
+            minutes = fetch_with_retry(provider, pair[0], pair[1], rate_limiter, retries=retries)
+            return minutes if minutes is not None else 0.0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            values = list(executor.map(fetch, pairs))
+        return np.array(values, dtype=np.float64).reshape(len(origins), len(destinations))
+    return pair_times
+
+
+def update_distance_matrix(
+    previous: DistanceMatrix,
+    previous_activities: List[Dict[str, Any]],
+    activities: List[Dict[str, Any]],
+    pair_times: PairTimes,
+    symmetric: bool = False
+) -> DistanceMatrix:
+    """
+    New matrix for `activities`, recomputing only the rows and columns of
+    added or moved activities; the other travel times are copied from
+    `previous` (matched by activityId, so renamed activities keep theirs).
+
+    Args:
+        previous: Matrix built for `previous_activities`
+        previous_activities: Activity list the previous matrix was built from
+        activities: New activity list
+        pair_times: Travel time function for the recomputed pairs
+        symmetric: Compute only the rows and mirror them into the columns
+
+    Returns:
+        DistanceMatrix in the order of `activities`
+    """
+    diff = diff_catalog(previous_activities, activities)
+    # Previous index of each activityId, matched by name like bind_activities
+    # but without binding `previous` itself
+    previous_index = dict(previous.id_index)
+    for activity in previous_activities:
+        i = previous.index.get(activity['name'])
+        if i is not None:
+            previous_index[str(activity['activityId'])] = i
+
+    ids = [str(act['activityId']) for act in activities]
+    position = {activity_id: i for i, activity_id in enumerate(ids)}
+    values = np.zeros((len(activities), len(activities)), dtype=np.float32)
+
+    # Unchanged block copied from the previous matrix
+    kept = [activity_id for activity_id in diff.unchanged if activity_id in previous_index]
+    kept_new = np.array([position[activity_id] for activity_id in kept], dtype=np.intp)
+    kept_old = np.array([previous_index[activity_id] for activity_id in kept], dtype=np.intp)
+    values[np.ix_(kept_new, kept_new)] = previous.values[np.ix_(kept_old, kept_old)]
+
+    # Rows/columns to recompute (including unchanged activities missing from the matrix)
+    kept_set = set(kept)
+    changed_ids = [activity_id for activity_id in ids if activity_id not in kept_set]
+    if changed_ids:
+        changed = np.array([position[activity_id] for activity_id in changed_ids], dtype=np.intp)
+        changed_activities = [activities[i] for i in changed]
+        values[changed, :] = pair_times(changed_activities, activities)
+        if symmetric:
+            values[:, changed] = values[changed, :].T
+        else:
+            others = np.setdiff1d(np.arange(len(activities)), changed)
+            if len(others):
+                values[np.ix_(others, changed)] = pair_times([activities[i] for i in others], changed_activities)
+        np.fill_diagonal(values, 0)
+
+    return DistanceMatrix(
+        [act['name'] for act in activities],
+        values,
+        activity_ids=ids
+    )
+
+
+def manifest_path_for(csv_path: str) -> str:
+    """Manifest stored next to a distance CSV."""
+    return os.path.splitext(csv_path)[0] + '.manifest.json'
+
+
+def write_matrix(
+    csv_path: str,
+    matrix: DistanceMatrix,
+    activities: List[Dict[str, Any]],
+    previous_version: Optional[str] = None
+) -> str:
+    """
+    Write the CSV and its manifest (version and the activityId / coordinates
+    it was built from, needed by the next incremental update).
+
+    Returns:
+        The matrix version
+    """
+    write_distance_csv(csv_path, matrix.names, matrix.values)
+    manifest = {
+        "version": matrix.version,
+        "previous_version": previous_version,
+        "activities": [
+            {
+                "activityId": act['activityId'],
+                "name": act['name'],
+                "latitude": act['latitude'],
+                "longitude": act['longitude']
+            }
+            for act in activities
+        ]
+    }
+    with open(manifest_path_for(csv_path), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return matrix.version
+
+
+def load_previous_activities(
+    csv_path: str,
+    activities: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Activities the matrix at `csv_path` was built from, read from its manifest.
+
+    Without a manifest, activities whose name is in the CSV are assumed
+    unchanged (moves cannot be detected) and the others are treated as new.
+    """
+    manifest_path = manifest_path_for(csv_path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["activities"]
+
+    previous = DistanceMatrix.from_csv(csv_path)
+    return [act for act in activities if act['name'] in previous]
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python matrix_update.py [activités.json] [matrice.csv] [sortie.csv]
+    activities_path = sys.argv[1] if len(sys.argv) > 1 else 'activity_v2.json'
+    csv_path = sys.argv[2] if len(sys.argv) > 2 else 'activity_distances_temp.csv'
+    output_path = sys.argv[3] if len(sys.argv) > 3 else csv_path
+
+    with open(activities_path, 'r', encoding='utf-8') as f:
+        activities = json.load(f)
+
+    previous_activities = load_previous_activities(csv_path, activities)
+    previous = DistanceMatrix.from_csv(csv_path)
+    diff = diff_catalog(previous_activities, activities)
+
+    matrix = update_distance_matrix(previous, previous_activities, activities, haversine_pair_times())
+    version = write_matrix(output_path, matrix, activities, previous_version=previous.version)
+
+    print(
+        f"{len(diff.added)} ajoutée(s), {len(diff.moved)} déplacée(s), {len(diff.removed)} supprimée(s) ; "
+        f"matrice {version[:12]} enregistrée sous {output_path}"
+    )
@@ -0,0 +1,179 @@
+import hashlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Union, NamedTuple
+from distance_Haversine import DEFAULT_WALK_SPEED_KMH
+from distance_matrix import DistanceMatrix
+
+
+class MobilityProfile(NamedTuple):
+    """
+    Visitor mobility: travel times are multiplied by `time_factor`; with
+    `accessible_only`, the step-free detour matrix is added first.
+    """
+    name: str
+    time_factor: float = 1.0
+    accessible_only: bool = False
+
+    @classmethod
+    def from_speed(cls, speed_kmh: float, name: Optional[str] = None) -> "MobilityProfile":
+        """Profile for a walking speed in km/h (the matrices assume DEFAULT_WALK_SPEED_KMH)."""
+        return cls(name or f"speed-{speed_kmh:g}", DEFAULT_WALK_SPEED_KMH / speed_kmh)
+
+
+PROFILES: Dict[str, MobilityProfile] = {
+    "default": MobilityProfile("default", 1.0),
+    "children": MobilityProfile("children", 1.3),
+    "reduced_mobility": MobilityProfile("reduced_mobility", 1.6),
+    "wheelchair": MobilityProfile("wheelchair", 1.3, accessible_only=True)
+}
+
+
+class ScaledValues:
+    """
+    Read-only, lazily scaled view of a travel-time array.
+
+    Indexing returns `(base[key] + detour[key]) * factor` for the requested
+    entries only; the base (and detour) arrays are shared, never copied.
+    """
+
+    def __init__(self, base: np.ndarray, factor: float, detour: Optional[np.ndarray] = None):
+        self.base = base
+        self.factor = factor
+        self.detour = detour
+        self.shape = base.shape
+        self.ndim = base.ndim
+        self.dtype = base.dtype
+
+    def __getitem__(self, key: Any) -> Any:
+        values = self.base[key]
+        if self.detour is not None:
+            values = values + self.detour[key]
+        return values * self.dtype.type(self.factor)
+
+    def __len__(self) -> int:
+        return self.shape[0]
+
+    def __iter__(self):
+        for i in range(self.shape[0]):
+            yield self[i]
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        values = self[...]
+        return values if dtype is None else values.astype(dtype)
+
+
+class MobilityView(DistanceMatrix):
+    """
+    DistanceMatrix for a mobility profile over a shared base matrix.
+
+    Names and index tables are the base matrix's own objects, and `values`
+    is a ScaledValues view, so a view costs O(1) memory whatever the size of
+    the matrix. It can be passed anywhere a DistanceMatrix is expected.
+    """
+
+    def __init__(
+        self,
+        base: DistanceMatrix,
+        profile: MobilityProfile,
+        detour: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            base: Distance matrix at the default walking speed (minutes)
+            profile: Mobility profile
+            detour: Extra minutes per pair on step-free paths (base order),
+                used by profiles with `accessible_only`
+        """
+        if profile.accessible_only and detour is None:
+            raise ValueError(f"Mobility profile '{profile.name}' needs an accessibility detour matrix")
+        self.base = base
+        self.profile = profile
+        self.names = base.names
+        self.index = base.index
+        self.id_index = base.id_index
+        self.detour = detour if profile.accessible_only else None
+        self.values = ScaledValues(base.values, profile.time_factor, self.detour)
+        self._version = None
+
+    @property
+    def version(self) -> str:
+        """Hash of the base matrix version and the profile."""
+        if self._version is None:
+            digest = hashlib.sha256()
+            digest.update(self.base.version.encode('utf-8'))
+            digest.update(repr(tuple(self.profile)).encode('utf-8'))
+            if self.detour is not None:
+                digest.update(np.ascontiguousarray(self.detour).tobytes())
+            self._version = digest.hexdigest()
+        return self._version
+
+
+def get_profile(profile: Union[str, MobilityProfile]) -> MobilityProfile:
+    """Profile by name (see PROFILES), or the profile itself."""
+    if isinstance(profile, MobilityProfile):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown mobility profile: {profile}")
+    return PROFILES[profile]
+
+
+def mobility_view(
+    distances: DistanceMatrix,
+    profile: Union[str, MobilityProfile, None],
+    detour: Optional[np.ndarray] = None
+) -> DistanceMatrix:
+    """
+    Travel times for a mobility profile, as a view over `distances`.
+
+    The default profile (or None) returns `distances` itself, and a view of
+    the same profile and detour matrix is returned as is: callers that keep
+    a view for the data load reuse its `version`, which hashes the detour
+    matrix. Other calls build a new view, which always reads the current
+    values of `distances`.
+    """
+    if profile is None:
+        return distances
+    profile = get_profile(profile)
+    if profile.time_factor == 1.0 and not profile.accessible_only:
+        return distances
+    if not profile.accessible_only:
+        detour = None
+    if isinstance(distances, MobilityView):
+        if distances.profile == profile and distances.detour is detour:
+            return distances
+        distances = distances.base
+    return MobilityView(distances, profile, detour)
+
+
+def accessibility_detour(
+    graph: Any,
+    activities: List[Dict[str, Any]],
+    distances: DistanceMatrix,
+    speed_kmh: float = DEFAULT_WALK_SPEED_KMH
+) -> np.ndarray:
+    """
+    Extra walking minutes per pair when avoiding steps, in `distances` order.
+
+    Computed once from the walking graph (see walking_graph.WalkingGraph):
+    step-free time minus regular time over the graph, inf where no step-free
+    path exists. Pairs of activities missing from `activities` get no detour.
+    """
+    regular = graph.walking_matrix(
+        [act['latitude'] for act in activities],
+        [act['longitude'] for act in activities],
+        speed_kmh=speed_kmh
+    )
+    accessible = graph.walking_matrix(
+        [act['latitude'] for act in activities],
+        [act['longitude'] for act in activities],
+        speed_kmh=speed_kmh,
+        accessible_only=True,
+        fallback_to_haversine=False
+    )
+    extra = np.where(np.isfinite(accessible), np.maximum(accessible - regular, 0), np.inf)
+
+    detour = np.zeros(distances.values.shape, dtype=distances.values.dtype)
+    index = distances.indices_of(activities)
+    known = index >= 0
+    detour[np.ix_(index[known], index[known])] = extra[np.ix_(known, known)]
+    return detour
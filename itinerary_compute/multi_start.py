@@ -0,0 +1,400 @@
+import os
+import random
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Union, Callable, NamedTuple
+from content_based_interest import ActivityCatalog, recommend_activities
+from distance_matrix import DistanceMatrix
+from candidate_engine import CandidateEngine
+from data_bundle import load_bundle
+from itinerary_builder import (
+    time_to_minutes, greedy_route, append_route_steps, complete_itinerary
+)
+
+
+class StartConfig(NamedTuple):
+    """
+    One construction of the multi-start search.
+
+    Weights of the composite score, an optional forced first stop, and the
+    randomized tie-breaking: each step picks uniformly among the candidates
+    whose score is within `tolerance` of the best one (plain greedy at 0).
+    """
+    alpha: float = 1.0
+    beta: float = 0.4
+    gamma: float = 0.5
+    delta: float = 0.2
+    first_stop: Optional[str] = None
+    tolerance: float = 0.0
+    seed: int = 0
+
+
+def start_configs(
+    count: int,
+    alpha: float = 1.0,
+    beta: float = 0.4,
+    gamma: float = 0.5,
+    delta: float = 0.2,
+    first_stops: Optional[List[str]] = None,
+    weight_spread: float = 0.5,
+    tolerance: float = 0.05,
+    seed: int = 0
+) -> List[StartConfig]:
+    """
+    `count` constructions around the given weights.
+
+    The first one is the plain greedy with the given weights, so the best
+    of the search is never worse than `build_itinerary` under the same
+    objective. The others draw each weight log-normally around its value
+    (`weight_spread` is the standard deviation of the log), half of them
+    use randomized tie-breaking, and they cycle over `first_stops`.
+    """
+    rng = random.Random(seed)
+    configs = [StartConfig(alpha, beta, gamma, delta, seed=seed)]
+    first_stops = first_stops or [None]
+    for k in range(1, count):
+        weights = [w * float(np.exp(rng.gauss(0, weight_spread))) for w in (alpha, beta, gamma, delta)]
+        configs.append(StartConfig(
+            *weights,
+            first_stop=first_stops[(k - 1) % len(first_stops)],
+            tolerance=tolerance if k % 2 else 0.0,
+            seed=rng.getrandbits(32)
+        ))
+    return configs
+
+
+def construct(
+    engine: CandidateEngine,
+    config: StartConfig,
+    start_time: float,
+    end_time: float,
+    start_index: int,
+    max_activities: int
+) -> List[int]:
+    """Route (positions in `engine.activities`) of one construction; resets the engine first."""
+    engine.available = engine.selectable.copy()
+    engine.time_windows = None
+    rng = random.Random(config.seed)
+    first = None
+    if config.first_stop is not None:
+        first = np.flatnonzero(engine.ids == config.first_stop)
+
+    def choose(step: int, positions: np.ndarray, scores: np.ndarray) -> int:
+        if step == 0 and first is not None and len(first):
+            forced = np.flatnonzero(np.isin(positions, first))
+            if len(forced):
+                return int(forced[0])
+        best = int(np.argmax(scores))
+        if config.tolerance <= 0:
+            return best
+        close = np.flatnonzero(scores >= scores[best] - config.tolerance)
+        return int(close[rng.randrange(len(close))])
+
+    route, _ = greedy_route(
+        engine, start_time, end_time, start_index, max_activities,
+        config.alpha, config.beta, config.gamma, config.delta, choose=choose
+    )
+    return route
+
+
+def run_starts(
+    request: Dict[str, Any],
+    configs: List[StartConfig],
+    activities: Optional[List[Dict[str, Any]]] = None,
+    distances: Optional[DistanceMatrix] = None,
+    catalog: Optional[ActivityCatalog] = None
+) -> List[List[str]]:
+    """
+    Routes (activityIds) of a batch of constructions for one request.
+
+    The candidate engine is built once per batch. Without data arguments,
+    uses the data of the worker process (see `init_worker`).
+    """
+    if activities is None:
+        activities, distances, catalog = _worker["activities"], _worker["distances"], _worker["catalog"]
+    scored_activities = recommend_activities(
+        request["likes_dislikes"], activities, exclude_seen=True, catalog=catalog
+    )
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
+    engine = CandidateEngine(scored_activities, distances, rec_scores, request["start_point"], catalog)
+    start_index = distances.index_of(request["start_point"])
+
+    routes = []
+    for config in configs:
+        route = construct(
+            engine, config, request["start_time"], request["end_time"],
+            start_index, request["max_activities"]
+        )
+        routes.append([str(engine.ids[p]) for p in route])
+    return routes
+
+
+# Data of a worker process, mapped once from the bundle by `init_worker`
+_worker: Dict[str, Any] = {}
+
+
+def init_worker(bundle_path: str) -> None:
+    """Process pool initializer: map the bundle (pages shared by all workers)."""
+    bundle = load_bundle(bundle_path)
+    _worker.update(activities=bundle.activities, distances=bundle.distances, catalog=bundle.catalog)
+
+
+class MultiStartPool:
+    """
+    Process pool for multi-start searches over one data bundle.
+
+    Workers map the bundle once when they start: the catalog and the
+    distance matrix are read-only pages shared between processes, and a task
+    only carries the request and its batch of StartConfigs, never the data.
+    """
+
+    def __init__(self, bundle_path: str, workers: Optional[int] = None):
+        """
+        Args:
+            bundle_path: Data bundle (see data_bundle.build_bundle)
+            workers: Number of worker processes (number of CPUs if None)
+        """
+        self.bundle_path = bundle_path
+        self.bundle = load_bundle(bundle_path)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(bundle_path,)
+        )
+
+    def run(self, request: Dict[str, Any], configs: List[StartConfig]) -> List[List[str]]:
+        """Routes of all `configs`, in order, one batch per worker."""
+        batches = [configs[k::self.workers] for k in range(self.workers)]
+        futures = [self.executor.submit(run_starts, request, batch) for batch in batches if batch]
+        results = [future.result() for future in futures]
+        # Back to the order of `configs`
+        routes: List[List[str]] = [None] * len(configs)
+        for k, batch_routes in enumerate(results):
+            routes[k::self.workers] = batch_routes
+        return routes
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "MultiStartPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def route_objective(
+    engine: CandidateEngine,
+    route: List[int],
+    start_time: float,
+    start_index: int,
+    alpha: float = 1.0,
+    beta: float = 0.4,
+    gamma: float = 0.5,
+    delta: float = 0.2
+) -> List[float]:
+    """Composite score of each stop of `route`, replayed in route order with the given weights."""
+    current_time = start_time
+    current_index = start_index
+    cumulative_vector = np.zeros(9)
+    scores = []
+    for position in route:
+        travel = engine.travel_times_from(current_index)[position]
+        positions = np.array([position])
+        scores.append(float(engine.composite_scores(
+            current_time, np.array([travel]), cumulative_vector, alpha, beta, gamma, delta, positions
+        )[0]))
+        cumulative_vector += engine.interests[position]
+        current_index = engine.distances.index_of(engine.activities[position]['name'])
+        current_time = max(current_time + travel, engine.opening[position]) + engine.duration[position]
+    return scores
+
+
+OBJECTIVES = ("composite", "recommendation", "activities")
+
+
+def multi_start_itinerary(
+    likes_dislikes: List[Dict[str, Any]],
+    start_time: str,
+    end_time: str,
+    pool: Optional[MultiStartPool] = None,
+    activities: Optional[List[Dict[str, Any]]] = None,
+    distances: Optional[DistanceMatrix] = None,
+    start_point: str = "La Statue de Louis XIV",
+    max_activities: int = 10,
+    alpha: float = 1.0,
+    beta: float = 0.4,
+    gamma: float = 0.5,
+    delta: float = 0.2,
+    starts: int = 32,
+    first_stops: int = 8,
+    weight_spread: float = 0.5,
+    tolerance: float = 0.05,
+    objective: Union[str, Callable[[Dict[str, Any]], float]] = "composite",
+    catalog: Optional[ActivityCatalog] = None,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """
+    Best of many greedy and randomized constructions, in the `build_itinerary` format.
+
+    Constructions vary the score weights, the tie-breaking and the first
+    stop (among the `first_stops` best recommendations); they run on `pool`
+    when given, otherwise in this process on `activities` and `distances`.
+
+    Args:
+        likes_dislikes: User swipe data
+        start_time: Departure time (HH:MM)
+        end_time: Return time (HH:MM)
+        pool: Worker pool over a data bundle
+        activities, distances: Data for an in-process search (the pool's bundle otherwise)
+        start_point: Starting location
+        max_activities: Maximum number of activities
+        alpha, beta, gamma, delta: Score weights, the center of the search
+        starts: Number of constructions
+        first_stops: Number of top recommendations tried as first stop
+        weight_spread: Standard deviation of the log of the weights
+        tolerance: Score tolerance of the randomized tie-breaking
+        objective: "composite" (composite scores with the given weights),
+            "recommendation" (sum of recommendation scores), both shifted
+            so that no stop counts less than zero, "activities" (number of
+            stops, then recommendation), or a function of the itinerary
+        catalog: Precomputed ActivityCatalog of `activities` (built if None)
+        seed: Seed of the weights and tie-breaking draws
+
+    Returns:
+        Complete itinerary with timing and statistics
+    """
+    if isinstance(objective, str) and objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    if activities is None:
+        if pool is None:
+            raise ValueError("multi_start_itinerary needs a pool or activities and distances")
+        activities, distances, catalog = pool.bundle.activities, pool.bundle.distances, pool.bundle.catalog
+    if catalog is None:
+        catalog = ActivityCatalog(activities)
+
+    scored_activities = recommend_activities(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
+    start_min, end_min = time_to_minutes(start_time), time_to_minutes(end_time)
+
+    top = [str(a['activityId']) for a in scored_activities if a['name'] != start_point][:first_stops]
+    configs = start_configs(starts, alpha, beta, gamma, delta, top, weight_spread, tolerance, seed)
+    request = {
+        "likes_dislikes": likes_dislikes,
+        "start_time": start_min,
+        "end_time": end_min,
+        "start_point": start_point,
+        "max_activities": max_activities
+    }
+    if pool is not None:
+        routes = pool.run(request, configs)
+    else:
+        routes = run_starts(request, configs, activities, distances, catalog)
+
+    # Score every distinct route with the reference weights
+    engine = CandidateEngine(scored_activities, distances, rec_scores, start_point, catalog)
+    position_of = {activity_id: position for position, activity_id in enumerate(engine.ids)}
+    start_index = distances.index_of(start_point)
+    # Scores can be negative: shift every stop, like the route optimizer, so
+    # that an extra visit never makes a route worse
+    candidate_scores = engine.rec_scores[engine.selectable]
+    composite_offset = max(0.0, -float(
+        (alpha * candidate_scores).min(initial=0.0) - abs(beta) - abs(gamma) - abs(delta)
+    ))
+    recommendation_offset = max(0.0, -float(candidate_scores.min(initial=0.0)))
+    best, best_value, distinct = None, None, {}
+    for k, route_ids in enumerate(routes):
+        if tuple(route_ids) in distinct:
+            continue
+        route = [position_of[activity_id] for activity_id in route_ids]
+        scores = route_objective(engine, route, start_min, start_index, alpha, beta, gamma, delta)
+        itinerary = None
+        if callable(objective):
+            itinerary = assemble(engine, route, scores, start_time, start_point, distances, rec_scores)
+            value = objective(itinerary)
+        elif objective == "composite":
+            value = sum(score + composite_offset for score in scores)
+        else:
+            value = sum(rec_scores.get(activity_id, 0) + recommendation_offset for activity_id in route_ids)
+            if objective == "activities":
+                value = (len(route_ids), value)
+        distinct[tuple(route_ids)] = value
+        if best is None or value > best_value:
+            best, best_value = (k, route, scores, itinerary), value
+
+    k, route, scores, itinerary = best
+    if itinerary is None:
+        itinerary = assemble(engine, route, scores, start_time, start_point, distances, rec_scores)
+    config = configs[k]
+    itinerary["stats"]["multi_start"] = {
+        "starts": len(configs),
+        "distinct_routes": len(distinct),
+        "objective": objective if isinstance(objective, str) else getattr(objective, "__name__", "custom"),
+        "best_start": k,
+        "weights": {"alpha": config.alpha, "beta": config.beta, "gamma": config.gamma, "delta": config.delta},
+        "first_stop": config.first_stop,
+        "tolerance": config.tolerance
+    }
+    return itinerary
+
+
+def assemble(
+    engine: CandidateEngine,
+    route: List[int],
+    scores: List[float],
+    start_time: str,
+    start_point: str,
+    distances: DistanceMatrix,
+    rec_scores: Dict[str, float]
+) -> Dict[str, Any]:
+    """Itinerary of a route, in the `build_itinerary` format."""
+    itinerary = [{
+        "order": 0,
+        "activity_name": start_point,
+        "arrival_time": start_time,
+        "departure_time": start_time,
+        "duration": 0,
+        "waiting_time": 0,
+        "travel_time_from_previous": 0
+    }]
+    current_time, current_location = append_route_steps(
+        itinerary, [engine.activities[p] for p in route], scores,
+        time_to_minutes(start_time), start_point, distances, rec_scores
+    )
+    return complete_itinerary(
+        itinerary, start_time, current_time, current_location, start_point, distances, len(route)
+    )
+
+
+if __name__ == "__main__":
+    import json
+    import time
+    from data_bundle import build_bundle
+    from itinerary_builder import build_itinerary
+
+    bundle_path = 'activity_data.bundle'
+    if not os.path.exists(bundle_path):
+        with open('activity_v2.json', 'r', encoding='utf-8') as f:
+            activities = json.load(f)
+        build_bundle(activities, DistanceMatrix.from_csv('activity_distances_temp.csv', activities), bundle_path)
+    with open('user_visit.json', 'r', encoding='utf-8') as f:
+        likes_dislikes = json.load(f)
+
+    with MultiStartPool(bundle_path) as pool:
+        bundle = pool.bundle
+        greedy = build_itinerary(
+            likes_dislikes, bundle.activities, bundle.distances, "09:00", "18:00",
+            max_activities=100, catalog=bundle.catalog
+        )
+        start = time.perf_counter()
+        result = multi_start_itinerary(likes_dislikes, "09:00", "18:00", pool, max_activities=100, starts=64)
+        elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"Glouton : {greedy['total_activities']} activités, "
+          f"score {sum(step.get('composite_score', 0) for step in greedy['itinerary']):.3f}")
+    print(f"Multi-départ : {result['total_activities']} activités, "
+          f"score {sum(step.get('composite_score', 0) for step in result['itinerary']):.3f} ({elapsed:.0f} ms)")
+    print(json.dumps(result['stats']['multi_start'], indent=2, ensure_ascii=False))
@@ -0,0 +1,181 @@
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+
+POLE_PENALTY_SECONDS = 10 * 3600  # 10 h ajoutées aux arêtes pénalisées
+INTERNAL_PENALTY_SECONDS = 10 * 60  # Pénalité des arêtes internes (add_internal_pole_penalties)
+MIN_POLE_TIME = 90 * 60  # En dessous, on reste dans le pôle
+MAX_POLE_TIME = 4 * 3600  # Au-delà, on quitte le pôle
+INTERNAL_PENALTY_TIME = 3 * 3600  # Au-delà, les arêtes internes sont pénalisées (INTERNAL_PENALTY_SECONDS)
+STATUE_SECTION = '0'  # Section de la statue, jamais pénalisée
+
+
+class PolePenaltyEngine:
+    """
+    Pole (section) penalties applied to a dense travel-time matrix.
+
+    Row/column i of the matrices is activity i of `sections`. Penalties are
+    block updates on section-membership masks, in place, instead of scanning
+    the long `from`/`to` passage frame once per pair.
+    """
+
+    def __init__(self, sections: Sequence[Any]):
+        """
+        Args:
+            sections: sectionId of each activity, in matrix order
+        """
+        self.sections = np.asarray([str(section) for section in sections])
+        self.masks: Dict[str, np.ndarray] = {}
+        self.indices: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_frame(cls, df) -> "PolePenaltyEngine":
+        """Engine for the activities DataFrame, in row order."""
+        return cls(df['sectionId'].tolist())
+
+    def section_mask(self, section: Any) -> np.ndarray:
+        """Boolean mask of the activities in `section`."""
+        section = str(section)
+        mask = self.masks.get(section)
+        if mask is None:
+            mask = self.sections == section
+            self.masks[section] = mask
+            self.indices[section] = np.flatnonzero(mask)
+        return mask
+
+    def section_indices(self, section: Any) -> np.ndarray:
+        """Indices of the activities in `section`."""
+        self.section_mask(section)
+        return self.indices[str(section)]
+
+    def other_indices(self, section: Any) -> np.ndarray:
+        """Indices of the activities outside `section` and outside the statue section."""
+        mask = ~self.section_mask(section) & ~self.section_mask(STATUE_SECTION)
+        return np.flatnonzero(mask)
+
+    def adjust_for_poles(
+        self,
+        travel: np.ndarray,
+        selected_section: Any,
+        total_time_in_pole: float,
+        apply_penalty: bool = True
+    ) -> np.ndarray:
+        """
+        `utils.adjust_edge_weights_for_poles` on a dense matrix, in place.
+
+        Under 90 minutes in the pole, edges from the pole to the other sections
+        (statue excepted) get 10 h more; from 4 h on, the internal edges of the
+        pole do.
+        """
+        if not apply_penalty:
+            return travel
+        inside = self.section_indices(selected_section)
+        if total_time_in_pole < MIN_POLE_TIME:
+            travel[np.ix_(inside, self.other_indices(selected_section))] += POLE_PENALTY_SECONDS
+        elif total_time_in_pole >= MAX_POLE_TIME:
+            self._add_internal(travel, inside, POLE_PENALTY_SECONDS)
+        return travel
+
+    def add_internal_penalties(self, travel: np.ndarray, selected_section: Any) -> np.ndarray:
+        """`utils.add_internal_pole_penalties` on a dense matrix, in place."""
+        self._add_internal(travel, self.section_indices(selected_section), INTERNAL_PENALTY_SECONDS)
+        return travel
+
+    @staticmethod
+    def _add_internal(travel: np.ndarray, inside: np.ndarray, penalty: float) -> None:
+        # Self-edges are not part of the passage matrix
+        block = travel[np.ix_(inside, inside)]
+        diagonal = block.diagonal().copy()
+        block += penalty
+        np.fill_diagonal(block, diagonal)
+        travel[np.ix_(inside, inside)] = block
+
+
+class PenaltyOverlay:
+    """
+    Lazy pole penalties on top of a shared, read-only travel-time matrix.
+
+    Penalties only depend on the sections of the two ends of an edge, so they
+    are kept as a small section x section matrix and added at lookup time;
+    self-edges are never penalized. Each session (or step) has its own
+    overlay, while all of them share the same base matrix.
+    """
+
+    def __init__(self, base: np.ndarray, sections: Sequence[Any], names: Optional[Sequence[str]] = None):
+        """
+        Args:
+            base: Travel times in seconds, N x N in activity order (not copied)
+            sections: sectionId of each activity, in matrix order
+            names: Optional activity names, for lookups by name
+        """
+        self.base = base.view()
+        self.base.flags.writeable = False
+        self.section_ids, self.codes = np.unique(
+            np.asarray([str(section) for section in sections]), return_inverse=True
+        )
+        self.section_code = {section: k for k, section in enumerate(self.section_ids.tolist())}
+        self.penalties = np.zeros((len(self.section_ids), len(self.section_ids)), dtype=np.float64)
+        self.layers: List[Tuple[str, str, float]] = []
+        self.index = {name: i for i, name in enumerate(names)} if names is not None else {}
+
+    @classmethod
+    def from_frame(cls, df, dist_df_walk) -> "PenaltyOverlay":
+        """Overlay for the activities DataFrame over a distance frame in minutes."""
+        names = df['name'].tolist()
+        base = dist_df_walk.loc[names, names].to_numpy(dtype=np.float64) * 60  # En secondes
+        return cls(base, df['sectionId'].tolist(), names)
+
+    def fork(self) -> "PenaltyOverlay":
+        """Independent copy of the penalties, sharing the base matrix."""
+        overlay = object.__new__(PenaltyOverlay)
+        overlay.__dict__.update(self.__dict__)
+        overlay.penalties = self.penalties.copy()
+        overlay.layers = list(self.layers)
+        return overlay
+
+    def add_penalty(self, from_section: Any, to_sections: Sequence[Any], penalty: float) -> None:
+        """Add `penalty` to every edge from `from_section` to one of `to_sections`."""
+        i = self.section_code.get(str(from_section))
+        if i is None:
+            return
+        for to_section in to_sections:
+            j = self.section_code.get(str(to_section))
+            if j is not None:
+                self.penalties[i, j] += penalty
+                self.layers.append((str(from_section), str(to_section), penalty))
+
+    def adjust_for_poles(self, selected_section: Any, total_time_in_pole: float, apply_penalty: bool = True) -> None:
+        """Same rules as `utils.adjust_edge_weights_for_poles`, recorded lazily."""
+        if not apply_penalty:
+            return
+        selected_section = str(selected_section)
+        if total_time_in_pole < MIN_POLE_TIME:
+            others = [s for s in self.section_code if s not in (selected_section, STATUE_SECTION)]
+            self.add_penalty(selected_section, others, POLE_PENALTY_SECONDS)
+        elif total_time_in_pole >= MAX_POLE_TIME:
+            self.add_penalty(selected_section, [selected_section], POLE_PENALTY_SECONDS)
+
+    def add_internal_penalties(self, selected_section: Any) -> None:
+        """Same rule as `utils.add_internal_pole_penalties`, recorded lazily."""
+        self.add_penalty(selected_section, [selected_section], INTERNAL_PENALTY_SECONDS)
+
+    def travel_time(self, i: int, j: int) -> float:
+        """Penalized travel time (seconds) between activities i and j."""
+        if i == j:
+            return float(self.base[i, j])
+        return float(self.base[i, j] + self.penalties[self.codes[i], self.codes[j]])
+
+    def travel_time_by_name(self, from_name: str, to_name: str) -> float:
+        return self.travel_time(self.index[from_name], self.index[to_name])
+
+    def row(self, i: int) -> np.ndarray:
+        """Penalized travel times (seconds) from activity i to all activities."""
+        row = self.base[i] + self.penalties[self.codes[i], self.codes]
+        row[i] = self.base[i, i]
+        return row
+
+    def materialize(self) -> np.ndarray:
+        """Full penalized matrix (for export or debugging only)."""
+        values = self.base + self.penalties[np.ix_(self.codes, self.codes)]
+        np.fill_diagonal(values, self.base.diagonal())
+        return values
@@ -0,0 +1,563 @@
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Iterator
+from candidate_engine import CandidateEngine, MAX_TRAVEL, MAX_WAIT
+
+
+class OptimizationResult:
+    """Best route found by RouteOptimizer and how it was found."""
+
+    def __init__(
+        self,
+        route: List[int],
+        scores: List[float],
+        objective: float,
+        initial_objective: float,
+        evaluations: int,
+        improvements: int,
+        elapsed_ms: float,
+        timed_out: bool,
+        mode: str = "local_search"
+    ):
+        self.mode = mode
+        self.route = route
+        self.scores = scores
+        self.objective = objective
+        self.initial_objective = initial_objective
+        self.evaluations = evaluations
+        self.improvements = improvements
+        self.elapsed_ms = elapsed_ms
+        self.timed_out = timed_out
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary returned in the itinerary stats."""
+        return {
+            "mode": self.mode,
+            "initial_objective": self.initial_objective,
+            "objective": self.objective,
+            "evaluations": self.evaluations,
+            "improvements": self.improvements,
+            "elapsed_ms": self.elapsed_ms,
+            "timed_out": self.timed_out
+        }
+
+
+class RouteOptimizer:
+    """
+    Local search for the itinerary as an orienteering problem with time windows.
+
+    A route is a sequence of positions in `engine.activities`. It is feasible
+    when every stop starts before closing and finishes by closing time, and
+    the visitor can still return to the start point by `end_time`. Its
+    objective is the sum of the composite scores of its stops, evaluated in
+    route order (same formula as `calculate_composite_score`), each shifted
+    by a constant `prize_offset` so no stop is worth less than zero: like in
+    the greedy, an extra feasible visit never makes a route worse.
+
+    Moves: insertion, removal, replacement (swap with an unvisited activity),
+    swap of two stops, 2-opt (segment reversal) and or-opt (segment move).
+    The search is first-improvement and anytime: the best feasible route so
+    far is returned when the time budget runs out.
+    """
+
+    def __init__(
+        self,
+        engine: CandidateEngine,
+        start_time: float,
+        end_time: float,
+        max_activities: int = 10,
+        alpha: float = 1.0,
+        beta: float = 0.4,
+        gamma: float = 0.5,
+        delta: float = 0.2,
+        start_index: Optional[int] = None,
+        initial_vector: Optional[np.ndarray] = None
+    ):
+        """
+        Args:
+            engine: Candidate engine holding the activity arrays
+            start_time: Departure time (minutes since midnight)
+            end_time: Return time (minutes since midnight)
+            max_activities: Maximum number of activities
+            alpha, beta, gamma, delta: Score weights
+            start_index: Matrix index the route leaves from (default: return point)
+            initial_vector: Cumulative interest vector of activities already visited
+        """
+        # Setup counts against the time budget of optimize / fill
+        self.created = time.perf_counter()
+        self.engine = engine
+        self.start_time = start_time
+        self.end_time = end_time
+        self.max_activities = max_activities
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.delta = delta
+
+        # Pure Python lists: route evaluation is a short scalar loop
+        self.opening = engine.opening.tolist()
+        self.closing = engine.closing.tolist()
+        self.duration = engine.duration.tolist()
+        self.rec_scores = engine.rec_scores.tolist()
+        self.return_times = engine.return_times.tolist()
+        if start_index is None:
+            start_index = engine.return_index
+        self.from_start_array = engine.travel_times_from(start_index)
+        self.from_start = self.from_start_array.tolist()
+
+        # Travel and Gram rows (dot(v, cumulative) = Σ dot(v, v_prev)) of the
+        # activities the search actually visits, built on first use: an N x N
+        # copy would cost more than the whole search on large catalogs
+        self.travel_rows: Dict[int, np.ndarray] = {}
+        self.travel_lists: Dict[int, List[float]] = {}
+        self.travel_columns: Dict[int, np.ndarray] = {}
+        self.gram_lists: Dict[int, List[float]] = {}
+        self.norms = engine.interest_norms.tolist()
+        if initial_vector is None:
+            initial_vector = np.zeros(engine.interests.shape[1])
+        self.initial_vector = np.asarray(initial_vector, dtype=float)
+        self.initial_dots = (engine.interests @ initial_vector).tolist()
+        self.initial_sq = float(initial_vector @ initial_vector)
+
+        # Activities that fit in the day on their own
+        alone = (
+            engine.feasibility_mask(start_time, end_time, self.from_start_array)
+            & engine.selectable
+        )
+        self.candidates = np.flatnonzero(alone).tolist()
+
+        # Lowest possible composite score of a candidate: full travel and similarity penalties
+        lowest = float(
+            (alpha * engine.rec_scores[self.candidates]).min() - abs(beta) - abs(gamma) - abs(delta)
+        ) if self.candidates else 0.0
+        self.prize_offset = max(0.0, -lowest)
+
+    def travel_row(self, j: int) -> np.ndarray:
+        """Travel times from activity j to every activity (0 if unknown)."""
+        row = self.travel_rows.get(j)
+        if row is None:
+            row = self.engine.travel_times_from(int(self.engine.matrix_index[j]))
+            self.travel_rows[j] = row
+        return row
+
+    def travel_list(self, j: int) -> List[float]:
+        """`travel_row(j)` as a list, for the scalar route evaluation."""
+        row = self.travel_lists.get(j)
+        if row is None:
+            row = self.travel_row(j).tolist()
+            self.travel_lists[j] = row
+        return row
+
+    def travel_column(self, j: int) -> np.ndarray:
+        """Travel times from every activity to activity j (0 if unknown)."""
+        column = self.travel_columns.get(j)
+        if column is None:
+            column = self.engine.travel_times_to(int(self.engine.matrix_index[j]))
+            self.travel_columns[j] = column
+        return column
+
+    def gram_list(self, j: int) -> List[float]:
+        """Dot products of the interest vector of activity j with all the others."""
+        row = self.gram_lists.get(j)
+        if row is None:
+            row = (self.engine.interests @ self.engine.interests[j]).tolist()
+            self.gram_lists[j] = row
+        return row
+
+    def evaluate(self, route: List[int]) -> Optional[Tuple[float, List[float]]]:
+        """
+        Objective and per-stop composite scores of a route, None if infeasible.
+        """
+        current_time = self.start_time
+        previous = -1
+        cumulative_sq = self.initial_sq
+        objective = 0.0
+        scores = []
+
+        for k, j in enumerate(route):
+            travel = self.from_start[j] if previous < 0 else self.travel_list(previous)[j]
+            arrival = current_time + travel
+            actual_start = max(arrival, self.opening[j])
+            finish = actual_start + self.duration[j]
+            if actual_start >= self.closing[j] or finish > self.closing[j]:
+                return None
+            if finish + self.return_times[j] > self.end_time:
+                return None
+
+            # Similarity to the activities already in the route
+            gram_j = self.gram_list(j)
+            dot = self.initial_dots[j]
+            for p in route[:k]:
+                dot += gram_j[p]
+            similarity = 0.0
+            if cumulative_sq > 0 and self.norms[j] > 0:
+                similarity = max(0.0, dot / (self.norms[j] * cumulative_sq ** 0.5))
+            cumulative_sq += 2 * dot + gram_j[j]
+
+            wait_time = max(0.0, self.opening[j] - arrival)
+            score = (
+                self.alpha * self.rec_scores[j]
+                - self.beta * min(travel / MAX_TRAVEL, 1.0)
+                - self.gamma * similarity
+                + self.delta * (1.0 - min(wait_time / MAX_WAIT, 1.0))
+            )
+            scores.append(score)
+            objective += score + self.prize_offset
+
+            current_time = finish
+            previous = j
+
+        return objective, scores
+
+    def neighbours(self, route: List[int]) -> Iterator[List[int]]:
+        """Routes one move away from `route`."""
+        length = len(route)
+        ids = self.engine.ids
+        in_route = {ids[j] for j in route}
+        outside = [j for j in self.candidates if ids[j] not in in_route]
+
+        # Insertion of an unvisited activity
+        if length < self.max_activities:
+            for j in outside:
+                for i in range(length + 1):
+                    yield route[:i] + [j] + route[i:]
+
+        # Replacement of a stop by an unvisited activity
+        for i in range(length):
+            for j in outside:
+                yield route[:i] + [j] + route[i + 1:]
+
+        # Removal of a stop
+        for i in range(length):
+            yield route[:i] + route[i + 1:]
+
+        # Swap of two stops
+        for i in range(length - 1):
+            for k in range(i + 1, length):
+                swapped = list(route)
+                swapped[i], swapped[k] = swapped[k], swapped[i]
+                yield swapped
+
+        # 2-opt: reverse a segment
+        for i in range(length - 2):
+            for k in range(i + 2, length):
+                yield route[:i] + route[i:k + 1][::-1] + route[k + 1:]
+
+        # Or-opt: move a segment of 1 to 3 stops
+        for size in (1, 2, 3):
+            for i in range(length - size + 1):
+                segment = route[i:i + size]
+                rest = route[:i] + route[i + size:]
+                for k in range(len(rest) + 1):
+                    if k != i:
+                        yield rest[:k] + segment + rest[k:]
+
+    def optimize(
+        self,
+        route: List[int],
+        time_budget_ms: float = 50,
+        started: Optional[float] = None
+    ) -> OptimizationResult:
+        """
+        Improve `route` until a local optimum or until the time budget runs out.
+
+        Args:
+            route: Initial feasible route (e.g. the greedy one)
+            time_budget_ms: Time budget in milliseconds
+            started: `time.perf_counter()` the budget counts from (default: the
+                creation of the optimizer, so its setup is part of the budget)
+
+        Returns:
+            OptimizationResult with the best route found
+        """
+        started = self.created if started is None else started
+        deadline = started + time_budget_ms / 1000
+
+        best = list(route)
+        evaluation = self.evaluate(best)
+        if evaluation is None:
+            best, evaluation = [], self.evaluate([])
+        best_objective, best_scores = evaluation
+        initial_objective = best_objective
+
+        evaluations = 1
+        improvements = 0
+        timed_out = False
+        improved = True
+        while improved and not timed_out:
+            improved = False
+            for candidate in self.neighbours(best):
+                if time.perf_counter() > deadline:
+                    timed_out = True
+                    break
+                evaluations += 1
+                evaluation = self.evaluate(candidate)
+                if evaluation is not None and evaluation[0] > best_objective + 1e-9:
+                    best = candidate
+                    best_objective, best_scores = evaluation
+                    improvements += 1
+                    improved = True
+                    break
+
+        return OptimizationResult(
+            route=best,
+            scores=best_scores,
+            objective=best_objective,
+            initial_objective=initial_objective,
+            evaluations=evaluations,
+            improvements=improvements,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+            timed_out=timed_out
+        )
+
+    def repair(self, route: List[int]) -> List[int]:
+        """Keep the stops of `route`, in order, that still fit; drop the others."""
+        kept = []
+        current_time, previous = self.start_time, -1
+        for j in route:
+            if len(kept) >= self.max_activities:
+                break
+            # Same checks as evaluate: the stops already kept are unchanged
+            travel = self.from_start[j] if previous < 0 else self.travel_list(previous)[j]
+            actual_start = max(current_time + travel, self.opening[j])
+            finish = actual_start + self.duration[j]
+            if actual_start >= self.closing[j] or finish > self.closing[j]:
+                continue
+            if finish + self.return_times[j] > self.end_time:
+                continue
+            kept.append(j)
+            current_time, previous = finish, j
+        return kept
+
+    def fill(
+        self,
+        route: List[int],
+        time_budget_ms: float = 20,
+        started: Optional[float] = None
+    ) -> OptimizationResult:
+        """
+        Insert unvisited activities into a feasible `route`, best insertion first.
+
+        Existing stops keep their relative order; stops are only added. Stops
+        when no insertion improves the objective, at `max_activities`, or when
+        the time budget (counted like in `optimize`) runs out.
+        """
+        started = self.created if started is None else started
+        deadline = started + time_budget_ms / 1000
+
+        best = list(route)
+        best_objective, best_scores = self.evaluate(best)
+        initial_objective = best_objective
+
+        evaluations = 1
+        improvements = 0
+        timed_out = False
+        engine = self.engine
+        candidates = np.zeros(len(engine.activities), dtype=bool)
+        candidates[self.candidates] = True
+        candidates &= ~np.isin(engine.ids, engine.ids[best])
+        while len(best) < self.max_activities:
+            outside = np.flatnonzero(candidates)
+            if not len(outside):
+                break
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            insertions = RouteInsertions(self, best, best_scores, outside)
+            evaluations += int(insertions.feasible.sum())
+            step_best = insertions.best()
+            if step_best is None or step_best[0] <= best_objective + 1e-9:
+                break
+            _, i, j = step_best
+            evaluation = self.evaluate(best[:i] + [j] + best[i:])
+            if evaluation is None:
+                break
+            best = best[:i] + [j] + best[i:]
+            best_objective, best_scores = evaluation
+            candidates &= engine.ids != engine.ids[j]
+            improvements += 1
+
+        return OptimizationResult(
+            route=best,
+            scores=best_scores,
+            objective=best_objective,
+            initial_objective=initial_objective,
+            evaluations=evaluations,
+            improvements=improvements,
+            elapsed_ms=(time.perf_counter() - started) * 1000,
+            timed_out=timed_out,
+            mode="insertion"
+        )
+
+
+def similarity_penalties(dots: np.ndarray, norms: Any, cumulative_sq: np.ndarray) -> np.ndarray:
+    """Vectorized similarity penalty of `evaluate`: max(0, cos) when both norms are positive."""
+    valid = (cumulative_sq > 0) & (norms > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.maximum(0.0, dots / (norms * np.sqrt(cumulative_sq)))
+    return np.where(valid, similarity, 0.0)
+
+
+class RouteInsertions:
+    """
+    Objective of `route` with one activity inserted, for many activities at once.
+
+    The arrival time, cumulative interest vector and objective of every
+    prefix of the route are computed once; inserting activity j at position
+    i then only needs its own score and the shifted arrivals and similarity
+    penalties of the stops after i, as array operations over all the
+    activities. Same values as `RouteOptimizer.evaluate` on each new route,
+    without building them.
+    """
+
+    def __init__(self, optimizer: RouteOptimizer, route: List[int], scores: List[float], positions: np.ndarray):
+        """
+        Args:
+            optimizer: Optimizer holding the activity arrays and weights
+            route: Feasible route
+            scores: Per-stop composite scores of `route` (from `evaluate`)
+            positions: Activities to insert
+        """
+        self.optimizer = optimizer
+        self.route = route
+        self.positions = positions
+        engine = optimizer.engine
+        offset = optimizer.prize_offset
+
+        # Departure after each prefix, and objective of each prefix (same summation order as evaluate)
+        self.departures = [optimizer.start_time]
+        self.prefix_objectives = [0.0]
+        for k, j in enumerate(route):
+            travel = optimizer.from_start[j] if k == 0 else optimizer.travel_list(route[k - 1])[j]
+            start = max(self.departures[-1] + travel, optimizer.opening[j])
+            self.departures.append(start + optimizer.duration[j])
+            self.prefix_objectives.append(self.prefix_objectives[-1] + scores[k] + offset)
+
+        # Latest start of each stop that keeps the rest of the route feasible
+        self.latest_starts = [0.0] * len(route)
+        for k in range(len(route) - 1, -1, -1):
+            j = route[k]
+            latest = min(optimizer.closing[j], optimizer.end_time - optimizer.return_times[j]) - optimizer.duration[j]
+            if k + 1 < len(route):
+                travel = optimizer.travel_list(j)[route[k + 1]]
+                latest = min(latest, self.latest_starts[k + 1] - travel - optimizer.duration[j])
+            self.latest_starts[k] = latest
+
+        # Cumulative interest vector before each stop
+        self.route_vectors = engine.interests[route]
+        self.cumulative = np.vstack([optimizer.initial_vector, self.route_vectors]).cumsum(axis=0)
+        self.cumulative_sq = np.einsum('ij,ij->i', self.cumulative, self.cumulative)
+        self.route_dots = np.einsum('ij,ij->i', self.route_vectors, self.cumulative[:-1])
+
+        # Each activity inserted before each stop i (row i): it must fit, and
+        # leave the next stop its latest start
+        self.opening = engine.opening[positions]
+        closing = engine.closing[positions]
+        self.travel = np.vstack(
+            [optimizer.from_start_array[positions]]
+            + [optimizer.travel_row(j)[positions] for j in route]
+        )
+        self.arrival = np.array(self.departures)[:, None] + self.travel
+        start = np.maximum(self.arrival, self.opening)
+        self.finish = start + engine.duration[positions]
+        self.feasible = (
+            (start < closing)
+            & (self.finish <= closing)
+            & (self.finish + engine.return_times[positions] <= optimizer.end_time)
+        )
+        if route:
+            self.next_travel = np.vstack([optimizer.travel_column(j)[positions] for j in route])
+            self.feasible[:-1] &= self.finish[:-1] + self.next_travel <= np.array(self.latest_starts)[:, None]
+
+    def stop_score(self, travel, arrival, similarity, rec_score, opening):
+        """Composite score of a stop (same formula as `evaluate`)."""
+        optimizer = self.optimizer
+        wait_time = np.maximum(0.0, opening - arrival)
+        return (
+            optimizer.alpha * rec_score
+            - optimizer.beta * np.minimum(travel / MAX_TRAVEL, 1.0)
+            - optimizer.gamma * similarity
+            + optimizer.delta * (1.0 - np.minimum(wait_time / MAX_WAIT, 1.0))
+        )
+
+    def best(self) -> Optional[Tuple[float, int, int]]:
+        """
+        Best insertion, None if no activity fits anywhere.
+
+        Returns:
+            (objective, stop it is inserted before, activity position); ties
+            go to the earliest stop, then the first activity
+        """
+        optimizer = self.optimizer
+        engine = optimizer.engine
+        offset = optimizer.prize_offset
+        route = self.route
+        # Feasible (stop, activity) pairs, sorted by stop
+        stops, columns = np.nonzero(self.feasible)
+        if not len(stops):
+            return None
+        pairs = np.arange(len(stops))
+
+        # Interest dot products: inserted activity with the cumulative vector
+        # before each stop, and with each stop
+        inserted = self.positions[columns]
+        vectors = engine.interests[inserted]
+        cumulative_dots = vectors @ self.cumulative.T
+        squares = np.einsum('ij,ij->i', vectors, vectors)
+        gram = vectors @ self.route_vectors.T
+
+        # The inserted activity
+        departure = self.finish[stops, columns]
+        similarity = similarity_penalties(
+            cumulative_dots[pairs, stops], engine.interest_norms[inserted], self.cumulative_sq[stops]
+        )
+        score = self.stop_score(
+            self.travel[stops, columns], self.arrival[stops, columns], similarity,
+            engine.rec_scores[inserted], self.opening[columns]
+        )
+        objective = np.array(self.prefix_objectives)[stops] + (score + offset)
+        if not route:
+            feasible = np.ones(len(stops), dtype=bool)
+        else:
+            # Arrival at the following stops, shifted by the insertion: stop m
+            # follows the pairs [:after], of which [first:after] were inserted just before it
+            feasible = np.ones(len(stops), dtype=bool)
+            arrivals = np.zeros((len(stops), len(route)))
+            travels = np.zeros((len(stops), len(route)))
+            bounds = np.searchsorted(stops, np.arange(len(route)), side='right').tolist()
+            for m, j in enumerate(route):
+                first, after = (bounds[m - 1] if m else 0), bounds[m]
+                if not after:
+                    continue
+                travels[first:after, m] = self.next_travel[m, columns[first:after]]
+                if first:
+                    travels[:first, m] = optimizer.travel_list(route[m - 1])[j]
+                arrival = departure[:after] + travels[:after, m]
+                start = np.maximum(arrival, optimizer.opening[j])
+                departure[:after] = start + optimizer.duration[j]
+                feasible[:after] &= (
+                    (start < optimizer.closing[j])
+                    & (departure[:after] <= optimizer.closing[j])
+                    & (departure[:after] + optimizer.return_times[j] <= optimizer.end_time)
+                )
+                arrivals[:after, m] = arrival
+
+            # Their scores, with the inserted activity in their cumulative vector
+            similarity = similarity_penalties(
+                self.route_dots + gram,
+                engine.interest_norms[route],
+                self.cumulative_sq[:-1] + 2 * cumulative_dots[:, :-1] + squares[:, None]
+            )
+            score = self.stop_score(
+                travels, arrivals, similarity, engine.rec_scores[route], engine.opening[route]
+            )
+            scores = np.where(stops[:, None] <= np.arange(len(route)), score + offset, 0.0)
+            # Added stop by stop, in route order like evaluate
+            for m in range(len(route)):
+                objective += scores[:, m]
+
+        objective = np.where(feasible, objective, -np.inf)
+        k = int(np.argmax(objective))
+        if objective[k] == -np.inf:
+            return None
+        return float(objective[k]), int(stops[k]), int(inserted[k])
@@ -0,0 +1,378 @@
+import itertools
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from content_based_interest import ActivityCatalog, recommend_activities
+from distance_matrix import DistanceMatrix, as_distance_matrix
+from cache import RecommendationCache
+from pole_penalties import (
+    PenaltyOverlay, MIN_POLE_TIME, MAX_POLE_TIME, INTERNAL_PENALTY_TIME, STATUE_SECTION
+)
+from itinerary_builder import (
+    Distances, time_to_minutes, append_route_steps, complete_itinerary
+)
+
+
+def sections_for_time(available_hours: float) -> int:
+    """Number of sections (poles) to visit, same thresholds as `utils.select_sections_by_interest`."""
+    if available_hours <= 3:
+        return 1
+    if available_hours <= 5:
+        return 2
+    if available_hours <= 8:
+        return 3
+    return 4
+
+
+class SectionPlanner:
+    """
+    Two-level itinerary planner over the sections (poles) of the estate.
+
+    Level 1 chooses the sections worth visiting and their order from
+    section-to-section travel summaries (shortest travel between any two of
+    their activities). Level 2 plans each section on its own small
+    sub-matrix, exactly: a depth-first search with dominance on (visited
+    set, last activity) and a score bound, over the `exact_limit` best
+    candidates of the section. Time left unused in a section carries over to
+    the next ones.
+
+    The pole rules of the guide apply (see pole_penalties): every section but
+    the last gets at least 90 minutes and at most 4 hours, moves inside a
+    section cost 10 more minutes after 3 hours there, and leaving a section
+    for another one before 90 minutes costs 10 hours, which in practice ends
+    the day. Penalties are kept in a PenaltyOverlay over the travel matrix.
+    """
+
+    def __init__(
+        self,
+        activities: List[Dict[str, Any]],
+        distances: DistanceMatrix,
+        scores: Dict[str, float],
+        start_point: str = "La Statue de Louis XIV",
+        exact_limit: int = 12
+    ):
+        """
+        Args:
+            activities: Candidate activities (the start point is skipped)
+            distances: Dense distance matrix (minutes)
+            scores: Score per activityId
+            start_point: Start and return location
+            exact_limit: Maximum number of candidates per section for the exact search
+        """
+        self.start_point = start_point
+        self.exact_limit = exact_limit
+        self.activities = [act for act in activities if act['name'] != start_point]
+        self.ids = [str(act['activityId']) for act in self.activities]
+        self.sections = np.array([str(act['sectionId']) for act in self.activities])
+        self.opening = np.array([act['openingTime'] * 60 for act in self.activities], dtype=float)
+        self.closing = np.array([act['closingTime'] * 60 for act in self.activities], dtype=float)
+        self.duration = np.array([act['duration'] * 60 for act in self.activities], dtype=float)
+        self.scores = np.array([scores.get(activity_id, 0) for activity_id in self.ids], dtype=float)
+        # Recommendation scores can all be negative: shift them, like the
+        # route optimizer, so that no visit is worth less than zero
+        self.prize_offset = max(0.0, -float(self.scores.min(initial=0.0)))
+        self.prizes = self.scores + self.prize_offset
+
+        # Travel times in activity order, the start point last (0 when unknown, like the CSV lookup)
+        index = np.append(distances.indices_of(self.activities), distances.index_of(start_point))
+        known = index >= 0
+        self.travel = np.zeros((len(index), len(index)))
+        self.travel[np.ix_(known, known)] = distances.values[np.ix_(index[known], index[known])]
+        self.start = len(self.activities)
+
+        # Pole penalties, lazily on top of the travel times (seconds); the start point is the statue
+        self.penalties = PenaltyOverlay(self.travel * 60, self.sections.tolist() + [STATUE_SECTION])
+
+        self.section_ids = sorted(set(self.sections.tolist()))
+        self.members = {
+            section: np.flatnonzero(self.sections == section)
+            for section in self.section_ids
+        }
+
+    def section_travel(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Section-to-section travel summary (minutes).
+
+        Returns:
+            (K x K shortest travel between sections, travel from the start point
+            to each section, travel from each section back to the start point)
+        """
+        k = len(self.section_ids)
+        between = np.zeros((k, k))
+        from_start = np.zeros(k)
+        to_start = np.zeros(k)
+        for a, section_a in enumerate(self.section_ids):
+            rows = self.members[section_a]
+            if not len(rows):
+                continue
+            from_start[a] = self.travel[self.start, rows].min()
+            to_start[a] = self.travel[rows, self.start].min()
+            for b, section_b in enumerate(self.section_ids):
+                columns = self.members[section_b]
+                if a != b and len(columns):
+                    between[a, b] = self.travel[np.ix_(rows, columns)].min()
+        return between, from_start, to_start
+
+    def section_value(self, section: str, time_share: float) -> float:
+        """Prize of the best activities of a section fitting in `time_share` minutes (at least one)."""
+        rows = self.members[section]
+        rows = rows[np.argsort(-self.prizes[rows], kind="stable")]
+        fits = np.cumsum(self.duration[rows]) <= time_share
+        fits[:1] = True
+        return float(self.prizes[rows[fits]].sum()) if len(rows) else 0.0
+
+    def choose_sections(self, start_time: float, end_time: float, max_sections: Optional[int] = None) -> List[str]:
+        """Sections to visit, in visiting order."""
+        available = end_time - start_time
+        if max_sections is None:
+            max_sections = sections_for_time(available / 60)
+        # Every section but the last needs its 90 minutes
+        max_sections = max(1, min(max_sections, int(available // (MIN_POLE_TIME / 60))))
+        time_share = min(available / max_sections, MAX_POLE_TIME / 60)
+
+        values = {section: self.section_value(section, time_share) for section in self.section_ids}
+        # Sections whose activities cannot fill 90 minutes can only come last
+        short = {
+            section for section in self.section_ids
+            if self.duration[self.members[section]].sum() < MIN_POLE_TIME / 60
+        }
+        chosen = []
+        for section in sorted(self.section_ids, key=lambda s: -values[s]):
+            if values[section] <= 0 or len(chosen) == max_sections:
+                break
+            if section in short and any(s in short for s in chosen):
+                continue
+            chosen.append(section)
+        if len(chosen) <= 1:
+            return chosen
+
+        # Order: shortest start -> sections -> start tour on the summaries (at most 4! orders)
+        between, from_start, to_start = self.section_travel()
+        position = {section: k for k, section in enumerate(self.section_ids)}
+        best_order, best_cost = None, np.inf
+        for order in itertools.permutations([position[section] for section in chosen]):
+            if any(self.section_ids[k] in short for k in order[:-1]):
+                continue
+            cost = from_start[order[0]] + to_start[order[-1]]
+            cost += sum(between[a, b] for a, b in zip(order, order[1:]))
+            if cost < best_cost:
+                best_order, best_cost = order, cost
+        return [self.section_ids[k] for k in best_order]
+
+    def plan_section(
+        self,
+        section: str,
+        current: int,
+        start_time: float,
+        deadline: float,
+        end_time: float,
+        max_activities: int,
+        visited: set,
+        penalties: Optional[PenaltyOverlay] = None
+    ) -> Tuple[List[int], float]:
+        """
+        Best route within a section (exact over its `exact_limit` best candidates).
+
+        Every stop must finish by `deadline`, and the walk back to the start
+        point must still arrive by `end_time`. Travel times include the pole
+        penalties of `penalties` (the planner's own overlay if None), and the
+        internal penalty once 3 hours have been spent in the section.
+
+        Returns:
+            (activity positions in visiting order, finish time)
+        """
+        rows = [row for row in self.members[section].tolist() if row not in visited]
+        rows.sort(key=lambda row: -self.prizes[row])
+        candidates = rows[:self.exact_limit]
+        if not candidates or max_activities <= 0:
+            return [], start_time
+
+        # Penalized travel (minutes) from the candidates and the current location
+        # (last row) to the candidates, before and after the internal penalty
+        if penalties is None:
+            penalties = self.penalties
+        internal = penalties.fork()
+        internal.add_internal_penalties(section)
+        sources = candidates + [current]
+        regular_travel = np.array([penalties.row(i)[candidates] for i in sources]) / 60
+        internal_travel = np.array([internal.row(i)[candidates] for i in sources]) / 60
+        internal_from = start_time + INTERNAL_PENALTY_TIME / 60
+
+        prizes = self.prizes[candidates].tolist()
+        prize_array = self.prizes[candidates]
+        opening = self.opening[candidates]
+        duration = self.duration[candidates]
+        latest_finish = np.minimum(self.closing[candidates], deadline)
+        best = {"score": 0.0, "finish": start_time, "route": []}
+        earliest: Dict[Tuple[int, int], float] = {}
+
+        def search(last: int, time: float, mask: int, route: List[int], score: float) -> None:
+            if score > best["score"] or (score == best["score"] and route and time < best["finish"]):
+                best.update(score=score, finish=time, route=list(route))
+            if len(route) >= max_activities:
+                return
+            # Bound: candidates that could still fit on their own (even with no
+            # walk), limited by the remaining number of stops and, as a
+            # fractional knapsack, by the remaining time
+            reachable = np.maximum(time, opening) + duration <= latest_finish
+            open_slots = [k for k in np.flatnonzero(reachable).tolist() if not mask & (1 << k)]
+            if not open_slots:
+                return
+            slots = np.array(open_slots)
+            by_prize = np.sort(prize_array[slots])[::-1][:max_activities - len(route)]
+            by_density = slots[np.argsort(-prize_array[slots] / duration[slots], kind="stable")]
+            capacity = latest_finish[slots].max() - time
+            used = np.cumsum(duration[by_density])
+            full = used <= capacity
+            knapsack = prize_array[by_density][full].sum()
+            if not full.all():
+                k = by_density[np.argmin(full)]
+                knapsack += prize_array[k] * (capacity - (used[full][-1] if full.any() else 0)) / duration[k]
+            if score + min(by_prize.sum(), knapsack) <= best["score"]:
+                return
+            # Penalties only grow with time, so an earlier finish still dominates
+            travel = internal_travel if time >= internal_from else regular_travel
+            for k in open_slots:
+                row = candidates[k]
+                start = max(time + travel[last, k], self.opening[row])
+                finish = start + self.duration[row]
+                if finish > latest_finish[k]:
+                    continue
+                if finish + self.travel[row, self.start] > end_time:
+                    continue
+                # Same visited set (same score) reached earlier from the same activity
+                key = (mask | (1 << k), k)
+                if earliest.get(key, np.inf) <= finish:
+                    continue
+                earliest[key] = finish
+                route.append(row)
+                search(k, finish, mask | (1 << k), route, score + prizes[k])
+                route.pop()
+
+        search(len(candidates), start_time, 0, [], 0.0)
+        return best["route"], best["finish"]
+
+    def plan(
+        self,
+        start_time: float,
+        end_time: float,
+        max_activities: int = 10,
+        max_sections: Optional[int] = None
+    ) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """
+        Plan the day section by section.
+
+        Each section gets a share of the remaining time proportional to its
+        value, between 90 minutes (except the last one) and 4 hours; whatever
+        it does not use goes to the following sections.
+
+        Returns:
+            (activity positions in visiting order, per-section summary)
+        """
+        order = self.choose_sections(start_time, end_time, max_sections)
+        values = {
+            section: max(self.section_value(section, (end_time - start_time) / max(len(order), 1)), 1e-9)
+            for section in order
+        }
+
+        # Penalties of this plan, over the shared base matrix
+        penalties = self.penalties.fork()
+        route: List[int] = []
+        visited: set = set()
+        summary = []
+        current, time = self.start, start_time
+        for k, section in enumerate(order):
+            remaining_value = sum(values[s] for s in order[k:])
+            share = (end_time - time) * values[section] / remaining_value
+            if k < len(order) - 1:
+                share = max(share, MIN_POLE_TIME / 60)
+            else:
+                share = end_time - time
+            deadline = min(time + share, time + MAX_POLE_TIME / 60, end_time)
+            section_route, finish = self.plan_section(
+                section, current, time, deadline, end_time, max_activities - len(route), visited, penalties
+            )
+            time_in_section = float(finish - time) if section_route else 0.0
+            route.extend(section_route)
+            visited.update(section_route)
+            summary.append({
+                "section": section,
+                "activities": len(section_route),
+                "score": float(self.scores[section_route].sum()) if section_route else 0.0,
+                "deadline": deadline,
+                "time_in_section": time_in_section
+            })
+            if section_route:
+                # Leaving before 90 minutes makes the other sections 10 h away
+                penalties.adjust_for_poles(section, time_in_section * 60)
+                current, time = section_route[-1], finish
+        return route, summary
+
+
+def build_section_itinerary(
+    likes_dislikes: List[Dict[str, Any]],
+    activities: List[Dict[str, Any]],
+    distances: Distances,
+    start_time: str,
+    end_time: str,
+    start_point: str = "La Statue de Louis XIV",
+    max_activities: int = 10,
+    max_sections: Optional[int] = None,
+    catalog: Optional[ActivityCatalog] = None,
+    scores: Optional[Dict[str, float]] = None,
+    exact_limit: int = 12,
+    recommendation_cache: Optional[RecommendationCache] = None
+) -> Dict[str, Any]:
+    """
+    Build an itinerary with the section planner, in the `build_itinerary` format.
+
+    Args:
+        likes_dislikes: User swipe data
+        activities: List of all activities
+        distances: Distance matrix (minutes), DistanceMatrix or nested dict
+        start_time: Departure time (HH:MM)
+        end_time: Return time (HH:MM)
+        start_point: Starting location
+        max_activities: Maximum number of activities
+        max_sections: Number of sections to visit (from the available time if None)
+        catalog: Precomputed ActivityCatalog of `activities` (built if None)
+        scores: Score per activityId (recommendation scores if None)
+        exact_limit: Maximum number of candidates per section for the exact search
+        recommendation_cache: Memoizes recommendation scores by swipe set
+
+    Returns:
+        Complete itinerary with timing and statistics
+    """
+    if catalog is None:
+        catalog = ActivityCatalog(activities)
+    matrix = as_distance_matrix(distances, activities)
+
+    recommend = recommendation_cache.recommend if recommendation_cache is not None else recommend_activities
+    scored_activities = recommend(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored_activities}
+    if scores is None:
+        scores = rec_scores
+
+    planner = SectionPlanner(
+        [catalog.get(activity_id) for activity_id in rec_scores if activity_id in catalog],
+        matrix, scores, start_point, exact_limit
+    )
+    start_min, end_min = time_to_minutes(start_time), time_to_minutes(end_time)
+    route, sections = planner.plan(start_min, end_min, max_activities, max_sections)
+
+    itinerary = [{
+        "order": 0,
+        "activity_name": start_point,
+        "arrival_time": start_time,
+        "departure_time": start_time,
+        "duration": 0,
+        "waiting_time": 0,
+        "travel_time_from_previous": 0
+    }]
+    current_time, current_location = append_route_steps(
+        itinerary, [planner.activities[p] for p in route], [float(planner.scores[p]) for p in route],
+        start_min, start_point, matrix, rec_scores
+    )
+    return complete_itinerary(
+        itinerary, start_time, current_time, current_location, start_point,
+        matrix, len(route), {"sections": sections}
+    )
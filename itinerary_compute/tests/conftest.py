@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from distance_matrix import DistanceMatrix
+from content_based_interest import ActivityCatalog
+from benchmark import synthetic_catalog, synthetic_swipes, synthetic_distances
+
+
+def data_path(name: str) -> str:
+    return os.path.join(ROOT, name)
+
+
+@pytest.fixture(scope="session")
+def activities():
+    with open(data_path('activity_v2.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def likes_dislikes():
+    with open(data_path('user_visit.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def distances(activities):
+    return DistanceMatrix.from_csv(data_path('activity_distances_temp.csv'), activities)
+
+
+@pytest.fixture(scope="session")
+def catalog(activities):
+    return ActivityCatalog(activities)
+
+
+@pytest.fixture(scope="session")
+def synthetic():
+    """(activities, swipes, distances) of a 300-activity synthetic catalog."""
+    activities = synthetic_catalog(300, seed=1)
+    return activities, synthetic_swipes(activities, seed=1), synthetic_distances(activities)
@@ -0,0 +1,15 @@
+from benchmark import measure
+
+
+def test_measure_reports_peak_and_retained_memory():
+    kept = []
+    result = measure(lambda: kept.append(bytearray(10 ** 6)), repeats=3)
+    assert result["repeats"] == 3
+    assert result["min_ms"] <= result["p50_ms"] <= result["p90_ms"] <= result["max_ms"]
+    assert 10 ** 6 <= result["peak_memory_bytes"] < 2 * 10 ** 6
+    assert 10 ** 6 <= result["retained_memory_bytes"] < 2 * 10 ** 6
+
+    # A temporary buffer counts in the peak but is not retained
+    result = measure(lambda: bytearray(10 ** 6), repeats=3)
+    assert result["peak_memory_bytes"] >= 10 ** 6
+    assert abs(result["retained_memory_bytes"]) < 10 ** 4
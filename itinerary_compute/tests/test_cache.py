@@ -0,0 +1,130 @@
+import json
+import pytest
+import cache
+from content_based_interest import ActivityCatalog, recommend_activities
+from cache import (
+    LRUCache, RecommendationCache, MemoryBackend, SqliteBackend, ItineraryCache, swipe_key, itinerary_request_key
+)
+from itinerary_builder import build_itinerary
+
+
+def test_swipe_key_ignores_order_but_not_repeats():
+    swipes = [{"activityId": 1, "like": True}, {"activityId": "2", "like": False}]
+    assert swipe_key(swipes) == swipe_key(swipes[::-1])
+    assert swipe_key(swipes) == swipe_key([{"activityId": "1", "like": 1}, swipes[1]])
+    assert swipe_key(swipes) != swipe_key(swipes + swipes[:1])
+    assert swipe_key(swipes) != swipe_key([{"activityId": 1, "like": False}, swipes[1]])
+
+
+def test_lru_cache_evicts_and_expires():
+    now = [0.0]
+    cache = LRUCache(max_size=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" is the least recently used
+    assert cache.get("b") is None and cache.get("c") == 3
+    now[0] = 11
+    assert cache.get("a") is None and len(cache) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_recommendation_cache_keys(activities, likes_dislikes):
+    cache = RecommendationCache()
+    catalog = ActivityCatalog(activities)
+    first = cache.recommend(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+    assert first == recommend_activities(likes_dislikes, activities, exclude_seen=True, catalog=catalog)
+    assert cache.recommend(likes_dislikes[::-1], activities, exclude_seen=True, catalog=catalog) == first
+    assert cache.hits == 1
+
+    # Other options, or another catalog version, are misses
+    cache.recommend(likes_dislikes, activities, exclude_seen=False, catalog=catalog)
+    cache.recommend(likes_dislikes, activities, beta=0.2, exclude_seen=True, catalog=catalog)
+    changed = ActivityCatalog(activities, version="other")
+    cache.recommend(likes_dislikes, activities, exclude_seen=True, catalog=changed)
+    assert cache.hits == 1 and cache.misses == 4
+
+
+def test_recommendation_results_are_copies(activities, likes_dislikes):
+    cache = RecommendationCache()
+    catalog = ActivityCatalog(activities)
+    expected = recommend_activities(likes_dislikes, activities, catalog=catalog)
+    # Changes to a miss or to a hit never reach the cached entry
+    for _ in range(2):
+        result = cache.recommend(likes_dislikes, activities, catalog=catalog)
+        assert result == expected
+        result[0]["recommendation_score"] = -1.0
+        result.pop()
+    assert cache.recommend(likes_dislikes, activities, catalog=catalog) == expected
+    assert cache.hits == 2
+
+
+def test_list_changed_in_place_is_not_served_stale(activities, likes_dislikes):
+    activities = [dict(act) for act in activities]
+    cache = RecommendationCache()
+    cache.recommend(likes_dislikes, activities)
+    assert cache.recommend(likes_dislikes, activities) == recommend_activities(likes_dislikes, activities)
+    assert cache.hits == 1
+
+    # Appended and replaced activities are new catalog versions
+    activities.append({**activities[0], "activityId": "new", "interests.art": 5})
+    assert cache.recommend(likes_dislikes, activities) == recommend_activities(likes_dislikes, activities)
+    activities[1] = {**activities[1], "interests.art": 0, "interests.nature": 5}
+    assert cache.recommend(likes_dislikes, activities) == recommend_activities(likes_dislikes, activities)
+    assert cache.hits == 1 and cache.misses == 3
+
+
+def test_catalog_version_from_json_file(tmp_path, activities):
+    path = tmp_path / "activities.json"
+    path.write_text(json.dumps(activities), encoding='utf-8')
+    catalog = ActivityCatalog.from_json(str(path))
+    assert catalog.version == ActivityCatalog.from_json(str(path)).version
+    path.write_text(json.dumps(activities[1:]), encoding='utf-8')
+    assert ActivityCatalog.from_json(str(path)).version != catalog.version
+
+
+def test_itinerary_request_key(likes_dislikes):
+    key = itinerary_request_key(likes_dislikes, "catalog", "distances", 540, 1080, max_activities=10)
+    assert key == itinerary_request_key(likes_dislikes[::-1], "catalog", "distances", 540, 1080, max_activities=10)
+    for other in (
+        itinerary_request_key(likes_dislikes, "catalog2", "distances", 540, 1080, max_activities=10),
+        itinerary_request_key(likes_dislikes, "catalog", "distances2", 540, 1080, max_activities=10),
+        itinerary_request_key(likes_dislikes, "catalog", "distances", 600, 1080, max_activities=10),
+        itinerary_request_key(likes_dislikes, "catalog", "distances", 540, 1080, max_activities=12),
+    ):
+        assert other != key
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_itinerary_cache_hits_are_copies(tmp_path, activities, likes_dislikes, distances, catalog, backend):
+    store = MemoryBackend() if backend == "memory" else SqliteBackend(str(tmp_path / "cache.sqlite"))
+    result_cache = ItineraryCache(store)
+
+    def build():
+        return build_itinerary(likes_dislikes, activities, distances, "09:00", "18:00",
+                               max_activities=5, catalog=catalog, result_cache=result_cache)
+
+    first = build()
+    expected = json.loads(json.dumps(first))
+    # Changes to the built result or to a hit never reach the cache
+    first["itinerary"].pop()
+    hit = build()
+    assert hit == expected
+    hit["itinerary"][0]["activity_name"] = "changed"
+    hit["stats"].clear()
+    assert build() == expected
+    assert result_cache.hits == 2 and result_cache.misses == 1
+
+
+def test_sqlite_backend_prunes_the_oldest_entries(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    store = SqliteBackend(str(tmp_path / "cache.sqlite"), ttl_seconds=None, max_entries=5, prune_interval=4)
+    for i in range(7):
+        now[0] += 1
+        store.put(f"k{i}", {"i": i})
+    # Pruned at the 4th insert only: under the limit, nothing deleted yet
+    assert all(store.get(f"k{i}") == {"i": i} for i in range(7))
+    now[0] += 1
+    store.put("k7", {"i": 7})
+    assert [store.get(f"k{i}") for i in range(8)] == [None] * 3 + [{"i": i} for i in range(3, 8)]
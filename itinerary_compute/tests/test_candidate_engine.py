@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog, recommend_activities
+from candidate_engine import CandidateEngine, TimeWindowIndex
+from itinerary_builder import greedy_route
+
+START = "La Statue de Louis XIV"
+
+
+@pytest.fixture(scope="module")
+def scored(synthetic):
+    activities, swipes, distances = synthetic
+    catalog = ActivityCatalog(activities)
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    return scored, distances, rec_scores, catalog
+
+
+def test_expired_activities_never_fit(scored):
+    engine = CandidateEngine(*scored[:3], START, scored[3])
+    end_time = 17 * 60
+    index = TimeWindowIndex(engine.opening, engine.closing, engine.duration, engine.return_times, end_time)
+    rng = np.random.default_rng(0)
+    previous = index.live.copy()
+    for current_time in np.sort(rng.uniform(8 * 60, end_time, 40)):
+        live = index.expire(current_time).copy()
+        assert not (live & ~previous).any()  # Only ever drops activities
+        # Even with no walk, a dropped activity is infeasible; a live one may still be
+        fits = engine.feasibility_mask(current_time, end_time, np.zeros(len(live)))
+        assert not (fits & ~live).any()
+        previous = live
+    assert not index.expire(end_time + 1).any()
+
+
+def test_short_windows_are_never_live():
+    opening = np.array([600.0, 600.0, 600.0])
+    closing = np.array([660.0, 640.0, 720.0])
+    duration = np.array([60.0, 60.0, 60.0])
+    index = TimeWindowIndex(opening, closing, duration, np.array([0.0, 0.0, 30.0]), 700)
+    # The second visit does not fit in its window; the third must start by 610 to get back by 700
+    np.testing.assert_array_equal(index.latest_start, [600, 580, 610])
+    np.testing.assert_array_equal(index.expire(0), [True, False, True])
+    np.testing.assert_array_equal(index.expire(600), [True, False, True])
+    np.testing.assert_array_equal(index.expire(600.5), [False, False, True])
+    np.testing.assert_array_equal(index.expire(611), [False, False, False])
+
+
+def reference_greedy(engine, start_time, end_time, start_index, max_activities):
+    """Greedy route re-checking every available activity at each step, no index."""
+    current_time, location, cumulative = start_time, start_index, np.zeros(9)
+    available = engine.selectable.copy()
+    route = []
+    while len(route) < max_activities:
+        travel = engine.travel_times_from(location)
+        mask = engine.feasibility_mask(current_time, end_time, travel) & available
+        if not mask.any():
+            break
+        scores = np.where(mask, engine.composite_scores(current_time, travel, cumulative), -np.inf)
+        best = int(np.argmax(scores))
+        route.append(best)
+        available[best] = False
+        current_time = max(current_time + travel[best], engine.opening[best]) + engine.duration[best]
+        location = engine.matrix_index[best]
+        cumulative = cumulative + engine.interests[best]
+    return route
+
+
+@pytest.mark.parametrize("start_time, end_time", [(9 * 60, 18 * 60), (13 * 60, 16 * 60), (8 * 60, 22 * 60)])
+def test_greedy_with_index_matches_full_scan(scored, start_time, end_time):
+    engine = CandidateEngine(*scored[:3], START, scored[3])
+    start_index = scored[1].index_of(START)
+    route, _ = greedy_route(engine, start_time, end_time, start_index, 30)
+    assert route == reference_greedy(
+        CandidateEngine(*scored[:3], START, scored[3]), start_time, end_time, start_index, 30
+    )
+
+
+def test_index_is_rebuilt_when_time_goes_back(scored):
+    engine = CandidateEngine(*scored[:3], START, scored[3])
+    start_index = scored[1].index_of(START)
+    late = engine.feasible_candidates(16 * 60, 18 * 60, start_index, np.zeros(9))
+    early = engine.feasible_candidates(9 * 60, 18 * 60, start_index, np.zeros(9))
+    expected = np.flatnonzero(
+        engine.feasibility_mask(9 * 60, 18 * 60, engine.travel_times_from(start_index)) & engine.available
+    )
+    np.testing.assert_array_equal(early[0], expected)
+    assert len(early[0]) > len(late[0])
+    # Another return time also rebuilds it
+    other = engine.feasible_candidates(9 * 60, 12 * 60, start_index, np.zeros(9))
+    assert engine.time_windows.end_time == 12 * 60 and len(other[0]) < len(early[0])
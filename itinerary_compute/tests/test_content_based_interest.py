@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+from content_based_interest import (
+    ActivityCatalog, INTEREST_KEYS, extract_interest_vector, build_user_vector, recommend_activities,
+    recommend_activities_batch
+)
+
+
+def reference_cosine(a, b):
+    norm_a, norm_b = np.linalg.norm(a), np.linalg.norm(b)
+    if norm_a == 0 or norm_b == 0:
+        return 0.0
+    return np.dot(a, b) / (norm_a * norm_b)
+
+
+def reference_recommend(likes_dislikes, activities, alpha=1.0, beta=0.5, exclude_seen=False, top_n=None):
+    """The per-activity loops of the original recommend_activities."""
+    lookup = {str(act["activityId"]): act for act in activities}
+    user_vector = np.zeros(len(INTEREST_KEYS))
+    for swipe in likes_dislikes:
+        activity = lookup.get(str(swipe["activityId"]))
+        if activity is not None:
+            user_vector += extract_interest_vector(activity) * (1 if swipe["like"] else -1)
+    norm = np.linalg.norm(user_vector)
+    if norm > 0:
+        user_vector = user_vector / norm
+    negatives = [lookup[str(s["activityId"])] for s in likes_dislikes
+                 if not s["like"] and str(s["activityId"]) in lookup]
+    seen = {str(swipe["activityId"]) for swipe in likes_dislikes} if exclude_seen else set()
+
+    scored = []
+    for activity in activities:
+        if str(activity["activityId"]) in seen:
+            continue
+        vector = extract_interest_vector(activity)
+        penalty = 0.0
+        if negatives:
+            penalty = beta * max(reference_cosine(vector, extract_interest_vector(n)) for n in negatives)
+        scored.append({**activity, "recommendation_score": alpha * reference_cosine(user_vector, vector) - penalty})
+    scored.sort(key=lambda x: x["recommendation_score"], reverse=True)
+    return scored if top_n is None else scored[:top_n]
+
+
+def assert_same_ranking(result, expected):
+    np.testing.assert_allclose(
+        [act["recommendation_score"] for act in result],
+        [act["recommendation_score"] for act in expected], atol=1e-12
+    )
+    assert [act["activityId"] for act in result] == [act["activityId"] for act in expected]
+
+
+def test_catalog_matches_activity_vectors(activities):
+    catalog = ActivityCatalog(activities)
+    vectors = np.array([extract_interest_vector(act) for act in activities])
+    np.testing.assert_array_equal(catalog.interests, vectors)
+    np.testing.assert_allclose(catalog.norms, np.linalg.norm(vectors, axis=1))
+    for activity, row in zip(activities, catalog.normalized):
+        norm = np.linalg.norm(extract_interest_vector(activity))
+        expected = extract_interest_vector(activity) / norm if norm > 0 else np.zeros(len(INTEREST_KEYS))
+        np.testing.assert_allclose(row, expected)
+        np.testing.assert_array_equal(catalog.vector(activity), extract_interest_vector(activity))
+    # An activity outside the catalog falls back to its own fields
+    outside = {"activityId": "unknown", "interests.art": 3}
+    np.testing.assert_array_equal(catalog.vector(outside), extract_interest_vector(outside))
+
+
+def test_user_vector_skips_unknown_activities(activities):
+    first, second = activities[0], activities[1]
+    swipes = [{"activityId": first["activityId"], "like": True},
+              {"activityId": str(second["activityId"]), "like": False},
+              {"activityId": "unknown", "like": True}]
+    expected = extract_interest_vector(first) - extract_interest_vector(second)
+    np.testing.assert_allclose(build_user_vector(swipes, activities, normalize=False), expected)
+    np.testing.assert_allclose(build_user_vector(swipes, activities), expected / np.linalg.norm(expected))
+    np.testing.assert_array_equal(build_user_vector([], activities), np.zeros(len(INTEREST_KEYS)))
+
+
+@pytest.mark.parametrize("options", [
+    {},
+    {"exclude_seen": True},
+    {"alpha": 0.7, "beta": 1.3, "top_n": 15},
+    {"exclude_seen": True, "top_n": 0},
+])
+def test_recommend_matches_reference_loops(activities, likes_dislikes, synthetic, options):
+    assert_same_ranking(
+        recommend_activities(likes_dislikes, activities, **options),
+        reference_recommend(likes_dislikes, activities, **options)
+    )
+    synthetic_activities, swipes, _ = synthetic
+    catalog = ActivityCatalog(synthetic_activities)
+    assert_same_ranking(
+        recommend_activities(swipes, synthetic_activities, catalog=catalog, **options),
+        reference_recommend(swipes, synthetic_activities, **options)
+    )
+
+
+def test_recommend_on_a_subset_of_the_catalog(activities, likes_dislikes, catalog):
+    # Activities of the catalog in another order, or outside the catalog
+    subset = activities[::3][::-1]
+    assert_same_ranking(
+        recommend_activities(likes_dislikes, subset, catalog=catalog),
+        reference_recommend(likes_dislikes, subset)
+    )
+    outside = subset + [{**activities[0], "activityId": "new", "interests.art": 5}]
+    assert_same_ranking(
+        recommend_activities(likes_dislikes, outside, catalog=catalog),
+        reference_recommend(likes_dislikes, outside)
+    )
+
+
+def test_recommend_without_swipes(activities):
+    result = recommend_activities([], activities)
+    assert [act["recommendation_score"] for act in result] == [0.0] * len(activities)
+    assert [act["activityId"] for act in result] == [act["activityId"] for act in activities]
+
+
+def test_batch_matches_single_user(activities, likes_dislikes, synthetic, catalog):
+    users = [likes_dislikes, likes_dislikes[:3], [], [dict(s, like=not s["like"]) for s in likes_dislikes]]
+    for activity_list, batch_catalog in ((activities, catalog), (activities[::2], catalog), (activities, None)):
+        scores = recommend_activities_batch(users, activity_list, alpha=0.8, beta=0.6, catalog=batch_catalog)
+        assert scores.shape == (len(users), len(activity_list))
+        for user, row in zip(users, scores):
+            single = {act["activityId"]: act["recommendation_score"] for act in reference_recommend(
+                user, activity_list, alpha=0.8, beta=0.6
+            )}
+            np.testing.assert_allclose(row, [single[act["activityId"]] for act in activity_list], atol=1e-12)
+
+    synthetic_activities, swipes, _ = synthetic
+    scores = recommend_activities_batch([swipes, swipes[::2]], synthetic_activities)
+    for user, row in zip([swipes, swipes[::2]], scores):
+        single = recommend_activities(user, synthetic_activities)
+        order = {act["activityId"]: act["recommendation_score"] for act in single}
+        np.testing.assert_allclose(row, [order[act["activityId"]] for act in synthetic_activities], atol=1e-12)
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog
+from data_bundle import build_bundle, load_bundle, MAGIC
+from itinerary_builder import build_itinerary
+
+
+@pytest.fixture(scope="module")
+def bundle_path(tmp_path_factory, activities, distances):
+    path = tmp_path_factory.mktemp("bundle") / "activity_data.bundle"
+    build_bundle(activities, distances, str(path))
+    return str(path)
+
+
+def test_bundle_matches_json_and_csv(bundle_path, activities, distances, catalog):
+    bundle = load_bundle(bundle_path)
+    assert bundle.activities == activities
+    np.testing.assert_array_equal(bundle.catalog.interests, catalog.interests)
+    np.testing.assert_array_equal(bundle.opening, [act['openingTime'] * 60 for act in activities])
+    np.testing.assert_array_equal(bundle.closing, [act['closingTime'] * 60 for act in activities])
+    np.testing.assert_array_equal(bundle.duration, [act['duration'] * 60 for act in activities])
+
+    # Same travel time for every pair of activities, by name and by activityId
+    names = [act['name'] for act in activities]
+    rows = distances.indices_of(activities)
+    expected = np.where((rows[:, None] >= 0) & (rows[None, :] >= 0), distances.values[np.ix_(rows, rows)], 0)
+    matrix = bundle.distances
+    ordered = matrix.indices_of(activities)
+    np.testing.assert_array_equal(matrix.values[np.ix_(ordered, ordered)], expected)
+    first, last = activities[0], activities[-1]
+    assert matrix.travel_time(first['activityId'], last['activityId']) == distances.travel_time(names[0], names[-1])
+
+
+def test_bundle_arrays_are_read_only_views(bundle_path):
+    bundle = load_bundle(bundle_path)
+    assert not bundle.interests.flags.writeable
+    assert not bundle.distances.values.flags.writeable
+    assert bundle.catalog is bundle.catalog and bundle.distances is bundle.distances
+
+
+def test_bundle_version(tmp_path, bundle_path, activities, distances):
+    version = load_bundle(bundle_path).version
+    assert load_bundle(bundle_path).catalog.version == version
+    other = tmp_path / "other.bundle"
+    assert build_bundle(activities, distances, str(other)) == version
+    changed = [dict(activities[0], duration=activities[0]['duration'] + 1)] + activities[1:]
+    assert build_bundle(changed, distances, str(other)) != version
+    assert build_bundle(activities, distances, str(other), version="v2") == "v2"
+    assert load_bundle(str(other)).version == "v2"
+
+
+def test_invalid_bundle(tmp_path, bundle_path):
+    path = tmp_path / "invalid.bundle"
+    with open(bundle_path, 'rb') as f:
+        content = f.read()
+    path.write_bytes(b"NOTABNDL" + content[len(MAGIC):])
+    with pytest.raises(ValueError, match="not an activity data bundle"):
+        load_bundle(str(path))
+
+
+def test_same_itinerary_from_bundle(bundle_path, activities, distances, likes_dislikes):
+    bundle = load_bundle(bundle_path)
+    expected = build_itinerary(likes_dislikes, activities, distances, "09:00", "18:00",
+                               max_activities=10, catalog=ActivityCatalog(activities))
+    result = build_itinerary(likes_dislikes, bundle.activities, bundle.distances, "09:00", "18:00",
+                             max_activities=10, catalog=bundle.catalog)
+    assert result == expected
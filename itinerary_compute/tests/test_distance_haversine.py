@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from benchmark import synthetic_catalog
+from distance_matrix import DistanceMatrix
+from distance_Haversine import (
+    haversine, haversine_matrix, walking_time_matrix, build_walking_matrix, write_distance_csv
+)
+
+
+@pytest.fixture(scope="module")
+def points():
+    # Not a multiple of the chunk sizes below
+    activities = synthetic_catalog(37, seed=2)
+    return activities, [act['latitude'] for act in activities], [act['longitude'] for act in activities]
+
+
+def scalar_matrix(latitudes, longitudes):
+    """One `haversine` call per pair, like the original nested loops."""
+    n = len(latitudes)
+    return np.array([
+        [0.0 if i == j else float(haversine(latitudes[i], longitudes[i], latitudes[j], longitudes[j]))
+         for j in range(n)]
+        for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize("chunk_size", [None, 0, 1, 5, 36, 37, 100])
+def test_chunks_match_the_scalar_loop(points, chunk_size):
+    _, latitudes, longitudes = points
+    expected = scalar_matrix(latitudes, longitudes)
+    matrix = haversine_matrix(latitudes, longitudes, chunk_size=chunk_size)
+    assert matrix.dtype == np.float64
+    np.testing.assert_allclose(matrix, expected, rtol=1e-12, atol=0)
+    np.testing.assert_array_equal(matrix.diagonal(), 0)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 8])
+def test_float32_matrix(points, chunk_size):
+    _, latitudes, longitudes = points
+    expected = scalar_matrix(latitudes, longitudes)
+    matrix = haversine_matrix(latitudes, longitudes, chunk_size=chunk_size, dtype=np.float32)
+    assert matrix.dtype == np.float32
+    np.testing.assert_allclose(matrix, expected, rtol=1e-6)
+
+    minutes = walking_time_matrix(latitudes, longitudes, speed_kmh=4, chunk_size=chunk_size, dtype=np.float32)
+    assert minutes.dtype == np.float32
+    np.testing.assert_allclose(minutes, expected * 15, rtol=1e-6)
+
+
+def test_walking_times(points):
+    activities, latitudes, longitudes = points
+    expected = scalar_matrix(latitudes, longitudes) * 12  # 5 km/h: 12 minutes per km
+    np.testing.assert_allclose(walking_time_matrix(latitudes, longitudes), expected, rtol=1e-12)
+    np.testing.assert_allclose(build_walking_matrix(activities, chunk_size=10), expected, rtol=1e-12)
+
+
+def test_csv_round_trip(tmp_path, points):
+    activities, latitudes, longitudes = points
+    minutes = walking_time_matrix(latitudes, longitudes)
+    path = tmp_path / "distances.csv"
+    write_distance_csv(str(path), [act['name'] for act in activities], minutes)
+    matrix = DistanceMatrix.from_csv(str(path), activities)
+    assert matrix.names == [act['name'] for act in activities]
+    np.testing.assert_allclose(matrix.values, minutes, rtol=1e-6)
@@ -0,0 +1,108 @@
+import logging
+import threading
+import numpy as np
+import pytest
+from benchmark import synthetic_catalog
+from distance_ingestion import HaversineProvider, RateLimiter, CheckpointLog, fetch_with_retry, ingest_distance_matrix
+
+
+class CountingProvider(HaversineProvider):
+    """Haversine times; counts the calls and fails on the pairs of `failing` origins."""
+
+    def __init__(self, failing=()):
+        super().__init__()
+        self.failing = set(failing)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def travel_time(self, origin, destination):
+        with self.lock:
+            self.calls += 1
+        if origin in self.failing:
+            raise ConnectionError("transient")
+        return super().travel_time(origin, destination)
+
+
+def no_sleep(seconds):
+    pass
+
+
+def ingest(activities, provider, path, **options):
+    return ingest_distance_matrix(activities, provider, str(path), max_workers=4, rate_per_second=None,
+                                  backoff_seconds=0, sleep=no_sleep, **options)
+
+
+def expected_matrix(activities):
+    provider = HaversineProvider()
+    coordinates = [(act['latitude'], act['longitude']) for act in activities]
+    values = np.array([[provider.travel_time(a, b) for b in coordinates] for a in coordinates])
+    np.fill_diagonal(values, 0)
+    return values
+
+
+@pytest.fixture(scope="module")
+def activities():
+    return synthetic_catalog(12, seed=5)
+
+
+@pytest.mark.parametrize("symmetric", [True, False])
+def test_ingestion_fetches_every_pair_once(tmp_path, activities, symmetric):
+    provider = CountingProvider()
+    n = len(activities)
+    matrix = ingest(activities, provider, tmp_path / "log.jsonl", symmetric=symmetric)
+    assert provider.calls == (n * (n - 1) // 2 if symmetric else n * (n - 1))
+    np.testing.assert_allclose(matrix.values, expected_matrix(activities), rtol=1e-6)
+    assert len(CheckpointLog(str(tmp_path / "log.jsonl")).load()) == provider.calls
+
+
+def test_resume_only_fetches_missing_pairs(tmp_path, activities, caplog):
+    path = tmp_path / "log.jsonl"
+    origin = (activities[3]['latitude'], activities[3]['longitude'])
+    failing = CountingProvider(failing=[origin])
+    with caplog.at_level(logging.WARNING, logger="distance_ingestion"):
+        ingest(activities, failing, path, retries=2)
+    # Failed pairs are reported as warnings and not logged; a truncated last
+    # line (interrupted write) is ignored
+    logged = CheckpointLog(str(path)).load()
+    n = len(activities)
+    assert len(caplog.records) == n * (n - 1) // 2 - len(logged) > 0
+    assert all(activities[3]['name'] in record.getMessage() for record in caplog.records)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"from": "Activité')
+
+    provider = CountingProvider()
+    progress = []
+    matrix = ingest(activities, provider, path, progress=lambda done, total: progress.append((done, total)))
+    assert provider.calls == n * (n - 1) // 2 - len(logged) == n - 1 - 3
+    assert progress[-1] == (provider.calls, provider.calls)
+    np.testing.assert_allclose(matrix.values, expected_matrix(activities), rtol=1e-6)
+
+    # Nothing left to fetch
+    provider = CountingProvider()
+    ingest(activities, provider, path)
+    assert provider.calls == 0
+
+
+def test_fetch_with_retry_backs_off_then_raises():
+    delays = []
+    provider = CountingProvider(failing=[(0.0, 0.0)])
+    with pytest.raises(ConnectionError):
+        fetch_with_retry(provider, (0.0, 0.0), (1.0, 1.0), RateLimiter(None), retries=3,
+                         backoff_seconds=1.0, sleep=delays.append)
+    assert provider.calls == 3
+    assert len(delays) == 2 and 1.0 <= delays[0] <= 2.0 and 2.0 <= delays[1] <= 4.0
+    assert fetch_with_retry(provider, (0.0, 0.1), (0.0, 0.1), RateLimiter(None)) == 0.0
+
+
+def test_rate_limiter_spaces_calls():
+    now = [10.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    limiter = RateLimiter(4, clock=lambda: now[0], sleep=sleep)
+    for _ in range(3):
+        limiter.wait()
+    assert sleeps == [0.25, 0.25]
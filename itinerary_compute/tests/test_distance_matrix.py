@@ -0,0 +1,44 @@
+import numpy as np
+from distance_matrix import DistanceMatrix, get_travel_time
+from distance_Haversine import write_distance_csv
+from itinerary_builder import load_distance_matrix
+from conftest import data_path
+
+
+def test_from_csv_matches_dict_loader(activities):
+    path = data_path('activity_distances_temp.csv')
+    matrix = DistanceMatrix.from_csv(path, activities)
+    nested = load_distance_matrix(path)
+    for a in matrix.names[:20]:
+        for b in matrix.names:
+            assert matrix.travel_time(a, b) == np.float32(get_travel_time(nested, a, b))
+
+
+def test_from_csv_quoted_names_missing_and_repeated_rows(tmp_path):
+    names = ['A, the first', 'B "quoted"', 'C']
+    values = np.array([[0, 1.5, 2], [3, 0, 4], [5, 6, 0]], dtype=np.float32)
+    path = str(tmp_path / 'm.csv')
+    write_distance_csv(path, names, values)
+    # Drop row C, repeat row A with other values: the last one wins
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('"A, the first",0,7,8\n')
+    lines = open(path, encoding='utf-8').read().splitlines()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(line for line in lines if not line.startswith('C,')) + '\n')
+
+    matrix = DistanceMatrix.from_csv(path)
+    assert matrix.names == names
+    assert matrix.values.dtype == np.float32
+    np.testing.assert_array_equal(matrix.values, [[0, 7, 8], [3, 0, 4], [0, 0, 0]])
+
+
+def test_from_dict_round_trip(distances):
+    rebuilt = DistanceMatrix.from_dict(distances.to_dict())
+    assert rebuilt.names == distances.names
+    np.testing.assert_array_equal(rebuilt.values, distances.values)
+    assert rebuilt.version == distances.version
+
+
+def test_unknown_activity_travel_time_is_zero(distances):
+    assert distances.travel_time('nowhere', distances.names[0]) == 0.0
+    assert distances.index_of('nowhere') == -1
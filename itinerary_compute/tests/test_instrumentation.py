@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog, recommend_activities
+from candidate_engine import CandidateEngine
+from instrumentation import Instrumentation, REJECTION_REASONS, NO_PHASE, phase
+
+START = "La Statue de Louis XIV"
+
+
+def test_phases_accumulate_and_call_the_hook():
+    now = [0.0]
+    calls = []
+    instrumentation = Instrumentation(hook=lambda name, ms: calls.append((name, ms)), clock=lambda: now[0])
+    for elapsed in (0.002, 0.003):
+        with phase(instrumentation, "setup"):
+            now[0] += elapsed
+    with pytest.raises(KeyError):
+        with instrumentation.phase("lookup"):
+            now[0] += 0.001
+            raise KeyError("failed")
+    instrumentation.count("steps")
+    instrumentation.count("steps", np.int64(2))
+
+    report = instrumentation.report()
+    assert report["phases_ms"] == pytest.approx({"setup": 5.0, "lookup": 1.0})
+    assert report["counters"] == {"steps": 3}
+    assert [name for name, _ in calls] == ["setup", "setup", "lookup"]
+    # The report is a snapshot
+    report["counters"]["steps"] = 0
+    assert instrumentation.report()["counters"] == {"steps": 3}
+
+
+def test_disabled_phase_is_shared_no_op():
+    assert phase(None, "setup") is NO_PHASE
+    with phase(None, "setup"):
+        pass
+
+
+@pytest.fixture(scope="module")
+def engine_args(synthetic):
+    activities, swipes, distances = synthetic
+    catalog = ActivityCatalog(activities)
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    return scored, distances, rec_scores, START, catalog
+
+
+@pytest.mark.parametrize("current_time", [9 * 60, 14 * 60, 16 * 60 + 30, 18 * 60])
+def test_rejections_cover_every_available_candidate(engine_args, current_time):
+    engine = CandidateEngine(*engine_args)
+    end_time = 18 * 60
+    start = engine.distances.index_of(START)
+    # Build the time window index at an early time, then prune from there
+    engine.feasible_candidates(8 * 60, end_time, start, np.zeros(9))
+
+    instrumentation = Instrumentation()
+    feasible = engine.feasible_candidates(current_time, end_time, start, np.zeros(9), instrumentation=instrumentation)
+    counters = instrumentation.report()["counters"]
+    assert set(counters) == {"candidates_evaluated"} | {f"rejected_{reason}" for reason in REJECTION_REASONS}
+
+    # Evaluated candidates are either feasible or rejected by a check; the others were pruned
+    available = np.flatnonzero(engine.available)
+    rejected = sum(counters[f"rejected_{reason}"] for reason in REJECTION_REASONS)
+    feasible_count = 0 if feasible is None else len(feasible[0])
+    assert counters["candidates_evaluated"] + counters["rejected_expired"] == len(available)
+    assert rejected + feasible_count == len(available)
+
+    # Pruned candidates are rejections a full scan attributes to the checks
+    travel = engine.travel_times_from(start)[available]
+    full_scan = engine.rejection_counts(current_time, end_time, travel, available)
+    assert sum(full_scan.values()) == rejected
+    if current_time >= end_time:
+        assert counters["rejected_expired"] > 0 and counters["candidates_evaluated"] == 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils import create_user_preferences, calculate_interest_score, calculate_interest_scores
+
+KEYS = ['architecture', 'landscape', 'politic', 'history', 'courtlife', 'art', 'engineering', 'spirituality', 'nature']
+
+
+def reference_preferences(likes_dislikes, df, scale_factor=0.1):
+    """The row filtering loop of the original create_user_preferences."""
+    preferences = {key: 0 for key in KEYS}
+    for like_data in likes_dislikes:
+        like_value = 1 if like_data['like'] else -0.5
+        activity = df[df['activityId'] == str(like_data['activityId'])].iloc[0]
+        for key in preferences:
+            preferences[key] += activity['interests.' + key] * like_value * scale_factor
+    return preferences
+
+
+@pytest.fixture(scope="module")
+def frame(activities):
+    df = pd.json_normalize(activities)
+    df['activityId'] = df['activityId'].astype(str)
+    return df
+
+
+@pytest.mark.parametrize("scale_factor", [0.1, 0.85])
+def test_preferences_match_row_filtering(frame, likes_dislikes, scale_factor):
+    preferences = create_user_preferences(likes_dislikes, frame, scale_factor=scale_factor)
+    expected = reference_preferences(likes_dislikes, frame, scale_factor=scale_factor)
+    assert list(preferences) == KEYS
+    # Same summation order: identical values, not just close
+    assert preferences == expected
+
+
+def test_interest_scores_match_row_function(frame, likes_dislikes):
+    for swipes in (likes_dislikes, [dict(s, like=not s['like']) for s in likes_dislikes], []):
+        preferences = create_user_preferences(swipes, frame)
+        expected = [calculate_interest_score(row, preferences) for _, row in frame.iterrows()]
+        np.testing.assert_allclose(calculate_interest_scores(frame, preferences), expected, rtol=1e-12, atol=1e-15)
+
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import pytest
+from main import validate_input, handle_http, InvalidInput, INPUT_DEFAULTS
+
+SWIPES = [{"activityId": "1", "like": True}]
+
+
+def request(**fields):
+    return {"likes_dislikes": SWIPES, "start_time": "09:00", "end_time": "18:00", **fields}
+
+
+def test_defaults_are_filled_in():
+    assert validate_input(request()) == {**INPUT_DEFAULTS, **request()}
+    assert validate_input(request(start_time="0:00", end_time="24:00"))["end_time"] == "24:00"
+
+
+@pytest.mark.parametrize("value", [
+    "09:75", "25:00", "24:01", "-1:30", "9:5", "09:00:00", "0x9:00", " 09:00", "09h00", "", 900, None
+])
+def test_invalid_times(value):
+    with pytest.raises(InvalidInput, match="start_time must be a HH:MM time"):
+        validate_input(request(start_time=value))
+
+
+@pytest.mark.parametrize("fields, message", [
+    ({"start_time": "18:00", "end_time": "09:00"}, "end_time must be after start_time"),
+    ({"likes_dislikes": [{"activityId": "1"}]}, "likes_dislikes"),
+    ({"max_activities": -1}, "max_activities"),
+    ({"max_activities": True}, "max_activities"),
+    ({"alpha": "1"}, "alpha"),
+    ({"solver": "exact"}, "solver"),
+    ({"mobility": "car"}, "mobility"),
+    ({"extra": 1}, "unknown fields"),
+])
+def test_invalid_fields(fields, message):
+    with pytest.raises(InvalidInput, match=message):
+        validate_input(request(**fields))
+
+
+def test_missing_fields():
+    with pytest.raises(InvalidInput, match="missing fields: end_time"):
+        validate_input({"likes_dislikes": SWIPES, "start_time": "09:00"})
+    with pytest.raises(InvalidInput, match="JSON object"):
+        validate_input([request()])
+
+
+class Writer:
+    def __init__(self):
+        self.data = b""
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class Service:
+    workers = 1
+
+    async def handle(self, payload):
+        return validate_input(payload)
+
+
+def exchange(raw):
+    """Responses of handle_http to the raw bytes of a connection, as (status, body, connection)."""
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        writer = Writer()
+        await handle_http(Service(), reader, writer)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.closed
+    responses = []
+    rest = writer.data
+    while rest:
+        head, _, rest = rest.partition(b"\r\n\r\n")
+        lines = head.decode('latin-1').split("\r\n")
+        headers = dict(line.split(": ", 1) for line in lines[1:])
+        length = int(headers["Content-Length"])
+        body, rest = rest[:length], rest[length:]
+        responses.append((int(lines[0].split()[1]), json.loads(body), headers["Connection"]))
+    return responses
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1e3", "١٢"])
+def test_invalid_content_length(length):
+    raw = f"POST /itinerary HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode('utf-8')
+    # The body cannot be framed: one 400 response, then the connection is closed
+    assert exchange(raw) == [(400, {"error": "invalid Content-Length"}, "close")]
+
+
+def test_request_too_large():
+    raw = b"POST /itinerary HTTP/1.1\r\nContent-Length: 99999999\r\n\r\n"
+    assert exchange(raw) == [(413, {"error": "request too large"}, "close")]
+
+
+def test_keep_alive_routes():
+    raw = (b"GET /missing HTTP/1.1\r\n\r\n"
+           b"GET /itinerary HTTP/1.1\r\nContent-Length: 0\r\n\r\n"
+           b"POST /itinerary HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}"
+           b"POST /itinerary HTTP/1.1\r\nContent-Length: 5\r\nConnection: close\r\n\r\nnope!")
+    assert exchange(raw) == [
+        (404, {"error": "not found"}, "keep-alive"),
+        (405, {"error": "use POST"}, "keep-alive"),
+        (400, {"error": "missing fields: likes_dislikes, start_time, end_time"}, "keep-alive"),
+        (400, {"error": "Expecting value: line 1 column 1 (char 0)"}, "close"),
+    ]
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from benchmark import synthetic_catalog
+from distance_matrix import DistanceMatrix
+from matrix_update import (
+    diff_catalog, haversine_pair_times, update_distance_matrix, write_matrix, load_previous_activities
+)
+
+
+def full_rebuild(activities):
+    values = haversine_pair_times()(activities, activities)
+    np.fill_diagonal(values, 0)
+    return DistanceMatrix([act['name'] for act in activities], values,
+                          activity_ids=[act['activityId'] for act in activities])
+
+
+def counting(pair_times):
+    """`pair_times` that records the number of pairs it computes."""
+    def counted(origins, destinations):
+        counted.pairs += len(origins) * len(destinations)
+        return pair_times(origins, destinations)
+    counted.pairs = 0
+    return counted
+
+
+@pytest.fixture(scope="module")
+def catalogs():
+    previous = synthetic_catalog(60, seed=3)
+    activities = [dict(act) for act in previous if act['activityId'] not in ('7', '8')]  # Removed
+    activities[5]['latitude'] += 0.001  # Moved
+    activities[9]['name'] = "Renamed"
+    activities += [dict(act, activityId=f"new-{act['activityId']}", name=f"New {act['name']}")
+                   for act in synthetic_catalog(4, seed=4)[1:]]  # Added
+    activities = activities[::-1]
+    return previous, activities
+
+
+def test_diff_catalog(catalogs):
+    previous, activities = catalogs
+    diff = diff_catalog(previous, activities)
+    assert sorted(diff.added) == ["new-1", "new-2", "new-3"]
+    assert diff.moved == [activities[-6]['activityId']]
+    assert sorted(diff.removed) == ['7', '8']
+    assert len(diff.unchanged) == len(previous) - 3
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_update_matches_full_rebuild(catalogs, symmetric):
+    previous, activities = catalogs
+    pair_times = counting(haversine_pair_times())
+    matrix = update_distance_matrix(full_rebuild(previous), previous, activities, pair_times, symmetric=symmetric)
+    expected = full_rebuild(activities)
+    assert matrix.names == expected.names
+    np.testing.assert_allclose(matrix.values, expected.values, rtol=1e-6)
+    assert matrix.travel_time("Renamed", activities[0]['name']) == expected.travel_time("Renamed", activities[0]['name'])
+
+    # Only the rows (and columns) of the 4 added or moved activities are computed
+    n = len(activities)
+    assert pair_times.pairs == (4 * n if symmetric else 4 * n + (n - 4) * 4)
+
+
+def test_update_from_an_unchanged_catalog_computes_nothing(catalogs):
+    previous = catalogs[0]
+    pair_times = counting(haversine_pair_times())
+    matrix = update_distance_matrix(full_rebuild(previous), previous, previous, pair_times)
+    assert pair_times.pairs == 0
+    np.testing.assert_array_equal(matrix.values, full_rebuild(previous).values)
+
+
+def test_update_does_not_bind_the_previous_matrix(catalogs):
+    previous, activities = catalogs
+    rebuilt = full_rebuild(previous)
+    unbound = DistanceMatrix(rebuilt.names, rebuilt.values)
+    matrix = update_distance_matrix(unbound, previous, activities, haversine_pair_times())
+    assert unbound.id_index == {}
+    np.testing.assert_allclose(matrix.values, full_rebuild(activities).values, rtol=1e-6)
+
+
+def test_manifest_round_trip(tmp_path, catalogs):
+    previous, activities = catalogs
+    csv_path = str(tmp_path / "distances.csv")
+    matrix = full_rebuild(previous)
+    assert write_matrix(csv_path, matrix, previous) == matrix.version
+    stored = load_previous_activities(csv_path, activities)
+    assert [act['activityId'] for act in stored] == [act['activityId'] for act in previous]
+
+    # From the CSV and its manifest, the update still detects the moved activity
+    loaded = DistanceMatrix.from_csv(csv_path)
+    updated = update_distance_matrix(loaded, stored, activities, haversine_pair_times())
+    np.testing.assert_allclose(updated.values, full_rebuild(activities).values, rtol=1e-6)
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+import mobility
+from distance_matrix import DistanceMatrix
+from mobility import MobilityProfile, MobilityView, mobility_view
+
+
+@pytest.fixture
+def base():
+    names = [f"A{i}" for i in range(4)]
+    values = np.arange(16, dtype=np.float32).reshape(4, 4)
+    return DistanceMatrix(names, values)
+
+
+def test_default_profile_is_the_matrix_itself(base):
+    assert mobility_view(base, None) is base
+    assert mobility_view(base, "default") is base
+
+
+def test_scaled_values(base):
+    view = mobility_view(base, "children")
+    np.testing.assert_allclose(np.asarray(view.values), base.values * np.float32(1.3))
+    assert view.travel_time("A1", "A2") == pytest.approx(base.values[1, 2] * 1.3)
+    detour = np.ones((4, 4), dtype=np.float32)
+    view = mobility_view(base, "wheelchair", detour)
+    assert view.values[1, 2] == pytest.approx((base.values[1, 2] + 1) * 1.3)
+    with pytest.raises(ValueError):
+        mobility_view(base, "wheelchair")
+
+
+def test_views_follow_the_base_matrix(base):
+    view = mobility_view(base, "children")
+    assert mobility_view(base, "children") is not view
+    base.values = base.values + 1
+    assert mobility_view(base, "children").values[1, 2] == pytest.approx(base.values[1, 2] * 1.3)
+
+
+def test_kept_view_version_is_computed_once(base, monkeypatch):
+    detour = np.ones((4, 4), dtype=np.float32)
+    view = mobility_view(base, "wheelchair", detour)
+    version = view.version
+    assert mobility_view(view, "wheelchair", detour) is view
+    assert mobility_view(view, "wheelchair", detour.copy()) is not view
+    assert mobility_view(view, "children").base is base
+
+    # Passing the kept view back reuses its version: nothing is hashed again
+    def fail(*args, **kwargs):
+        raise AssertionError("matrix re-hashed")
+    monkeypatch.setattr(mobility, "hashlib", SimpleNamespace(sha256=fail))
+    assert mobility_view(view, "wheelchair", detour).version == version
+
+
+def test_view_version_keys(base):
+    detour = np.ones((4, 4), dtype=np.float32)
+    versions = {
+        base.version,
+        mobility_view(base, "children").version,
+        mobility_view(base, "reduced_mobility").version,
+        mobility_view(base, MobilityProfile.from_speed(3.0)).version,
+        mobility_view(base, "wheelchair", detour).version,
+        mobility_view(base, "wheelchair", detour * 2).version,
+    }
+    assert len(versions) == 6
+    # Same base, profile and detour content: same version, even from new objects
+    assert mobility_view(base, "wheelchair", detour.copy()).version == \
+        mobility_view(base, "wheelchair", detour).version
+    assert MobilityView(base, mobility.PROFILES["children"]).version == mobility_view(base, "children").version
+    # The detour of a profile without accessible_only is ignored
+    assert mobility_view(base, "children", detour).detour is None
+    assert mobility_view(base, "children", detour).version == mobility_view(base, "children").version
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog, recommend_activities
+from candidate_engine import CandidateEngine
+from data_bundle import build_bundle
+from itinerary_builder import build_itinerary, greedy_route
+from multi_start import (
+    StartConfig, start_configs, construct, run_starts, route_objective, multi_start_itinerary, MultiStartPool
+)
+
+START = "La Statue de Louis XIV"
+
+
+@pytest.fixture(scope="module")
+def data(synthetic):
+    activities, swipes, distances = synthetic
+    return activities, swipes, distances, ActivityCatalog(activities)
+
+
+def request(swipes, start_time=9 * 60, end_time=18 * 60):
+    return {"likes_dislikes": swipes, "start_time": start_time, "end_time": end_time,
+            "start_point": START, "max_activities": 10}
+
+
+def test_start_configs():
+    configs = start_configs(9, alpha=1.0, beta=0.4, gamma=0.5, delta=0.2, first_stops=["a", "b"], seed=3)
+    assert configs[0] == StartConfig(1.0, 0.4, 0.5, 0.2, seed=3)
+    assert len(configs) == 9
+    assert [c.first_stop for c in configs[1:]] == ["a", "b"] * 4
+    assert [c.tolerance for c in configs[1:]] == [0.05, 0.0] * 4
+    assert all(c.alpha > 0 and c.beta > 0 for c in configs)
+    assert start_configs(9, first_stops=["a", "b"], seed=3)[1:] == configs[1:]
+    assert start_configs(9, first_stops=["a", "b"], seed=4)[1:] != configs[1:]
+
+
+def test_plain_construction_is_the_greedy_route(data):
+    activities, swipes, distances, catalog = data
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    engine = CandidateEngine(scored, distances, rec_scores, START, catalog)
+    start_index = distances.index_of(START)
+    expected, _ = greedy_route(CandidateEngine(scored, distances, rec_scores, START, catalog),
+                               9 * 60, 18 * 60, start_index, 10)
+    assert construct(engine, StartConfig(), 9 * 60, 18 * 60, start_index, 10) == expected
+    # The engine is reset between constructions
+    assert construct(engine, StartConfig(), 9 * 60, 18 * 60, start_index, 10) == expected
+
+    first = str(engine.ids[expected[-1]])
+    forced = construct(engine, StartConfig(first_stop=first), 9 * 60, 18 * 60, start_index, 10)
+    assert str(engine.ids[forced[0]]) == first
+
+
+def test_multi_start_is_never_worse_than_greedy(data):
+    activities, swipes, distances, catalog = data
+    greedy = build_itinerary(swipes, activities, distances, "09:00", "18:00",
+                             start_point=START, max_activities=10, catalog=catalog)
+    result = multi_start_itinerary(swipes, "09:00", "18:00", activities=activities, distances=distances,
+                                   start_point=START, max_activities=10, starts=12, catalog=catalog)
+    stats = result["stats"]["multi_start"]
+    assert stats["starts"] == 12 and 1 <= stats["distinct_routes"] <= 12
+
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    engine = CandidateEngine(scored, distances, rec_scores, START, catalog)
+    position_of = {activity_id: p for p, activity_id in enumerate(engine.ids.tolist())}
+    # Stops are shifted so that none counts less than zero
+    offset = max(0.0, -(engine.rec_scores[engine.selectable].min() - 0.4 - 0.5 - 0.2))
+
+    def composite(itinerary):
+        route = [position_of[str(step['activity_id'])] for step in itinerary['itinerary'][1:-1]]
+        scores = route_objective(engine, route, 9 * 60, distances.index_of(START))
+        return sum(score + offset for score in scores)
+
+    assert composite(result) >= composite(greedy) - 1e-9
+    assert result == multi_start_itinerary(swipes, "09:00", "18:00", activities=activities, distances=distances,
+                                           start_point=START, max_activities=10, starts=12, catalog=catalog)
+
+
+def test_objectives(data):
+    activities, swipes, distances, catalog = data
+    options = dict(activities=activities, distances=distances, start_point=START, max_activities=10,
+                   starts=8, catalog=catalog)
+    by_count = multi_start_itinerary(swipes, "09:00", "18:00", objective="activities", **options)
+    for objective in ("composite", "recommendation"):
+        result = multi_start_itinerary(swipes, "09:00", "18:00", objective=objective, **options)
+        assert result["total_activities"] <= by_count["total_activities"]
+
+    def shortest(itinerary):
+        return -itinerary["total_duration"]
+    result = multi_start_itinerary(swipes, "09:00", "18:00", objective=shortest, **options)
+    assert result["stats"]["multi_start"]["objective"] == "shortest"
+
+    with pytest.raises(ValueError, match="Unknown objective"):
+        multi_start_itinerary(swipes, "09:00", "18:00", objective="fastest", **options)
+    with pytest.raises(ValueError, match="needs a pool"):
+        multi_start_itinerary(swipes, "09:00", "18:00")
+
+
+def test_pool_matches_in_process_runs(tmp_path, data):
+    activities, swipes, distances, catalog = data
+    path = str(tmp_path / "synthetic.bundle")
+    build_bundle(activities, distances, path)
+    configs = start_configs(5, first_stops=[a['activityId'] for a in activities[1:4]], seed=1)
+    with MultiStartPool(path, workers=2) as pool:
+        routes = pool.run(request(swipes), configs)
+        bundle = pool.bundle
+        expected = run_starts(request(swipes), configs, bundle.activities, bundle.distances, bundle.catalog)
+    assert routes == expected
+    assert routes[0] == run_starts(request(swipes), configs[:1], activities, distances, catalog)[0]
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from activity_graph import ActivityGraph
+from utils import (
+    generate_activity_graph, adjust_edge_weights_for_poles, add_internal_pole_penalties,
+    select_activities_in_pole
+)
+
+
+def reference_penalties(passage, df, rules):
+    """Pair-by-pair version of the pole rules, like the original loops."""
+    weights = {(f, t): w for f, t, w in zip(passage['from'], passage['to'], passage['travel_time'])}
+    sections = dict(zip(df['name'], df['sectionId']))
+    for kind, section, time_in_pole in rules:
+        for (f, t) in weights:
+            if sections[f] != section:
+                continue
+            if kind == 'internal':
+                if sections[t] == section:
+                    weights[f, t] += 10 * 60
+            elif time_in_pole < 90 * 60:
+                if sections[t] not in (section, '0'):
+                    weights[f, t] += 10 * 3600
+            elif time_in_pole >= 4 * 3600:
+                if sections[t] == section and f != t:
+                    weights[f, t] += 10 * 3600
+    return [weights[f, t] for f, t in zip(passage['from'], passage['to'])]
+
+
+@pytest.fixture(scope="module")
+def frames(activities, distances):
+    df = pd.json_normalize(activities)
+    # Every section, a few activities each, to keep the reference fast
+    df = df.groupby('sectionId', sort=False).head(6).reset_index(drop=True)
+    df['interest_score'] = np.linspace(1, 0, len(df))
+    dist_df_walk = pd.DataFrame(distances.to_dict()).T
+    _, passage = generate_activity_graph(df, dist_df_walk)
+    return df, passage
+
+
+@pytest.mark.parametrize("rules", [
+    [('adjust', '3', 30 * 60)],
+    [('adjust', '3', 4 * 3600)],
+    [('adjust', '3', 2 * 3600)],
+    [('adjust', '2', 0), ('internal', '4', 0), ('adjust', '4', 5 * 3600), ('internal', '4', 0)],
+])
+def test_pole_penalties_match_pairwise_rules(frames, rules):
+    df, passage = frames
+    expected = reference_penalties(passage, df, rules)
+    original = passage['travel_time'].copy()
+    adjusted = passage
+    for kind, section, time_in_pole in rules:
+        if kind == 'internal':
+            adjusted = add_internal_pole_penalties(adjusted, section, df)
+        else:
+            adjusted = adjust_edge_weights_for_poles(adjusted, section, df, time_in_pole)
+    np.testing.assert_allclose(adjusted['travel_time'].to_numpy(), expected)
+    # The input frame is not modified unless inplace=True
+    assert adjusted is not passage
+    pd.testing.assert_series_equal(passage['travel_time'], original)
+
+
+@pytest.mark.parametrize("rules", [
+    [('adjust', '3', 30 * 60)],
+    [('adjust', '2', 0), ('internal', '4', 0), ('adjust', '4', 5 * 3600), ('internal', '4', 0)],
+])
+def test_dense_engine_matches_pairwise_rules(frames, distances, rules):
+    df, passage = frames
+    graph = ActivityGraph.from_frames(df, pd.DataFrame(distances.to_dict()).T, dtype=np.float64)
+    engine = graph.penalty_engine()
+    for kind, section, time_in_pole in rules:
+        if kind == 'internal':
+            engine.add_internal_penalties(graph.weights, section)
+        else:
+            engine.adjust_for_poles(graph.weights, section, time_in_pole)
+    _, adjusted = graph.to_frames()
+    np.testing.assert_allclose(adjusted['travel_time'], reference_penalties(passage, df, rules))
+
+
+def test_penalties_in_place(frames):
+    df, passage = frames
+    copy = passage.copy()
+    assert add_internal_pole_penalties(copy, '3', df, inplace=True) is copy
+    assert adjust_edge_weights_for_poles(copy, '3', df, 0, apply_penalty=False, inplace=True) is copy
+    np.testing.assert_allclose(copy['travel_time'], reference_penalties(passage, df, [('internal', '3', 0)]))
+
+
+def test_select_activities_in_pole(frames):
+    df, passage = frames
+    section = df['sectionId'].value_counts().index[0]
+    in_section = df[df['sectionId'] == section].sort_values('interest_score', ascending=False)
+    hours = in_section['duration'].iloc[:2].sum()
+
+    route, adjusted = select_activities_in_pole(df, passage, section, hours, "10:00")
+    assert [activity['name'] for activity in route] == in_section['name'].iloc[:2].tolist()
+    rules = [('adjust', section, hours * 3600)]
+    np.testing.assert_allclose(adjusted['travel_time'], reference_penalties(passage, df, rules))
+
+    route, adjusted = select_activities_in_pole(df, passage, section, 0, "10:00")
+    assert route == []
+    np.testing.assert_allclose(
+        adjusted['travel_time'], reference_penalties(passage, df, [('adjust', section, 0)])
+    )
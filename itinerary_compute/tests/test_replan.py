@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog, recommend_activities
+from candidate_engine import CandidateEngine
+from itinerary_builder import build_itinerary, replan_itinerary, greedy_route, time_to_minutes
+from route_optimizer import RouteOptimizer
+
+START = "La Statue de Louis XIV"
+
+
+@pytest.fixture(scope="module")
+def planned(synthetic):
+    activities, swipes, distances = synthetic
+    catalog = ActivityCatalog(activities)
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    itinerary = build_itinerary(swipes, activities, distances, "09:00", "18:00",
+                                start_point=START, max_activities=8, catalog=catalog)
+    assert itinerary['total_activities'] >= 3
+    return itinerary, activities, distances, rec_scores, catalog
+
+
+def replan(planned, completed, **kwargs):
+    itinerary, activities, distances, rec_scores, catalog = planned
+    current_time = kwargs.pop('current_time', None)
+    if current_time is None:
+        current_time = itinerary['itinerary'][min(completed, len(itinerary['itinerary']) - 1)]['departure_time']
+    return replan_itinerary(itinerary, completed, current_time, activities, distances, "18:00",
+                            rec_scores=rec_scores, start_point=START, max_activities=8,
+                            catalog=catalog, time_budget_ms=1000, **kwargs)
+
+
+@pytest.mark.parametrize("completed", [-1, 9, 2.0, "2", None])
+def test_completed_out_of_range(planned, completed):
+    with pytest.raises(ValueError, match="completed"):
+        replan(planned, completed, current_time="12:00")
+
+
+@pytest.mark.parametrize("mutate", [
+    lambda it: {k: v for k, v in it.items() if k != 'itinerary'},
+    lambda it: {**it, 'itinerary': it['itinerary'][:1]},
+    lambda it: {**it, 'itinerary': None},
+    lambda it: {k: v for k, v in it.items() if k != 'departure_time'},
+    lambda it: {**it, 'total_activities': it['total_activities'] + 1},
+    lambda it: {**it, 'itinerary': [it['itinerary'][0]] + [
+        {k: v for k, v in step.items() if k != 'activity_id'} for step in it['itinerary'][1:]
+    ]},
+    lambda it: [it],
+])
+def test_malformed_itinerary(planned, mutate):
+    itinerary, activities, distances, rec_scores, catalog = planned
+    with pytest.raises(ValueError, match="itinerary"):
+        replan_itinerary(mutate(itinerary), 1, "12:00", activities, distances, "18:00",
+                         rec_scores=rec_scores, start_point=START, catalog=catalog)
+
+
+@pytest.mark.parametrize("completed", [0, 2])
+def test_replan_keeps_completed_steps(planned, completed):
+    itinerary = planned[0]
+    result = replan(planned, completed)
+    steps = result['itinerary']
+    assert steps[:completed + 1] == itinerary['itinerary'][:completed + 1]
+    assert steps[-1]['activity_name'] == START
+    assert result['total_activities'] == len(steps) - 2 <= 8
+    assert result['stats']['replan']['completed'] == completed
+
+    # Every stop is visited once, in its opening hours, before the end time
+    activities, catalog = planned[1], planned[4]
+    ids = [str(step['activity_id']) for step in steps[1:-1]]
+    assert len(set(ids)) == len(ids)
+    for step in steps[completed + 1:-1]:
+        activity = catalog.get(str(step['activity_id']))
+        assert time_to_minutes(step['arrival_time']) <= activity['closingTime'] * 60
+    assert time_to_minutes(steps[-1]['arrival_time']) <= time_to_minutes("18:00")
+
+
+def reference_fill(optimizer, route):
+    """Best insertion by evaluating every (position, activity) pair with `evaluate`."""
+    best = list(route)
+    best_objective, _ = optimizer.evaluate(best)
+    while len(best) < optimizer.max_activities:
+        step = None
+        for i in range(len(best) + 1):
+            for j in optimizer.candidates:
+                if j in best:
+                    continue
+                evaluation = optimizer.evaluate(best[:i] + [j] + best[i:])
+                if evaluation is not None and (step is None or evaluation[0] > step[0]):
+                    step = (evaluation[0], i, j)
+        if step is None or step[0] <= best_objective + 1e-9:
+            break
+        best_objective, i, j = step
+        best = best[:i] + [j] + best[i:]
+    return best, best_objective
+
+
+@pytest.mark.parametrize("start, keep", [(9 * 60, 0), (9 * 60, 3), (13 * 60, 2)])
+def test_fill_matches_exhaustive_insertion(planned, start, keep):
+    _, activities, distances, rec_scores, catalog = planned
+    # A small candidate set keeps the exhaustive search fast
+    candidates = sorted(activities, key=lambda a: rec_scores.get(str(a['activityId']), -1), reverse=True)[:40]
+    engine = CandidateEngine(candidates, distances, rec_scores, START, catalog)
+    route, _ = greedy_route(engine, start, 18 * 60, distances.index_of(START), 8)
+    optimizer = RouteOptimizer(engine, start, 18 * 60, 8)
+    route = route[:keep]
+
+    expected, expected_objective = reference_fill(optimizer, route)
+    result = optimizer.fill(route, time_budget_ms=10000)
+    assert result.route == expected
+    assert result.objective == pytest.approx(expected_objective)
+    assert [p for p in result.route if p in route] == route
+    np.testing.assert_allclose(result.scores, optimizer.evaluate(result.route)[1])
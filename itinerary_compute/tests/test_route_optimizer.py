@@ -0,0 +1,91 @@
+import time
+import numpy as np
+import pytest
+from content_based_interest import ActivityCatalog, recommend_activities
+from candidate_engine import CandidateEngine
+from itinerary_builder import greedy_route, is_activity_feasible, calculate_composite_score
+from route_optimizer import RouteOptimizer
+
+START = "La Statue de Louis XIV"
+START_TIME, END_TIME = 9 * 60, 18 * 60
+
+
+@pytest.fixture(scope="module")
+def setup(synthetic):
+    activities, swipes, distances = synthetic
+    catalog = ActivityCatalog(activities)
+    scored = recommend_activities(swipes, activities, exclude_seen=True, catalog=catalog)
+    rec_scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+
+    def engine():
+        return CandidateEngine(scored, distances, rec_scores, START, catalog)
+
+    greedy, _ = greedy_route(engine(), START_TIME, END_TIME, distances.index_of(START), 8)
+    return engine, greedy, distances, rec_scores, catalog
+
+
+def reference_evaluate(engine, route, distances, rec_scores, catalog):
+    """Route objective with the scalar feasibility and composite score functions."""
+    current_time, location = START_TIME, START
+    cumulative = np.zeros(9)
+    scores = []
+    for j in route:
+        activity = engine.activities[j]
+        if not is_activity_feasible(activity, current_time, END_TIME, location, distances, START):
+            return None
+        scores.append(calculate_composite_score(
+            activity, current_time, location, cumulative, distances, rec_scores, catalog=catalog
+        ))
+        arrival = current_time + distances.travel_time(location, activity['name'])
+        current_time = max(arrival, activity['openingTime'] * 60) + activity['duration'] * 60
+        location = activity['name']
+        cumulative = cumulative + catalog.vector(activity)
+    return scores
+
+
+def test_evaluate_matches_scalar_functions(setup):
+    engine, greedy, distances, rec_scores, catalog = setup
+    optimizer = RouteOptimizer(engine(), START_TIME, END_TIME, 8)
+    rng = np.random.default_rng(0)
+    routes = [greedy, greedy[::-1], []] + [list(rng.permutation(greedy)) for _ in range(5)]
+    for route in routes:
+        evaluation = optimizer.evaluate(route)
+        expected = reference_evaluate(optimizer.engine, route, distances, rec_scores, catalog)
+        if expected is None:
+            assert evaluation is None
+            continue
+        objective, scores = evaluation
+        np.testing.assert_allclose(scores, expected, atol=1e-9)
+        assert objective == pytest.approx(sum(expected) + optimizer.prize_offset * len(route))
+
+
+def test_setup_does_not_copy_the_matrix(setup):
+    engine = setup[0]
+    optimizer = RouteOptimizer(engine(), START_TIME, END_TIME, 8)
+    assert not optimizer.travel_rows and not optimizer.gram_lists
+    optimizer.evaluate(setup[1])
+    # Only the rows of the stops the route leaves from
+    assert set(optimizer.travel_rows) == set(setup[1][:-1])
+
+
+def test_optimize_improves_the_greedy_route(setup):
+    engine, greedy, distances, rec_scores, catalog = setup
+    optimizer = RouteOptimizer(engine(), START_TIME, END_TIME, 8)
+    result = optimizer.optimize(greedy, time_budget_ms=200)
+    assert result.objective >= result.initial_objective
+    assert reference_evaluate(optimizer.engine, result.route, distances, rec_scores, catalog) is not None
+    assert len(result.route) <= 8
+
+
+def test_time_budget_counts_from_setup(setup):
+    engine, greedy = setup[0], setup[1]
+    optimizer = RouteOptimizer(engine(), START_TIME, END_TIME, 8)
+    optimizer.created -= 1.0  # A setup that already used the whole budget
+    result = optimizer.optimize(greedy, time_budget_ms=50)
+    assert result.timed_out
+    assert result.route == greedy and result.improvements == 0
+    assert result.elapsed_ms >= 1000
+
+    started = time.perf_counter()
+    result = optimizer.optimize(greedy, time_budget_ms=50, started=started)
+    assert result.elapsed_ms < 1000
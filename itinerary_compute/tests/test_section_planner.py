@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+from distance_matrix import DistanceMatrix
+from content_based_interest import recommend_activities
+from section_planner import SectionPlanner, build_section_itinerary
+from pole_penalties import PenaltyOverlay, MIN_POLE_TIME, MAX_POLE_TIME, INTERNAL_PENALTY_TIME
+from utils import generate_activity_graph, adjust_edge_weights_for_poles, add_internal_pole_penalties
+
+START = "La Statue de Louis XIV"
+
+
+def small_estate(sections, duration=1, travel=5):
+    """Start point plus one activity per entry of `sections`, all open all day, `travel` minutes apart."""
+    activities = [{"activityId": "0", "name": START, "sectionId": "0",
+                   "duration": 0, "openingTime": 0, "closingTime": 24}]
+    for i, section in enumerate(sections, 1):
+        activities.append({"activityId": str(i), "name": f"A{i}", "sectionId": section,
+                           "duration": duration, "openingTime": 0, "closingTime": 24})
+    names = [act['name'] for act in activities]
+    distances = DistanceMatrix.from_dict({a: {b: (0 if a == b else travel) for b in names} for a in names})
+    scores = {act['activityId']: 1.0 for act in activities[1:]}
+    return activities, distances, scores
+
+
+def test_overlay_matches_passage_frame_rules(activities, distances):
+    df = pd.json_normalize(activities)
+    dist_df_walk = pd.DataFrame(distances.to_dict()).T
+    vertex_df, passage = generate_activity_graph(df, dist_df_walk)
+    names = vertex_df['name'].tolist()
+    overlay = PenaltyOverlay.from_frame(df, dist_df_walk)
+
+    for section, time_in_pole in [('2', 30 * 60), ('3', MAX_POLE_TIME), ('4', 2 * 3600)]:
+        passage = adjust_edge_weights_for_poles(passage, section, df, time_in_pole)
+        overlay.adjust_for_poles(section, time_in_pole)
+    passage = add_internal_pole_penalties(passage, '4', df)
+    overlay.add_internal_penalties('4')
+
+    index = {name: i for i, name in enumerate(names)}
+    expected = overlay.materialize()
+    rows = passage['from'].map(index).to_numpy()
+    columns = passage['to'].map(index).to_numpy()
+    np.testing.assert_allclose(passage['travel_time'].to_numpy(), expected[rows, columns], rtol=1e-6)
+
+
+def test_sections_respect_pole_times(activities, distances, likes_dislikes):
+    scored = recommend_activities(likes_dislikes, activities, exclude_seen=True)
+    scores = {str(a['activityId']): a['recommendation_score'] for a in scored}
+    planner = SectionPlanner([a for a in activities if str(a['activityId']) in scores], distances, scores)
+    for hours in (3, 5, 8, 10):
+        route, summary = planner.plan(600, 600 + hours * 60, max_activities=len(scores))
+        visited = [entry for entry in summary if entry['activities']]
+        for entry in visited:
+            assert entry['time_in_section'] <= MAX_POLE_TIME / 60 + 1e-9
+        # Only the last visited section may be left before 90 minutes
+        for entry in visited[:-1]:
+            assert entry['time_in_section'] >= MIN_POLE_TIME / 60
+        assert len(route) == sum(entry['activities'] for entry in summary)
+
+
+def test_short_sections_come_last():
+    # Sections 1 and 2 only hold 1 hour of activities each
+    activities, distances, scores = small_estate(['1', '2', '3', '3', '3'])
+    planner = SectionPlanner(activities, distances, scores)
+    order = planner.choose_sections(600, 600 + 8 * 60, max_sections=3)
+    assert order[0] == '3'
+    assert sum(section in ('1', '2') for section in order) == 1
+
+
+def test_leaving_a_section_early_blocks_the_others():
+    activities, distances, scores = small_estate(['1', '1', '2', '2'])
+    planner = SectionPlanner(activities, distances, scores)
+    penalties = planner.penalties.fork()
+    penalties.adjust_for_poles('1', 30 * 60)
+    route, _ = planner.plan_section('2', 0, 660, 900, 1000, 5, set(), penalties)
+    assert route == []
+    # The planner's own overlay is untouched, and the start point is never penalized
+    route, _ = planner.plan_section('2', 0, 660, 900, 1000, 5, set())
+    assert route == [2, 3]
+    route, _ = planner.plan_section('2', planner.start, 660, 900, 1000, 5, set(), penalties)
+    assert route == [2, 3]
+
+
+def test_internal_moves_cost_ten_minutes_after_three_hours():
+    activities, distances, scores = small_estate(['1'] * 5)
+    planner = SectionPlanner(activities, distances, scores)
+    route, finish = planner.plan_section('1', planner.start, 600, 600 + MAX_POLE_TIME / 60, 2000, 5, set())
+    # Arrival 5 min, then 1 h visits 5 min apart; the move after 3 h costs 15 min
+    assert len(route) == 3
+    assert finish == 600 + 5 + 60 + 5 + 60 + 5 + 60
+    route, finish = planner.plan_section('1', planner.start, 600, 600 + 5 * 60, 2000, 5, set())
+    times, time = [], 600.0
+    for k, row in enumerate(route):
+        move = 5 + (10 if k and time - 600 >= INTERNAL_PENALTY_TIME / 60 else 0)
+        time += move + 60
+        times.append(time)
+    assert len(route) == 4
+    assert finish == times[-1] == 600 + 3 * 65 + 75
+
+
+@pytest.mark.parametrize("end_time", ["13:00", "18:00"])
+def test_section_itinerary_is_feasible(activities, distances, likes_dislikes, end_time):
+    itinerary = build_section_itinerary(likes_dislikes, activities, distances, "10:00", end_time,
+                                        max_activities=20)
+    steps = itinerary['itinerary']
+    assert steps[0]['activity_name'] == START and steps[-1]['activity_name'] == START
+    assert steps[-1]['arrival_time'] <= end_time
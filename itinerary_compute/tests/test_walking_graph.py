@@ -0,0 +1,123 @@
+import json
+import numpy as np
+import pytest
+from distance_Haversine import haversine
+from walking_graph import WalkingGraph
+
+#   A --100-- B --100 (steps)-- C        E --50-- F   (separate component)
+#    \                         /
+#     150 ------ D ------- 150
+COORDINATES = {
+    "A": (48.8000, 2.1200),
+    "B": (48.8010, 2.1200),
+    "C": (48.8020, 2.1200),
+    "D": (48.8010, 2.1220),
+    "E": (48.8100, 2.1300),
+    "F": (48.8105, 2.1300),
+}
+EDGES = [("A", "B", 100.0, True), ("B", "C", 100.0, False), ("A", "D", 150.0, True),
+         ("D", "C", 150.0, True), ("E", "F", 50.0, True)]
+A, B, C, D, E, F = range(6)
+
+
+@pytest.fixture
+def graph():
+    names = list(COORDINATES)
+    index = {name: i for i, name in enumerate(names)}
+    return WalkingGraph(
+        names,
+        [COORDINATES[name][0] for name in names],
+        [COORDINATES[name][1] for name in names],
+        [(index[a], index[b], length, accessible) for a, b, length, accessible in EDGES]
+    )
+
+
+def test_shortest_lengths(graph):
+    np.testing.assert_array_equal(graph.shortest_lengths(A), [0, 100, 200, 150, np.inf, np.inf])
+    # Edges are undirected
+    np.testing.assert_array_equal(graph.shortest_lengths(C), [200, 100, 0, 150, np.inf, np.inf])
+    # Without the steps, C is reached through D
+    np.testing.assert_array_equal(graph.shortest_lengths(A, accessible_only=True), [0, 100, 300, 150, np.inf, np.inf])
+    np.testing.assert_array_equal(graph.shortest_lengths(E), [np.inf] * 4 + [0, 50])
+
+
+def test_shortest_lengths_stop_at_the_targets(graph):
+    # B is settled right after A: D and C are not, so they are reported as inf
+    np.testing.assert_array_equal(graph.shortest_lengths(A, targets=[B]), [0, 100] + [np.inf] * 4)
+    np.testing.assert_array_equal(graph.shortest_lengths(A, targets=[C]), [0, 100, 200, 150, np.inf, np.inf])
+    # Unreachable targets: the whole component is explored
+    np.testing.assert_array_equal(graph.shortest_lengths(A, targets=[B, F]), graph.shortest_lengths(A))
+
+
+def test_snap(graph):
+    latitudes = [48.80002, 48.8019, 48.8104, 48.8000]
+    longitudes = [2.12001, 2.1201, 2.1300, 2.1200]
+    nodes, offsets = graph.snap(latitudes, longitudes, chunk_size=3)
+    np.testing.assert_array_equal(nodes, [A, C, F, A])
+    expected = [haversine(lat, lon, *COORDINATES["ABCDEF"[node]]) * 1000
+                for lat, lon, node in zip(latitudes, longitudes, nodes)]
+    np.testing.assert_allclose(offsets, expected)
+    assert offsets[-1] == 0
+
+
+def minutes(meters, speed_kmh=5):
+    return meters / 1000 * 60 / speed_kmh
+
+
+def test_walking_matrix(graph):
+    # Near A, near C, also near A, near E
+    latitudes = [48.80002, 48.8019, 48.80005, 48.8100]
+    longitudes = [2.12001, 2.1201, 2.11998, 2.1300]
+    _, offsets = graph.snap(latitudes, longitudes)
+    direct = haversine(np.array(latitudes)[:, None], np.array(longitudes)[:, None],
+                       np.array(latitudes)[None, :], np.array(longitudes)[None, :]) * 1000
+
+    matrix = graph.walking_matrix(latitudes, longitudes, speed_kmh=4)
+    assert matrix[0, 1] == pytest.approx(minutes(offsets[0] + 200 + offsets[1], 4))
+    assert matrix[1, 2] == pytest.approx(minutes(offsets[1] + 200 + offsets[2], 4))
+    # Same snapped node, or no path: straight line
+    assert matrix[0, 2] == pytest.approx(minutes(direct[0, 2], 4))
+    assert matrix[1, 3] == pytest.approx(minutes(direct[1, 3], 4))
+    np.testing.assert_allclose(matrix, matrix.T)
+    np.testing.assert_array_equal(matrix.diagonal(), 0)
+
+    accessible = graph.walking_matrix(latitudes, longitudes, accessible_only=True, fallback_to_haversine=False)
+    assert accessible[0, 1] == pytest.approx(minutes(offsets[0] + 300 + offsets[1]))
+    assert accessible[0, 2] == pytest.approx(minutes(direct[0, 2]))
+    assert np.isinf(accessible[:3, 3]).all() and np.isinf(accessible[3, :3]).all()
+
+
+def test_json_and_osm_give_the_same_graph(tmp_path, graph):
+    # Lengths left out of the JSON default to the straight line, like OSM ways
+    json_path = tmp_path / "graph.json"
+    json_path.write_text(json.dumps({
+        "nodes": [{"id": name, "lat": lat, "lon": lon} for name, (lat, lon) in COORDINATES.items()],
+        "edges": [{"from": a, "to": b, "accessible": accessible} for a, b, _, accessible in EDGES],
+    }), encoding='utf-8')
+
+    nodes = "".join(f'<node id="{name}" lat="{lat}" lon="{lon}"/>' for name, (lat, lon) in COORDINATES.items())
+    osm_path = tmp_path / "graph.osm"
+    osm_path.write_text(
+        f'<?xml version="1.0" encoding="UTF-8"?><osm version="0.6">{nodes}'
+        '<node id="X" lat="48.9" lon="2.2"/>'
+        '<way id="1"><nd ref="A"/><nd ref="B"/><tag k="highway" v="footway"/></way>'
+        '<way id="2"><nd ref="B"/><nd ref="C"/><tag k="highway" v="steps"/></way>'
+        '<way id="3"><nd ref="A"/><nd ref="D"/><nd ref="C"/><nd ref="missing"/><tag k="highway" v="path"/></way>'
+        '<way id="4"><nd ref="E"/><nd ref="F"/><tag k="highway" v="pedestrian"/></way>'
+        # Not walkable: ignored, and so is their node X
+        '<way id="5"><nd ref="A"/><nd ref="X"/><tag k="highway" v="motorway"/></way>'
+        '<way id="6"><nd ref="D"/><nd ref="X"/><tag k="highway" v="footway"/><tag k="access" v="private"/></way>'
+        '</osm>',
+        encoding='utf-8'
+    )
+
+    from_json = WalkingGraph.load(str(json_path))
+    from_osm = WalkingGraph.load(str(osm_path))
+    assert from_json.node_ids == from_osm.node_ids == list(COORDINATES)
+    for loaded in (from_json, from_osm):
+        np.testing.assert_array_equal(loaded.latitudes, graph.latitudes)
+        np.testing.assert_array_equal(loaded.indptr, graph.indptr)
+        np.testing.assert_array_equal(loaded.indices, graph.indices)
+        np.testing.assert_array_equal(loaded.accessible, graph.accessible)
+    np.testing.assert_array_equal(from_json.lengths, from_osm.lengths)
+    assert from_json.lengths[0] == pytest.approx(haversine(*COORDINATES["A"], *COORDINATES["B"]) * 1000)
@@ -1,23 +1,34 @@
+def activity_positions(df):
+    """
+    Index activityId -> position de la ligne dans `df` (première occurrence),
+    construit une seule fois au lieu de filtrer le DataFrame pour chaque swipe.
+    """
+    positions = {}
+    for position, activity_id in enumerate(df['activityId'].tolist()):
+        positions.setdefault(str(activity_id), position)
+    return positions
+
+
 # Créer un vecteur de préférences pour l'utilisateur basé sur les likes/dislikes
 def create_user_preferences(likes_dislikes, df, scale_factor=0.1):
     """
     Crée un vecteur de préférences basé sur les likes et dislikes de l'utilisateur.
     `scale_factor` modère l'impact des avis de l'utilisateur.
     """
-    user_preferences = {
-        'architecture': 0, 'landscape': 0, 'politic': 0, 'history': 0,
-        'courtlife': 0, 'art': 0, 'engineering': 0, 'spirituality': 0, 'nature': 0
-    }
+    positions = activity_positions(df)
+    interests = df[INTEREST_KEYS].to_numpy(dtype=np.float64)
+    preferences = np.zeros(len(INTEREST_KEYS))
+
     # Mettre à jour les préférences de l'utilisateur en fonction des likes/dislikes
+    # (dans l'ordre des swipes, pour des sommes identiques à l'accumulation clé par clé)
     for like_data in likes_dislikes:
-        activity_id = like_data['activityId']
-        like_value = 1 if like_data['like'] else -0.5  
-        activity = df[df['activityId'] == str(activity_id)].iloc[0]
-        
-        # Appliquer les ajustements sur les préférences
-        for key in user_preferences.keys():
-            user_preferences[key] += activity['interests.' + key] * like_value * scale_factor
-    return user_preferences
+        like_value = 1 if like_data['like'] else -0.5
+        preferences += interests[positions[str(like_data['activityId'])]] * like_value * scale_factor
+
+    return {
+        key[len('interests.'):]: value
+        for key, value in zip(INTEREST_KEYS, preferences.tolist())
+    }
 
 # Fonction pour formater l'heure en HH:MM
 def format_time(seconds):
@@ -38,6 +49,18 @@ def calculate_interest_score(row, user_preferences):
             score += preference * row['interests.' + key]  # Multiplier l'intérêt par la préférence positive
     return score
 
+def calculate_interest_scores(df, user_preferences):
+    """
+    Scores d'intérêt de toutes les activités de `df` (même résultat que
+    `calculate_interest_score` ligne par ligne), en un seul produit
+    matrice-vecteur sur les colonnes `interests.*`.
+    """
+    preferences = np.array([user_preferences[key[len('interests.'):]] for key in INTEREST_KEYS], dtype=np.float64)
+    # Seules les préférences positives comptent
+    positive = np.maximum(preferences, 0)
+    interests = df[INTEREST_KEYS].to_numpy(dtype=np.float64)
+    return interest_dot(interests, positive[None, :])[:, 0]
+
 # Fonction pour sélectionner les meilleures sections en fonction des scores d'intérêt
 def select_sections_by_interest(df, available_time, top_n=3):
     """
@@ -75,6 +98,9 @@ import pandas as pd
 import numpy as np
 import json
 from datetime import timedelta
+from activity_graph import ActivityGraph
+from content_based_interest import INTEREST_KEYS, interest_dot
+from pole_penalties import PolePenaltyEngine, MIN_POLE_TIME, MAX_POLE_TIME
 
 # Créer une fonction pour calculer le temps de trajet total pour un parcours
 def calculate_travel_time(route, dist_df_walk):
@@ -90,56 +116,18 @@ def generate_activity_graph(df, dist_df_walk):
     """
     Génère un tableau des sommets avec les informations (name, section, coordonnées)
     et un tableau de la matrice de passage (temps de déplacement entre les activités).
+
+    Format long conservé pour compatibilité ; `ActivityGraph.from_frames` donne la
+    représentation compacte (tableaux et matrice dense).
     
     :param df: DataFrame des activités
     :param dist_df_walk: DataFrame des distances entre les activités
     :return: vertex_df (DataFrame des sommets), passage_matrix_df (DataFrame de la matrice de passage)
     """
-    
-    # Créer une liste pour les sommets et la matrice de passage
-    vertex_data = []
-    passage_data = []
-
-    # Ajouter les sommets dans le tableau
-    for _, row in df.iterrows():
-        activity_id = row['activityId']
-        name = row['name']
-        section = row['sectionId']
-        latitude = row['latitude']
-        longitude = row['longitude']
-        
-        # Ajouter l'entrée dans le tableau des sommets
-        vertex_data.append({
-            'name': name,
-            'section': section,
-            'coordinates': (latitude, longitude)
-        })
-
-    # Créer le DataFrame des sommets
-    vertex_df = pd.DataFrame(vertex_data)
-
-    # Calculer la matrice de passage (temps de déplacement entre les activités)
-    for _, row_from in df.iterrows():
-        from_name = row_from['name']
-        for _, row_to in df.iterrows():
-            to_name = row_to['name']
-            if from_name != to_name:
-                # Récupérer le temps de trajet de dist_df_walk
-                travel_time = dist_df_walk.loc[from_name, to_name] * 60  # En secondes
-                # Ajouter l'information dans la matrice de passage
-                passage_data.append({
-                    'from': from_name,
-                    'to': to_name,
-                    'travel_time': travel_time
-                })
-
-    # Créer le DataFrame de la matrice de passage
-    passage_matrix_df = pd.DataFrame(passage_data)
-
-    # Retourner le DataFrame des sommets et la matrice de passage
-    return vertex_df, passage_matrix_df
-
-def adjust_edge_weights_for_poles(passage_matrix_df, selected_section, df, total_time_in_pole, apply_penalty=True):
+    graph = ActivityGraph.from_frames(df, dist_df_walk, dtype=np.float64)
+    return graph.to_frames()
+
+def adjust_edge_weights_for_poles(passage_matrix_df, selected_section, df, total_time_in_pole, apply_penalty=True, inplace=False):
     """
     Ajuste les poids des arêtes entre le pôle sélectionné et les autres pôles en ajoutant 10 heures de poids
     au début (avant 90 minutes de visite) et 10 heures de poids après 4 heures de visite dans le pôle.
@@ -149,101 +137,86 @@ def adjust_edge_weights_for_poles(passage_matrix_df, selected_section, df, total
     :param df: DataFrame des activités avec leurs informations
     :param total_time_in_pole: Temps total passé dans le pôle sélectionné (en secondes)
     :param apply_penalty: Booléen pour appliquer ou non les pénalités
+    :param inplace: Modifier `passage_matrix_df` directement au lieu d'un nouveau DataFrame
     :return: DataFrame de la matrice de passage ajustée
     """
-    adjusted_passage_matrix = passage_matrix_df.copy()
-
-    # Récupérer les activités dans la section sélectionnée
-    selected_activities = df[df['sectionId'] == selected_section]
-
-    # Identifier les activités des autres sections, à l'exception de la statue
-    other_sections = df[~df['sectionId'].isin([selected_section, '0'])]  # Exclure la section 0 (la statue)
-    # Appliquer les pénalités si le paramètre apply_penalty est True
-    if apply_penalty:
-        # Si le temps passé dans le pôle est inférieur à 90 minutes, ajouter 10 h de poids
-        if total_time_in_pole < 90 * 60:
-            for _, row_from in selected_activities.iterrows():
-                from_name = row_from['name']
-                for _, row_to in other_sections.iterrows():
-                    to_name = row_to['name']
-
-                    if passage_matrix_df[(passage_matrix_df['from'] == from_name) & (passage_matrix_df['to'] == to_name)].empty:
-                        continue
-
-                    # Ajouter 10 h de temps de trajet
-                    adjusted_passage_matrix.loc[
-                        (adjusted_passage_matrix['from'] == from_name) & 
-                        (adjusted_passage_matrix['to'] == to_name), 
-                        'travel_time'] += 10 * 3600  # 10 h en secondes
-
-                    
-        
-        # Si le temps passé dans le pôle dépasse 4 heures, ajouter 10 heures de poids aux arêtes internes du pôle
-        elif total_time_in_pole >= 4 * 3600:
-            for _, row_from in selected_activities.iterrows():
-                from_name = row_from['name']
-                for _, row_to in selected_activities.iterrows():
-                    to_name = row_to['name']
-                    if from_name != to_name:
-                        # Ajouter 10 heures de temps de trajet
-                        adjusted_passage_matrix.loc[
-                            (adjusted_passage_matrix['from'] == from_name) & 
-                            (adjusted_passage_matrix['to'] == to_name), 
-                            'travel_time'] += 10 * 3600  # 10 heures en secondes
+    # Entre 90 minutes et 4 heures (ou sans pénalité), aucune arête ne change
+    if not apply_penalty or MIN_POLE_TIME <= total_time_in_pole < MAX_POLE_TIME:
+        return passage_matrix_df if inplace else passage_matrix_df.copy(deep=False)
 
+    return penalize_passage_edges(
+        passage_matrix_df, df,
+        lambda engine, delta: engine.adjust_for_poles(delta, selected_section, total_time_in_pole),
+        inplace
+    )
+
+
+def penalize_passage_edges(passage_matrix_df, df, penalize, inplace=False):
+    """
+    Applique des pénalités de pôle, calculées par blocs sur une matrice dense, au format long.
+
+    `penalize(engine, delta)` ajoute les pénalités à `delta` (N x N, dans l'ordre de `df`) avec un
+    `PolePenaltyEngine` ; chaque arête du format long reçoit ensuite la pénalité de ses deux extrémités.
+    Les colonnes `from`/`to` ne sont ni parcourues par paire ni copiées : le DataFrame renvoyé
+    (sauf `inplace`) ne remplace que `travel_time`.
+
+    :param passage_matrix_df: DataFrame de la matrice de passage avec les poids des arêtes
+    :param df: DataFrame des activités avec leurs informations
+    :param penalize: Fonction (engine, delta) qui ajoute les pénalités à `delta`
+    :param inplace: Modifier `passage_matrix_df` directement au lieu d'un nouveau DataFrame
+    :return: DataFrame de la matrice de passage ajustée
+    """
+    engine = PolePenaltyEngine.from_frame(df)
+    delta = penalize(engine, np.zeros((len(df), len(df))))
+
+    # Position de chaque extrémité dans df (-1 pour une activité inconnue, jamais pénalisée)
+    names = pd.Index(df['name'].tolist(), dtype=object)
+    edges = names.get_indexer(passage_matrix_df['from'])
+    columns = names.get_indexer(passage_matrix_df['to'])
+    unknown = (edges < 0) | (columns < 0)
+    edges *= len(df)
+    edges += columns  # Indice de l'arête dans delta aplatie
+    del columns
+    travel_time = delta.ravel()[edges]
+    travel_time[unknown] = 0
+    travel_time += passage_matrix_df['travel_time'].to_numpy()
+
+    adjusted_passage_matrix = passage_matrix_df if inplace else passage_matrix_df.copy(deep=False)
+    adjusted_passage_matrix['travel_time'] = travel_time
     return adjusted_passage_matrix
 
 
-def select_activities_in_pole(df, selected_section, available_time, start_time):
+def select_activities_in_pole(df, passage_matrix_df, selected_section, available_time, start_time):
     """
     Sélectionner les activités dans le pôle tout en respectant la logique de 90 minutes et 4 heures.
     
     :param df: DataFrame des activités
+    :param passage_matrix_df: DataFrame de la matrice de passage avec les poids des arêtes
     :param selected_section: Section sélectionnée pour la visite
     :param available_time: Temps disponible pour la visite (en heures)
     :param start_time: Heure de départ de la visite
     :return: Activités sélectionnées et mise à jour de la matrice de passage
     """
-    total_time_spent = 0  # Temps total passé dans le pôle (en secondes)
-    total_time_in_pole = 0
     selected_activities = df[df['sectionId'] == selected_section].sort_values(by='interest_score', ascending=False)
-    route = []
-
-    for _, activity in selected_activities.iterrows():
-        activity_duration = int(activity['duration'])
-        # Vérifier si le temps total passé dans le pôle ne dépasse pas 4 heures
-        if total_time_spent + activity_duration <= available_time * 3600:
-            route.append(activity)
-            total_time_spent += activity_duration
-            total_time_in_pole += activity_duration
-        else:
-            break  # Arrêter la sélection si on dépasse le temps disponible
+
+    # Les activités les plus intéressantes, dans l'ordre, tant que le temps disponible n'est pas dépassé
+    durations = selected_activities['duration'].to_numpy(dtype=float) * 3600  # En secondes
+    fits = np.cumsum(durations) <= available_time * 3600
+    count = int(np.argmin(fits)) if not fits.all() else len(fits)
+    route = [activity for _, activity in selected_activities.iloc[:count].iterrows()]
+    total_time_in_pole = float(durations[:count].sum())
 
     # Si le temps passé dans le pôle dépasse 90 minutes ou plus, ajuster les arêtes en conséquence
     passage_matrix_df = adjust_edge_weights_for_poles(passage_matrix_df, selected_section, df, total_time_in_pole)
 
     return route, passage_matrix_df
 
-def add_internal_pole_penalties(passage_matrix_df,selected_section, df):
+def add_internal_pole_penalties(passage_matrix_df, selected_section, df, inplace=False):
     """
-    Ajoute des pénalités de 10h aux arêtes internes du pôle si le temps passé dans ce pôle dépasse 4 heures.
+    Ajoute des pénalités aux arêtes internes du pôle (10 minutes, cf. INTERNAL_PENALTY_SECONDS).
     """
-    adjusted_passage_matrix = passage_matrix_df.copy()
-    # Sélectionner les activités dans le pôle sélectionné
-    selected_activities = df[df['sectionId'] == selected_section]
-
-    penalty_time = 10 * 60  # Pénalité de 10 heures en secondes
-    
-    # Ajouter des pénalités aux arêtes internes du pôle
-    for _, row_from in selected_activities.iterrows():
-        from_name = row_from['name']
-        for _, row_to in selected_activities.iterrows():
-            to_name = row_to['name']
-            
-            if from_name != to_name and passage_matrix_df[(passage_matrix_df['from'] == from_name) & (passage_matrix_df['to'] == to_name)].empty:
-                continue
-            
-            # Ajouter 10h (en secondes) de pénalité pour les arêtes internes au pôle
-            adjusted_passage_matrix.loc[(adjusted_passage_matrix['from'] == from_name) & (adjusted_passage_matrix['to'] == to_name), 'travel_time'] += penalty_time
-
-    return adjusted_passage_matrix
\ No newline at end of file
+    return penalize_passage_edges(
+        passage_matrix_df, df,
+        lambda engine, delta: engine.add_internal_penalties(delta, selected_section),
+        inplace
+    )
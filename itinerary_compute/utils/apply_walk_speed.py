@@ -1,4 +1,14 @@
-def apply_walk_speed(speed: float, dist_df_walk: pd.DataFrame):
+import pandas as pd
+from distance_Haversine import DEFAULT_WALK_SPEED_KMH
 
-    coefficient = min(0.2, speed / 100)
-    dist_df_walk["travel_time"] = dist_df_walk["travel_time"] * speed
\ No newline at end of file
+
+def apply_walk_speed(speed: float, dist_df_walk: pd.DataFrame) -> pd.DataFrame:
+    """
+    Temps de trajet de la matrice de passage pour une vitesse de marche `speed` (km/h).
+
+    Les temps de la matrice correspondent à DEFAULT_WALK_SPEED_KMH ; un nouveau
+    DataFrame est retourné, l'original (partagé) n'est pas modifié. Pour une
+    DistanceMatrix, utiliser `mobility.mobility_view`, qui évite toute copie.
+    """
+    coefficient = DEFAULT_WALK_SPEED_KMH / speed
+    return dist_df_walk.assign(travel_time=dist_df_walk["travel_time"] * coefficient)
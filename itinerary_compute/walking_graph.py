@@ -0,0 +1,269 @@
+import json
+import heapq
+import numpy as np
+import xml.etree.ElementTree as ET
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from distance_Haversine import haversine, DEFAULT_WALK_SPEED_KMH, write_distance_csv
+
+
+# Types de voies OSM praticables à pied
+WALKABLE_HIGHWAYS = {
+    "footway", "path", "pedestrian", "steps", "track", "service", "living_street",
+    "residential", "unclassified", "tertiary", "secondary", "primary", "cycleway",
+    "bridleway", "corridor"
+}
+
+
+class WalkingGraph:
+    """
+    Local walking network of the estate (paths and alleys), used offline.
+
+    Nodes have coordinates; undirected edges are stored in both directions
+    in CSR form (`indptr`, `indices`, `lengths` in meters). `accessible`
+    flags edges usable in a wheelchair (no steps).
+    """
+
+    def __init__(
+        self,
+        node_ids: Sequence[Any],
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        edges: List[Tuple[int, int, float, bool]]
+    ):
+        """
+        Args:
+            node_ids: External node ids (e.g. OSM ids)
+            latitudes: Node latitudes
+            longitudes: Node longitudes
+            edges: (from index, to index, length in meters, accessible) tuples
+        """
+        self.node_ids = list(node_ids)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        n = len(self.node_ids)
+
+        # Both directions, sorted by source node for CSR
+        sources = np.array([e[0] for e in edges] + [e[1] for e in edges], dtype=np.intp)
+        targets = np.array([e[1] for e in edges] + [e[0] for e in edges], dtype=np.intp)
+        lengths = np.array([e[2] for e in edges] * 2, dtype=np.float64)
+        accessible = np.array([e[3] for e in edges] * 2, dtype=bool)
+        order = np.argsort(sources, kind="stable")
+
+        self.indptr = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(np.bincount(sources, minlength=n), out=self.indptr[1:])
+        self.indices = targets[order]
+        self.lengths = lengths[order]
+        self.accessible = accessible[order]
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @classmethod
+    def from_json(cls, path: str) -> "WalkingGraph":
+        """
+        Load a graph from JSON:
+        {"nodes": [{"id", "lat", "lon"}], "edges": [{"from", "to", "length"?, "accessible"?}]}.
+        Edge lengths (meters) default to the straight-line distance.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        node_ids = [node["id"] for node in data["nodes"]]
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        latitudes = [node["lat"] for node in data["nodes"]]
+        longitudes = [node["lon"] for node in data["nodes"]]
+
+        edges = []
+        for edge in data["edges"]:
+            i, j = index[edge["from"]], index[edge["to"]]
+            length = edge.get("length")
+            if length is None:
+                length = haversine(latitudes[i], longitudes[i], latitudes[j], longitudes[j]) * 1000
+            edges.append((i, j, float(length), bool(edge.get("accessible", True))))
+        return cls(node_ids, latitudes, longitudes, edges)
+
+    @classmethod
+    def from_osm(cls, path: str) -> "WalkingGraph":
+        """Load the walkable ways of an OSM XML extract (.osm)."""
+        coordinates = {}
+        ways = []
+        for _, element in ET.iterparse(path, events=("end",)):
+            if element.tag == "node":
+                coordinates[element.get("id")] = (float(element.get("lat")), float(element.get("lon")))
+                element.clear()
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.findall("tag")}
+                if tags.get("highway") in WALKABLE_HIGHWAYS and tags.get("foot") != "no" and tags.get("access") != "private":
+                    refs = [nd.get("ref") for nd in element.findall("nd")]
+                    accessible = tags.get("highway") != "steps" and tags.get("wheelchair") != "no"
+                    ways.append((refs, accessible))
+                element.clear()
+
+        # Keep only nodes used by walkable ways
+        index = {}
+        node_ids, latitudes, longitudes = [], [], []
+        edges = []
+        for refs, accessible in ways:
+            refs = [ref for ref in refs if ref in coordinates]
+            for ref in refs:
+                if ref not in index:
+                    index[ref] = len(node_ids)
+                    node_ids.append(ref)
+                    latitudes.append(coordinates[ref][0])
+                    longitudes.append(coordinates[ref][1])
+            for a, b in zip(refs, refs[1:]):
+                (lat1, lon1), (lat2, lon2) = coordinates[a], coordinates[b]
+                length = haversine(lat1, lon1, lat2, lon2) * 1000
+                edges.append((index[a], index[b], float(length), accessible))
+        return cls(node_ids, latitudes, longitudes, edges)
+
+    @classmethod
+    def load(cls, path: str) -> "WalkingGraph":
+        """Load a graph file, .osm (OSM XML) or JSON."""
+        if path.endswith(".osm"):
+            return cls.from_osm(path)
+        return cls.from_json(path)
+
+    def snap(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        chunk_size: int = 256
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Nearest graph node of each point.
+
+        Returns:
+            (node indices, straight-line distance to the node in meters)
+        """
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        nodes = np.empty(len(lat), dtype=np.intp)
+        offsets = np.empty(len(lat), dtype=np.float64)
+        for start in range(0, len(lat), chunk_size):
+            stop = start + chunk_size
+            distances = haversine(
+                lat[start:stop, None], lon[start:stop, None],
+                self.latitudes[None, :], self.longitudes[None, :]
+            )
+            nodes[start:stop] = np.argmin(distances, axis=1)
+            offsets[start:stop] = distances[np.arange(len(distances)), nodes[start:stop]] * 1000
+        return nodes, offsets
+
+    def shortest_lengths(
+        self,
+        source: int,
+        targets: Optional[Sequence[int]] = None,
+        accessible_only: bool = False
+    ) -> np.ndarray:
+        """
+        Dijkstra from `source`; stops early once all `targets` are settled.
+
+        Returns:
+            Path length in meters to every node (inf if unreachable or not settled)
+        """
+        lengths = np.full(len(self), np.inf)
+        lengths[source] = 0.0
+        remaining = set(targets) if targets is not None else None
+        settled = np.zeros(len(self), dtype=bool)
+        heap = [(0.0, source)]
+
+        indptr, indices, edge_lengths, accessible = self.indptr, self.indices, self.lengths, self.accessible
+        while heap:
+            length, node = heapq.heappop(heap)
+            if settled[node]:
+                continue
+            settled[node] = True
+            if remaining is not None:
+                remaining.discard(node)
+                if not remaining:
+                    break
+            for k in range(indptr[node], indptr[node + 1]):
+                if accessible_only and not accessible[k]:
+                    continue
+                neighbour = indices[k]
+                candidate = length + edge_lengths[k]
+                if candidate < lengths[neighbour]:
+                    lengths[neighbour] = candidate
+                    heapq.heappush(heap, (candidate, neighbour))
+
+        if remaining is not None:
+            lengths[~settled] = np.inf
+        return lengths
+
+    def walking_matrix(
+        self,
+        latitudes: Sequence[float],
+        longitudes: Sequence[float],
+        speed_kmh: float = DEFAULT_WALK_SPEED_KMH,
+        accessible_only: bool = False,
+        fallback_to_haversine: bool = True
+    ) -> np.ndarray:
+        """
+        All-pairs walking times (minutes) between points snapped to the graph.
+
+        One Dijkstra per distinct snapped node, with early exit once every
+        other point is reached. The straight-line walk between each point and
+        its node is added. Pairs with no path use the straight-line walking
+        time when `fallback_to_haversine`, inf otherwise.
+        """
+        nodes, offsets = self.snap(latitudes, longitudes)
+        distinct = np.unique(nodes)
+        position = {node: k for k, node in enumerate(distinct.tolist())}
+
+        # Path lengths between distinct snapped nodes
+        node_lengths = np.empty((len(distinct), len(distinct)))
+        for k, node in enumerate(distinct.tolist()):
+            node_lengths[k] = self.shortest_lengths(node, distinct.tolist(), accessible_only)[distinct]
+
+        columns = np.array([position[node] for node in nodes.tolist()], dtype=np.intp)
+        meters = node_lengths[np.ix_(columns, columns)] + offsets[:, None] + offsets[None, :]
+
+        # Points snapped to the same node, or with no path between them
+        # (if falling back), walk in a straight line
+        direct_pairs = nodes[:, None] == nodes[None, :]
+        if fallback_to_haversine:
+            direct_pairs |= np.isinf(meters)
+        if direct_pairs.any():
+            lat = np.asarray(latitudes, dtype=np.float64)
+            lon = np.asarray(longitudes, dtype=np.float64)
+            direct = haversine(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) * 1000
+            meters = np.where(direct_pairs, direct, meters)
+
+        minutes = meters / 1000 * 60 / speed_kmh
+        np.fill_diagonal(minutes, 0)
+        return minutes
+
+
+def build_activity_matrix(
+    graph: WalkingGraph,
+    activities: List[Dict[str, Any]],
+    speed_kmh: float = DEFAULT_WALK_SPEED_KMH,
+    accessible_only: bool = False
+) -> np.ndarray:
+    """Walking times (minutes) between activities over the walking graph."""
+    return graph.walking_matrix(
+        [act['latitude'] for act in activities],
+        [act['longitude'] for act in activities],
+        speed_kmh=speed_kmh,
+        accessible_only=accessible_only
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python walking_graph.py <graphe .osm|.json> [activités.json] [sortie.csv] [vitesse km/h]
+    graph_path = sys.argv[1]
+    activities_path = sys.argv[2] if len(sys.argv) > 2 else 'activity_v2.json'
+    output_path = sys.argv[3] if len(sys.argv) > 3 else 'activity_distances_graph.csv'
+    speed_kmh = float(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_WALK_SPEED_KMH
+
+    with open(activities_path, 'r', encoding='utf-8') as f:
+        activities = json.load(f)
+
+    graph = WalkingGraph.load(graph_path)
+    matrix = build_activity_matrix(graph, activities, speed_kmh=speed_kmh)
+    write_distance_csv(output_path, [act['name'] for act in activities], matrix)
+
+    print(f"Matrice de marche ({len(graph)} noeuds) enregistrée sous {output_path}")